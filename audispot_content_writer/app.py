@@ -1,7 +1,7 @@
 
 import streamlit as st
 import asyncio
-from audispot_content_agent import get_transcript, content_creator_agent, Runner, ItemHelpers, trace
+from audispot_content_agent import get_transcript, register_transcript, regenerate_platforms, saved_post, content_creator_agent, Runner, ItemHelpers, trace
 import json
 import re
 
@@ -113,9 +113,12 @@ async def run_agent(query, video_id, platforms):
     if not transcript:
         return "Error: Could not fetch transcript. Please check the video ID."
     
+    # The tools read the transcript from the store; the message only carries its ID
+    transcript_id = register_transcript(transcript)
+
     # Enhanced message for concise content
     platform_list = ", ".join(platforms)
-    msg = f"{query}\n\nTarget platforms: {platform_list}\n\nCreate SHORT, engaging posts (not long content) from audispot254's perspective as someone who watched this video.\n\nVideo Transcript:\n{transcript}"
+    msg = f"{query}\n\nTarget platforms: {platform_list}\n\nCreate SHORT, engaging posts (not long content) from audispot254's perspective as someone who watched this video.\n\nTranscript ID: {transcript_id} (pass it to each tool)"
     
     input_items = [{"content": msg, "role": "user"}]
     with trace("Writing content"):
@@ -123,7 +126,43 @@ async def run_agent(query, video_id, platforms):
         output = ItemHelpers.text_message_outputs(result.new_items)
         return output
 
-if st.button("Generate Content", type="primary"):
+def show_post(platform, content, note=""):
+    st.markdown(f'<div class="output-card">', unsafe_allow_html=True)
+    st.markdown(f'<b>{platform} Post</b>{note}<br><b>Platform:</b> {platform}<br><b>{platform} Content</b>', unsafe_allow_html=True)
+    st.markdown('<div class="copy-note">Click and drag to select, then copy (Ctrl+C or ⌘+C).</div>', unsafe_allow_html=True)
+    st.markdown(f'<pre class="wrapped-pre">{content}</pre>', unsafe_allow_html=True)
+    st.markdown('</div>', unsafe_allow_html=True)
+
+col_generate, col_regenerate = st.columns(2)
+with col_generate:
+    generate = st.button("Generate Content", type="primary")
+with col_regenerate:
+    regenerate = st.button("Regenerate Selected Only",
+                           help="Redo only the selected platforms; the other posts for this video are reused as saved. "
+                                "Generate Content always writes a new set")
+
+if regenerate:
+    if not video_id.strip():
+        st.error("Please enter a YouTube video ID")
+    elif not platforms:
+        st.error("Please select at least one platform")
+    else:
+        with st.spinner("Regenerating selected platforms..."):
+            transcript = get_transcript(video_id)
+            if not transcript:
+                st.error("Error: Could not fetch transcript. Please check the video ID.")
+            else:
+                transcript_id = register_transcript(transcript)
+                # Which of the other posts come from the memo rather than a new call
+                saved = {platform for platform in ["LinkedIn", "Instagram", "Twitter"]
+                         if saved_post(transcript_id, platform.lower()) is not None}
+                posts = asyncio.run(regenerate_platforms(transcript_id, [p.lower() for p in platforms]))
+                st.markdown('<div class="section-title">Generated Content</div>', unsafe_allow_html=True)
+                for platform in ["LinkedIn", "Instagram", "Twitter"]:
+                    note = " (regenerated)" if platform in platforms else " (saved)" if platform in saved else " (new)"
+                    show_post(platform, posts[platform.lower()], note)
+
+if generate:
     if not video_id.strip():
         st.error("Please enter a YouTube video ID")
     elif not platforms:
@@ -135,12 +174,7 @@ if st.button("Generate Content", type="primary"):
             if output and not output.startswith("Error:"):
                 st.markdown('<div class="section-title">Generated Content</div>', unsafe_allow_html=True)
                 for platform in platforms:
-                    content = extract_content(output, platform)
-                    st.markdown(f'<div class="output-card">', unsafe_allow_html=True)
-                    st.markdown(f'<b>{platform} Post</b><br><b>Platform:</b> {platform}<br><b>{platform} Content</b>', unsafe_allow_html=True)
-                    st.markdown('<div class="copy-note">Click and drag to select, then copy (Ctrl+C or ⌘+C).</div>', unsafe_allow_html=True)
-                    st.markdown(f'<pre class="wrapped-pre">{content}</pre>', unsafe_allow_html=True)
-                    st.markdown('</div>', unsafe_allow_html=True)
+                    show_post(platform, extract_content(output, platform))
                     
                 # Debug info
                 with st.expander("Debug - Raw Output"):
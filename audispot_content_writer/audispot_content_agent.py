@@ -2,11 +2,22 @@
 # Step 0: Importing Libraries
 # -----------------------------------------------------
 import os
+import argparse
 import asyncio
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+import weakref
+import httpx
 from youtube_transcript_api import YouTubeTranscriptApi
-from agents import Agent, Runner, WebSearchTool, function_tool, ItemHelpers, trace
-from openai import OpenAI
+from agents import Agent, ModelSettings, Runner, WebSearchTool, function_tool, ItemHelpers, trace
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+from captions import CaptionStore
 from dotenv import load_dotenv
+from collections import OrderedDict
+from contextlib import closing
 from dataclasses import dataclass
 from typing import List
 import logging
@@ -17,21 +28,78 @@ import logging
 # -----------------------------------------------------
 load_dotenv()
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-client = OpenAI(api_key=OPENAI_API_KEY)
+
+# One pooled async client shared by all tool calls: connections stay open
+# between calls instead of a new client (and TLS handshake) per tool call.
+# The three tools run at once, so a handful of connections is plenty.
+HTTP_LIMITS = httpx.Limits(max_connections=20, max_keepalive_connections=10, keepalive_expiry=60)
+
+# An async client belongs to the event loop it first ran on, and every
+# asyncio.run() (e.g. each Streamlit click) starts a new loop
+_async_clients = weakref.WeakKeyDictionary()
+
+
+def get_async_client() -> AsyncOpenAI:
+    """The pooled AsyncOpenAI client for the running event loop"""
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        client = AsyncOpenAI(api_key=OPENAI_API_KEY,
+                             http_client=DefaultAsyncHttpxClient(limits=HTTP_LIMITS))
+        _async_clients[loop] = client
+    return client
+
 
 # -----------------------------------------------------
-# Step 2: Define SEPARATE tools for each platform
+# Step 2: Transcript store
 # -----------------------------------------------------
+# The run registers the transcript once and gives the orchestrator a short
+# ID. Tools look the transcript up here, so the orchestrator never has to
+# write it out again as the arguments of every tool call.
 
-@function_tool
-def create_linkedin_content(video_transcript: str):
-    """Creates professional LinkedIn content for automotive industry professionals"""
-    
-    client = OpenAI(api_key=OPENAI_API_KEY)
-    
-    linkedin_prompt = f"""Create a LinkedIn post for audispot254 (automotive account).
+MAX_TRANSCRIPTS = 32    # oldest transcripts are dropped beyond this
+_transcripts = OrderedDict()
+_transcripts_lock = threading.Lock()
+
+
+def register_transcript(transcript: str) -> str:
+    """Store a transcript and return its ID (a short content hash)"""
+    transcript_id = hashlib.sha256(transcript.encode("utf-8")).hexdigest()[:12]
+    with _transcripts_lock:
+        _transcripts[transcript_id] = transcript
+        _transcripts.move_to_end(transcript_id)
+        while len(_transcripts) > MAX_TRANSCRIPTS:
+            _transcripts.popitem(last=False)
+    return transcript_id
+
+
+def resolve_transcript(transcript_id: str) -> str:
+    """The transcript registered under an ID"""
+    with _transcripts_lock:
+        transcript = _transcripts.get(transcript_id.strip())
+    if transcript is None:
+        # The tool error goes back to the model, which can retry with the right ID
+        raise ValueError(f"Unknown transcript_id {transcript_id!r}: pass the ID from the user message unchanged")
+    return transcript
+
+
+# -----------------------------------------------------
+# Step 3: Platform prompts and saved posts
+# -----------------------------------------------------
+# Posts are saved per (transcript, platform, prompt version), so redoing one
+# weak post costs one model call and the other platforms come from the memo.
+# Only regenerate_platforms() reads the memo: the agent's tools always write
+# new posts (and save them), so "Generate" never shows an old set.
+# The version is a hash of the platform's prompt and model settings: editing
+# either starts a fresh set of posts for that platform only.
+
+PLATFORMS = {
+    "linkedin": {
+        "max_tokens": 450,
+        "temperature": 0.7,
+        "prompt": """Create a LinkedIn post for audispot254 (automotive account).
 
-TRANSCRIPT: {video_transcript}
+TRANSCRIPT: {transcript}
 
 LINKEDIN REQUIREMENTS:
 - AUDIENCE: Automotive professionals, engineers, business leaders
@@ -44,27 +112,14 @@ LINKEDIN REQUIREMENTS:
 
 Write as: "Recently analyzed this automotive review..." or "This technical breakdown highlights..."
 
-DO NOT write casual language or use emojis."""
-
-    response = client.chat.completions.create(
-        model="gpt-4o",
-        messages=[{"role": "user", "content": linkedin_prompt}],
-        max_tokens=450,
-        temperature=0.7
-    )
-    
-    return f"LINKEDIN POST:\n{response.choices[0].message.content}"
-
-
-@function_tool  
-def create_instagram_content(video_transcript: str):
-    """Creates engaging Instagram content for car enthusiasts and younger audience"""
-    
-    client = OpenAI(api_key=OPENAI_API_KEY)
-    
-    instagram_prompt = f"""Create an Instagram post for audispot254 (automotive account).
+DO NOT write casual language or use emojis.""",
+    },
+    "instagram": {
+        "max_tokens": 350,
+        "temperature": 0.8,
+        "prompt": """Create an Instagram post for audispot254 (automotive account).
 
-TRANSCRIPT: {video_transcript}
+TRANSCRIPT: {transcript}
 
 INSTAGRAM REQUIREMENTS:
 - AUDIENCE: Car enthusiasts, Gen Z/Millennial car lovers, visual-focused users
@@ -78,27 +133,14 @@ INSTAGRAM REQUIREMENTS:
 
 Write as: "Just watched this sick review! 🔥" or "This car is absolutely insane! 🚗💨"
 
-MUST use casual language and car slang."""
+MUST use casual language and car slang.""",
+    },
+    "twitter": {
+        "max_tokens": 200,
+        "temperature": 0.9,
+        "prompt": """Create a Twitter/X post for audispot254 (automotive account).
 
-    response = client.chat.completions.create(
-        model="gpt-4o",
-        messages=[{"role": "user", "content": instagram_prompt}],
-        max_tokens=350,
-        temperature=0.8
-    )
-    
-    return f"INSTAGRAM POST:\n{response.choices[0].message.content}"
-
-
-@function_tool
-def create_twitter_content(video_transcript: str):
-    """Creates concise Twitter content for quick engagement"""
-    
-    client = OpenAI(api_key=OPENAI_API_KEY)
-    
-    twitter_prompt = f"""Create a Twitter/X post for audispot254 (automotive account).
-
-TRANSCRIPT: {video_transcript}
+TRANSCRIPT: {transcript}
 
 TWITTER REQUIREMENTS:
 - AUDIENCE: Quick scrollers, debate starters, car Twitter community
@@ -111,20 +153,125 @@ TWITTER REQUIREMENTS:
 
 Write as: "Hot take:" or "This review proves..." or "Am I the only one who thinks..."
 
-MUST be under 250 characters total. Be bold and opinionated."""
+MUST be under 250 characters total. Be bold and opinionated.""",
+    },
+}
+POST_MODEL = "gpt-4o"
 
-    response = client.chat.completions.create(
-        model="gpt-4o",
-        messages=[{"role": "user", "content": twitter_prompt}],
-        max_tokens=200,
-        temperature=0.9
+POST_MEMO_PATH = os.getenv(
+    "POST_MEMO_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "posts.sqlite3"),
+)
+
+
+def prompt_version(platform: str) -> str:
+    spec = dict(PLATFORMS[platform], model=POST_MODEL)
+    return hashlib.sha256(json.dumps(spec, sort_keys=True).encode("utf-8")).hexdigest()[:8]
+
+
+_memo_ready = set()     # memo paths whose schema exists
+_memo_lock = threading.Lock()
+
+
+def _memo(sql: str, params: tuple = ()):
+    """Run one statement against the memo (blocking: call it via asyncio.to_thread from async code)"""
+    path = POST_MEMO_PATH
+    if path not in _memo_ready:
+        with _memo_lock:
+            if path not in _memo_ready:
+                os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+                with closing(sqlite3.connect(path, timeout=30)) as conn, conn:
+                    conn.execute("""CREATE TABLE IF NOT EXISTS posts (
+                        transcript_id TEXT, platform TEXT, prompt_version TEXT, content TEXT NOT NULL,
+                        created REAL NOT NULL, PRIMARY KEY (transcript_id, platform, prompt_version))""")
+                _memo_ready.add(path)
+    with closing(sqlite3.connect(path, timeout=30)) as conn, conn:
+        return conn.execute(sql, params).fetchone()
+
+
+def saved_post(transcript_id: str, platform: str):
+    """The saved post for this transcript and the current prompt, or None"""
+    row = _memo("SELECT content FROM posts WHERE transcript_id = ? AND platform = ? AND prompt_version = ?",
+                (transcript_id, platform, prompt_version(platform)))
+    return row[0] if row else None
+
+
+async def generate_post(platform: str, transcript_id: str, refresh: bool = False) -> str:
+    """One platform's post: the saved one, or a new one (always new with refresh=True)"""
+    # Memo reads and writes go to a thread: several posts are generated on one loop at once
+    if not refresh:
+        content = await asyncio.to_thread(saved_post, transcript_id, platform)
+        if content is not None:
+            return content
+    settings = PLATFORMS[platform]
+    response = await get_async_client().chat.completions.create(
+        model=POST_MODEL,
+        messages=[{"role": "user", "content": settings["prompt"].format(transcript=resolve_transcript(transcript_id))}],
+        max_tokens=settings["max_tokens"],
+        temperature=settings["temperature"]
     )
-    
-    return f"TWITTER POST:\n{response.choices[0].message.content}"
+    content = response.choices[0].message.content
+    await asyncio.to_thread(_memo, "INSERT OR REPLACE INTO posts VALUES (?, ?, ?, ?, ?)",
+                            (transcript_id, platform, prompt_version(platform), content, time.time()))
+    return content
+
+
+async def regenerate_platforms(transcript_id: str, platforms: List[str]) -> dict:
+    """Redo only the given platforms; the others reuse their saved posts
+
+    Returns platform -> post for every platform. Siblings with no saved post
+    yet are generated once, alongside the ones being redone; check
+    saved_post() beforehand to tell those apart from memo hits.
+    """
+    unknown = set(platforms) - set(PLATFORMS)
+    if unknown:
+        raise ValueError(f"Unknown platforms: {', '.join(sorted(unknown))}")
+    posts = await asyncio.gather(*(generate_post(platform, transcript_id, refresh=platform in platforms)
+                                   for platform in PLATFORMS))
+    return dict(zip(PLATFORMS, posts))
 
 
 # -----------------------------------------------------
-# Step 3: Create agent that MUST use all three tools
+# Step 4: Define SEPARATE tools for each platform
+# -----------------------------------------------------
+# Async tools: the runner awaits the three calls concurrently instead of
+# blocking its event loop on one request after another. Each takes a
+# transcript ID, so the call arguments stay a few tokens long. They always
+# generate a new post (refresh=True); the result is still saved for later
+# regenerate_platforms() calls.
+
+@function_tool
+async def create_linkedin_content(transcript_id: str):
+    """Creates professional LinkedIn content for automotive industry professionals
+
+    Args:
+        transcript_id: The transcript ID from the user message
+    """
+    return f"LINKEDIN POST:\n{await generate_post('linkedin', transcript_id, refresh=True)}"
+
+
+@function_tool  
+async def create_instagram_content(transcript_id: str):
+    """Creates engaging Instagram content for car enthusiasts and younger audience
+
+    Args:
+        transcript_id: The transcript ID from the user message
+    """
+    return f"INSTAGRAM POST:\n{await generate_post('instagram', transcript_id, refresh=True)}"
+
+
+@function_tool
+async def create_twitter_content(transcript_id: str):
+    """Creates concise Twitter content for quick engagement
+
+    Args:
+        transcript_id: The transcript ID from the user message
+    """
+    return f"TWITTER POST:\n{await generate_post('twitter', transcript_id, refresh=True)}"
+
+
+# -----------------------------------------------------
+# Step 5: Create agent that MUST use all three tools
 # -----------------------------------------------------
 
 content_creator_agent = Agent(
@@ -143,8 +290,12 @@ PLATFORM DIFFERENCES YOU MUST ENFORCE:
 - Instagram = Casual enthusiast excitement
 - Twitter = Sharp hot takes and debates
 
+Each tool takes the transcript_id given in the user message. Pass that ID exactly as given - never the transcript text.
+
 Your job is to call all three tools and return their distinct outputs. Do NOT write your own content - let the tools handle it.""",
     model="gpt-4o-mini",
+    # Let the model request all three tools in one turn; async tools then run concurrently
+    model_settings=ModelSettings(parallel_tool_calls=True),
     tools=[
         create_linkedin_content,
         create_instagram_content,
@@ -155,14 +306,23 @@ Your job is to call all three tools and return their distinct outputs. Do NOT wr
 
 
 # -----------------------------------------------------
-# Step 4: Helper function (unchanged)
+# Step 6: Helper function
 # -----------------------------------------------------
+# Transcripts ingested from caption files (ingest_captions.py) are read from
+# the local store; anything else is fetched from YouTube.
+
+caption_store = CaptionStore()
+
 
 def get_transcript(video_id: str) -> str:
     logging.basicConfig(filename='transcript_errors.log', level=logging.ERROR, format='%(asctime)s %(levelname)s:%(message)s')
+    stored = caption_store.get(video_id)
+    if stored is not None:
+        return stored.text
     try:
-        transcript_list = YouTubeTranscriptApi.get_transcript(video_id)
-        transcript_text = " ".join([entry['text'] for entry in transcript_list])
+        # The static YouTubeTranscriptApi.get_transcript is gone as of 1.2; fetch() exists since 1.0
+        fetched = YouTubeTranscriptApi().fetch(video_id)
+        transcript_text = " ".join(snippet.text for snippet in fetched)
         return transcript_text
     except Exception as e:
         import traceback
@@ -173,12 +333,28 @@ def get_transcript(video_id: str) -> str:
 
 
 # -----------------------------------------------------
-# Step 5: Main execution with clear instructions
+# Step 7: Main execution with clear instructions
 # -----------------------------------------------------
 
 async def main():
-    video_id = "6hr6wZr1N_8"
-    transcript = get_transcript(video_id)
+    parser = argparse.ArgumentParser(description="Create audispot254 posts for a YouTube video")
+    parser.add_argument("--video-id", default="6hr6wZr1N_8")
+    parser.add_argument("--regenerate", nargs="+", choices=list(PLATFORMS), metavar="PLATFORM",
+                        help="Redo only these platforms (linkedin, instagram, twitter); the others reuse their saved posts")
+    args = parser.parse_args()
+
+    transcript_id = register_transcript(get_transcript(args.video_id))
+
+    if args.regenerate:
+        # One model call per platform redone, no orchestrator run
+        saved = {platform for platform in PLATFORMS if saved_post(transcript_id, platform) is not None}
+        posts = await regenerate_platforms(transcript_id, args.regenerate)
+        print("="*60)
+        for platform, content in posts.items():
+            status = "regenerated" if platform in args.regenerate else "saved" if platform in saved else "new"
+            print(f"{platform.upper()} POST ({status}):\n{content}\n")
+        print("="*60)
+        return
 
     # Very specific instructions to force different content
     msg = f"""TASK: Create three completely different social media posts for audispot254.
@@ -190,7 +366,7 @@ REQUIREMENTS:
 
 Each post must target different audiences and have completely different tones. DO NOT create similar content.
 
-Video transcript: {transcript}
+Transcript ID: {transcript_id} (pass it to each tool; the tools look the transcript up themselves)
 
 Execute all three tools to generate platform-specific content."""
 
@@ -0,0 +1,189 @@
+# -----------------------------------------------------
+# Benchmark: blocking vs async platform tools
+# -----------------------------------------------------
+"""
+Runs the content agent against a local OpenAI-compatible stub server with
+the previous blocking tools (new OpenAI client per call), with async tools
+sharing the pooled client, and with the async tools taking a transcript ID
+instead of the transcript, and prints the latency of each. Blocking tools
+are measured twice: called on the event loop, as openai-agents 0.0.19 (the
+version in uv.lock) does, and in worker threads, as newer releases do.
+
+Usage:
+    python benchmark_tools.py
+    python benchmark_tools.py --latency 1.0 --runs 5 --transcript-chars 40000
+
+The stub answers the orchestrator with one call to every tool, then echoes
+the tool results as the final answer; platform prompts wait --latency
+seconds and get a canned post. The orchestrator's tool calls take
+--per-token-latency per argument token (about 4 characters), like a model
+writing them out. No API key or network is needed.
+"""
+import argparse
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        messages = body.get("messages", [])
+        message = {"role": "assistant", "content": None}
+        tool_results = [m.get("content") or "" for m in messages if m.get("role") == "tool"]
+        if body.get("tools") and not tool_results:
+            # Orchestrator turn: call every platform tool at once, filling in
+            # whichever argument the tool declares from the user message
+            message["tool_calls"] = [
+                {"id": f"call_{i}", "type": "function",
+                 "function": {"name": tool["function"]["name"],
+                              "arguments": json.dumps(tool_arguments(tool, messages[-1].get("content") or ""))}}
+                for i, tool in enumerate(body["tools"]) if tool.get("type") == "function"
+            ]
+            written = sum(len(call["function"]["arguments"]) for call in message["tool_calls"])
+            self.server.argument_chars += written
+            time.sleep(written / 4 * self.server.per_token_latency)
+        elif body.get("tools"):
+            message["content"] = "\n\n".join(str(r) for r in tool_results)
+        else:
+            time.sleep(self.server.latency)
+            message["content"] = "Hot take: this review proves the RS6 is the only car you need. #Audi #CarTwitter"
+        payload = json.dumps({
+            "id": "stub", "object": "chat.completion", "created": int(time.time()), "model": body.get("model"),
+            "choices": [{"index": 0, "message": message,
+                         "finish_reason": "tool_calls" if message.get("tool_calls") else "stop"}],
+            "usage": {"prompt_tokens": 10, "completion_tokens": 10, "total_tokens": 20},
+        }).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+def tool_arguments(tool: dict, user_message: str) -> dict:
+    params = tool["function"].get("parameters", {}).get("properties", {})
+    if "transcript_id" in params:
+        match = re.search(r"Transcript ID: (\w+)", user_message)
+        return {"transcript_id": match.group(1) if match else ""}
+    return {"video_transcript": user_message.split("Video transcript: ", 1)[-1]}
+
+
+def start_stub(latency: float, per_token_latency: float) -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    server.daemon_threads = True
+    server.latency = latency
+    server.per_token_latency = per_token_latency
+    server.argument_chars = 0
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Blocking vs async platform tools against a local stub")
+    parser.add_argument("--latency", type=float, default=0.5, help="Stub latency per platform post (seconds)")
+    parser.add_argument("--per-token-latency", type=float, default=0.0005,
+                        help="Stub time per tool-argument token the orchestrator writes (seconds)")
+    parser.add_argument("--transcript-chars", type=int, default=8000)
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    server = start_stub(args.latency, args.per_token_latency)
+    base_url = f"http://127.0.0.1:{server.server_address[1]}/v1"
+    # Every client in the agent module, the pooled one included, picks these up
+    os.environ["OPENAI_BASE_URL"] = base_url
+    os.environ["OPENAI_API_KEY"] = "stub"
+    # Keep the benchmark's posts out of the real memo
+    memo_dir = tempfile.TemporaryDirectory()
+
+    import asyncio
+    from agents import RunConfig, Runner, function_tool
+    from agents.models.openai_provider import OpenAIProvider
+    from openai import OpenAI
+    import audispot_content_agent as agent_module
+
+    sentence = "The RS6 Avant pairs a 4.0 litre twin-turbo V8 with quattro and a practical estate body. "
+    transcript = (sentence * (args.transcript_chars // len(sentence) + 1))[:args.transcript_chars]
+    inline_message = f"Video transcript: {transcript}"
+    by_id_message = f"Transcript ID: {agent_module.register_transcript(transcript)}"
+
+    def previous_tool(video_transcript: str):
+        """The previous tool body: a new client and a blocking request per call"""
+        client = OpenAI(api_key="stub")
+        response = client.chat.completions.create(
+            model="gpt-4o", messages=[{"role": "user", "content": video_transcript}], max_tokens=200,
+        )
+        return response.choices[0].message.content
+
+    def blocking_tool(name: str, in_loop: bool):
+        if in_loop:
+            # openai-agents 0.0.19 (uv.lock) calls sync tools on the event loop thread
+            async def tool(video_transcript: str):
+                return previous_tool(video_transcript)
+        else:
+            # Newer releases run sync tools in worker threads
+            def tool(video_transcript: str):
+                return previous_tool(video_transcript)
+        tool.__name__ = f"create_{name}_content"
+        return function_tool(tool)
+
+    def inline_tool(name: str):
+        """The async pooled tool as it was before transcript IDs"""
+        async def tool(video_transcript: str):
+            response = await agent_module.get_async_client().chat.completions.create(
+                model="gpt-4o", messages=[{"role": "user", "content": video_transcript}], max_tokens=200,
+            )
+            return response.choices[0].message.content
+        tool.__name__ = f"create_{name}_content"
+        return function_tool(tool)
+
+    platforms = ("linkedin", "instagram", "twitter")
+    # The hosted web search tool needs the Responses API, which the stub doesn't serve
+    variants = {
+        "sync, in loop": (agent_module.content_creator_agent.clone(
+            tools=[blocking_tool(name, in_loop=True) for name in platforms]), inline_message),
+        "sync, threaded": (agent_module.content_creator_agent.clone(
+            tools=[blocking_tool(name, in_loop=False) for name in platforms]), inline_message),
+        "async, pooled": (agent_module.content_creator_agent.clone(
+            tools=[inline_tool(name) for name in platforms]), inline_message),
+        "async, by ID": (agent_module.content_creator_agent.clone(
+            tools=[agent_module.create_linkedin_content, agent_module.create_instagram_content,
+                   agent_module.create_twitter_content]), by_id_message),
+    }
+    run_config = RunConfig(
+        model_provider=OpenAIProvider(base_url=base_url, api_key="stub", use_responses=False),
+        tracing_disabled=True,
+    )
+
+    print("=" * 60)
+    print(f"Tool latency benchmark (stub: {args.latency:.2f}s per post, "
+          f"{args.transcript_chars:,}-char transcript, {args.runs} runs)")
+    print("=" * 60)
+    results = {}
+    for label, (agent, message) in variants.items():
+        times = []
+        server.argument_chars = 0
+        for run in range(args.runs):
+            agent_module.POST_MEMO_PATH = os.path.join(memo_dir.name, f"{label}-{run}.sqlite3")
+            started = time.perf_counter()
+            asyncio.run(Runner.run(agent, message, run_config=run_config))
+            times.append(time.perf_counter() - started)
+        results[label] = min(times)
+        print(f"{label:<16} best {min(times):.2f}s   mean {sum(times) / len(times):.2f}s   "
+              f"tool args {server.argument_chars // args.runs:,} chars")
+    for label in ("sync, in loop", "sync, threaded", "async, pooled"):
+        print(f"async, by ID vs {label}: {results[label] / results['async, by ID']:.1f}x faster")
+    print("=" * 60)
+    server.shutdown()
+    memo_dir.cleanup()
+
+
+if __name__ == "__main__":
+    main()
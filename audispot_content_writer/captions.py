@@ -0,0 +1,208 @@
+# -----------------------------------------------------
+# Caption files and the local transcript store
+# -----------------------------------------------------
+"""
+Parse downloaded .srt / .vtt caption files and keep them in a compact SQLite
+store, so generation can read transcripts locally instead of from YouTube.
+
+The parser streams: it reads a file line by line and yields one cue at a
+time, so memory stays flat however long the video is. Each stored transcript
+is its plain text (zlib-compressed) plus three int32 arrays: cue start and
+end in milliseconds, and the character offset of each cue in the text.
+
+Files are stored under the YouTube video ID, taken from the "[id]" that
+yt-dlp puts in file names, else from the name up to the first dot
+("6hr6wZr1N_8.en.vtt" -> "6hr6wZr1N_8"). One transcript per video ID: when
+several files share an ID, ingest keeps the most recently modified one (the
+path breaks ties) and reports the others.
+"""
+import html
+import os
+import re
+import sqlite3
+import zlib
+from array import array
+from contextlib import closing
+from dataclasses import dataclass
+from typing import Iterable, Iterator, Optional, Tuple
+
+CAPTION_EXTENSIONS = (".srt", ".vtt")
+DEFAULT_STORE_PATH = os.getenv(
+    "CAPTION_STORE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "captions.sqlite3"),
+)
+
+_TIMING = re.compile(
+    r"(?:(\d+):)?(\d{1,2}):(\d{2})[,.](\d{3})\s*-->\s*(?:(\d+):)?(\d{1,2}):(\d{2})[,.](\d{3})"
+)
+_TAG = re.compile(r"<[^>]*>")          # <i>, <font ...>, <v Speaker>, <c>, <00:00:01.000>
+_VIDEO_ID = re.compile(r"\[([\w-]{11})\]")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS transcripts (
+    video_id  TEXT PRIMARY KEY,
+    source    TEXT NOT NULL,
+    size      INTEGER NOT NULL,
+    mtime     REAL NOT NULL,
+    cues      INTEGER NOT NULL,
+    text      BLOB NOT NULL,
+    starts    BLOB NOT NULL,
+    ends      BLOB NOT NULL,
+    offsets   BLOB NOT NULL
+)
+"""
+
+
+def _ms(hours, minutes, seconds, millis) -> int:
+    return ((int(hours or 0) * 60 + int(minutes)) * 60 + int(seconds)) * 1000 + int(millis)
+
+
+def iter_cues(lines: Iterable[str]) -> Iterator[Tuple[int, int, str]]:
+    """Yield (start_ms, end_ms, text) for each cue of an SRT or WebVTT file
+
+    Markup is stripped and entities decoded. A line repeating the line just
+    before it is dropped: YouTube's auto-captions roll each line over into
+    the next cue, which would otherwise double the text.
+    """
+    start = end = None
+    text = []
+    previous = None
+    skip = False    # inside a WebVTT NOTE / STYLE / REGION block
+    for line in lines:
+        line = line.strip()
+        if not line:
+            if start is not None and text:
+                yield start, end, " ".join(text)
+            start, text, skip = None, [], False
+            continue
+        if skip:
+            continue
+        timing = _TIMING.match(line) if "-->" in line else None
+        if timing:
+            if start is not None and text:
+                # Cue with no blank line before the next timing line
+                yield start, end, " ".join(text)
+            groups = timing.groups()
+            start, end, text = _ms(*groups[:4]), _ms(*groups[4:]), []
+            continue
+        if start is None:
+            # WEBVTT header, SRT / WebVTT cue number or identifier, comment block
+            skip = line.startswith(("NOTE", "STYLE", "REGION"))
+            continue
+        # Most lines carry no markup; skip the regex and unescape for them
+        cleaned = _TAG.sub("", line).strip() if "<" in line else line
+        if "&" in cleaned:
+            cleaned = html.unescape(cleaned)
+        if cleaned and cleaned != previous:
+            text.append(cleaned)
+            previous = cleaned
+    if start is not None and text:
+        yield start, end, " ".join(text)
+
+
+def video_id_for(path: str) -> str:
+    name = os.path.basename(path)
+    match = _VIDEO_ID.search(name)
+    return match.group(1) if match else name.split(".", 1)[0]
+
+
+@dataclass
+class Transcript:
+    video_id: str
+    text: str
+    starts: array       # cue start, ms
+    ends: array         # cue end, ms
+    offsets: array      # cue start, characters into text
+
+    def cue(self, i: int) -> Tuple[int, int, str]:
+        """(start_ms, end_ms, text) of cue i"""
+        stop = self.offsets[i + 1] - 1 if i + 1 < len(self.offsets) else len(self.text)
+        return self.starts[i], self.ends[i], self.text[self.offsets[i]:stop]
+
+
+def parse_file(path: str) -> dict:
+    """Parse one caption file into a store row (runs in ingest worker processes)"""
+    stat = os.stat(path)
+    parts = []
+    starts, ends, offsets = array("i"), array("i"), array("i")
+    length = 0
+    # utf-8-sig drops the byte order mark some subtitle tools write
+    with open(path, encoding="utf-8-sig", errors="replace") as f:
+        for start, end, text in iter_cues(f):
+            starts.append(start)
+            ends.append(end)
+            offsets.append(length)
+            parts.append(text)
+            length += len(text) + 1
+    return {
+        "video_id": video_id_for(path),
+        "source": path,
+        "size": stat.st_size,
+        "mtime": stat.st_mtime,
+        "cues": len(parts),
+        "text": zlib.compress(" ".join(parts).encode("utf-8")),
+        "starts": starts.tobytes(),
+        "ends": ends.tobytes(),
+        "offsets": offsets.tobytes(),
+    }
+
+
+def iter_caption_files(root: str) -> Iterator[str]:
+    """Every .srt / .vtt file under root, walked lazily"""
+    for dirpath, _, filenames in os.walk(root):
+        for name in filenames:
+            if name.lower().endswith(CAPTION_EXTENSIONS):
+                yield os.path.join(dirpath, name)
+
+
+class CaptionStore:
+    """Parsed transcripts in SQLite, one row per video ID"""
+
+    def __init__(self, path: str = DEFAULT_STORE_PATH):
+        self.path = path
+
+    def _connect(self) -> sqlite3.Connection:
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(_SCHEMA)
+        return conn
+
+    def known_files(self) -> dict:
+        """video ID -> (source, size, mtime) of every stored file, to skip unchanged ones"""
+        if not os.path.exists(self.path):
+            return {}
+        with closing(self._connect()) as conn:
+            return {video_id: (source, size, mtime) for video_id, source, size, mtime in
+                    conn.execute("SELECT video_id, source, size, mtime FROM transcripts")}
+
+    def put_many(self, rows: Iterable[dict]):
+        with closing(self._connect()) as conn, conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO transcripts VALUES "
+                "(:video_id, :source, :size, :mtime, :cues, :text, :starts, :ends, :offsets)",
+                rows,
+            )
+
+    def get(self, video_id: str) -> Optional[Transcript]:
+        if not os.path.exists(self.path):
+            return None
+        with closing(self._connect()) as conn:
+            row = conn.execute(
+                "SELECT text, starts, ends, offsets FROM transcripts WHERE video_id = ?", (video_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        text, *timings = row
+        arrays = []
+        for blob in timings:
+            values = array("i")
+            values.frombytes(blob)
+            arrays.append(values)
+        return Transcript(video_id, zlib.decompress(text).decode("utf-8"), *arrays)
+
+    def __len__(self) -> int:
+        if not os.path.exists(self.path):
+            return 0
+        with closing(self._connect()) as conn:
+            return conn.execute("SELECT COUNT(*) FROM transcripts").fetchone()[0]
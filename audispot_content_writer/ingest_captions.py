@@ -0,0 +1,117 @@
+# -----------------------------------------------------
+# Bulk caption ingestion
+# -----------------------------------------------------
+"""
+Parse a directory tree of downloaded .srt / .vtt files in worker processes
+and write them to the local transcript store (see captions.py). Files whose
+size and modification time match the stored copy are skipped, so re-running
+over a growing archive only parses the new files.
+
+Several files for one video ID (other languages, .srt next to .vtt) are
+resolved before parsing: the most recently modified one wins, the path
+breaks ties, and the rest are listed as duplicates. The stored row is then
+the same whatever order the files are found in, and an unchanged winner is
+skipped on the next run like any other file.
+
+Usage:
+    python ingest_captions.py captions/
+    python ingest_captions.py captions/ --workers 8 --store .cache/captions.sqlite3
+
+Generation then reads transcripts from the store: get_transcript() in
+audispot_content_agent.py only goes to YouTube for videos not in it.
+"""
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from captions import DEFAULT_STORE_PATH, CaptionStore, iter_caption_files, parse_file, video_id_for
+
+BATCH_SIZE = 500    # rows per store transaction
+CHUNK_SIZE = 16     # files per task sent to a worker
+
+
+def _parse(path: str):
+    try:
+        return parse_file(path), None
+    except Exception as e:
+        return None, f"{path}: {type(e).__name__}: {e}"
+
+
+def ingest(root: str, store: CaptionStore, workers: int) -> dict:
+    """Parse every new or changed caption file under root into the store"""
+    known = store.known_files()
+    # One file per video ID: newest first, then by path, so the winner doesn't
+    # depend on walk order. Absolute paths, so the unchanged-file check works
+    # from any directory.
+    newest = {}     # video ID -> (mtime, path, size)
+    duplicates = []
+    for path in iter_caption_files(os.path.abspath(root)):
+        stat = os.stat(path)
+        candidate = (stat.st_mtime, path, stat.st_size)
+        video_id = video_id_for(path)
+        current = newest.get(video_id)
+        if current is not None:
+            winner, loser = max(current, candidate), min(current, candidate)
+            duplicates.append(f"{video_id}: {loser[1]} (using {winner[1]})")
+            candidate = winner
+        newest[video_id] = candidate
+
+    paths, skipped = [], 0
+    for video_id, (mtime, path, size) in newest.items():
+        if known.get(video_id) == (path, size, mtime):
+            skipped += 1
+        else:
+            paths.append(path)
+
+    started = time.perf_counter()
+    parsed, failed, cues, size, batch = 0, [], 0, 0, []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for row, error in pool.map(_parse, paths, chunksize=CHUNK_SIZE):
+            if error:
+                failed.append(error)
+                continue
+            parsed += 1
+            cues += row["cues"]
+            size += row["size"]
+            batch.append(row)
+            if len(batch) >= BATCH_SIZE:
+                store.put_many(batch)
+                batch = []
+    if batch:
+        store.put_many(batch)
+    elapsed = time.perf_counter() - started
+    return {"parsed": parsed, "skipped": skipped, "failed": failed, "duplicates": duplicates,
+            "cues": cues, "bytes": size, "seconds": elapsed}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Parse .srt / .vtt files into the local transcript store")
+    parser.add_argument("root", help="Directory to scan (recursively)")
+    parser.add_argument("--store", default=DEFAULT_STORE_PATH)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    store = CaptionStore(args.store)
+    stats = ingest(args.root, store, args.workers)
+    seconds = max(stats["seconds"], 1e-9)
+    mb = stats["bytes"] / 1e6
+
+    print("=" * 60)
+    print(f"Ingested {stats['parsed']:,} files ({mb:,.1f} MB, {stats['cues']:,} cues) "
+          f"with {args.workers} workers in {stats['seconds']:.2f}s")
+    print(f"Throughput: {stats['parsed'] / seconds:,.0f} files/s, {mb / seconds:,.1f} MB/s")
+    print(f"Skipped (unchanged): {stats['skipped']:,}   Failed: {len(stats['failed']):,}")
+    for error in stats["failed"][:10]:
+        print(f"  {error}")
+    if stats["duplicates"]:
+        print(f"Duplicate video IDs, ignored: {len(stats['duplicates']):,}")
+        for duplicate in stats["duplicates"][:10]:
+            print(f"  {duplicate}")
+    store_mb = os.path.getsize(args.store) / 1e6 if os.path.exists(args.store) else 0
+    print(f"Store: {args.store} ({len(store):,} transcripts, {store_mb:,.1f} MB)")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,21 +1,41 @@
 import streamlit as st
 import asyncio
-import json
+import time
+from jobs import Job, JobQueue
+from json_extract import index_platform_posts
+from compress import compression_summary
 from content_agent import (
-    get_transcript, 
+    get_compressed_transcript,
+    transcript_cache,
     create_content_agent,
-    generate_content_simple,
-    Runner,
-    RunConfig,
-    ItemHelpers, 
-    trace,
+    generate_content_async,
+    stream_content_async,
+    generate_content_combined_async,
+    condense_for_prompts,
+    dispatch_tools_direct,
+    get_llm_client,
+    metrics,
+    prompts,
+    rate_limiter,
     PROVIDER,
     OPENAI_MODEL,
     OLLAMA_MODEL,
     USE_OPENAI,
-    ollama_provider
+    ORCHESTRATION
 )
 
+
+# One worker pool per server process: every session's generations run on its
+# persistent event loop instead of an asyncio.run() in the script thread
+@st.cache_resource(show_spinner=False)
+def load_job_queue():
+    return JobQueue(metrics=metrics)
+
+
+# How often a session redraws a running job's partial output
+JOB_POLL_SECONDS = 0.25
+
+
 st.set_page_config(
     page_title="audispot254 Content Generator", 
     layout="centered", 
@@ -121,6 +141,25 @@ with st.container():
     with col_t:
         twitter = st.checkbox("Twitter", value=False)
     
+    combined = st.checkbox(
+        "⚡ Single request (send transcript once)",
+        value=False,
+        help="Generate all platforms in one LLM call. Platforms missing from the response are regenerated individually."
+    )
+    regenerate = st.checkbox(
+        "🔄 Regenerate (ignore cached responses)",
+        value=False,
+        help="Identical requests are served from the response cache. Tick to call the model again."
+    )
+    agent_mode = False
+    if USE_OPENAI:
+        agent_mode = st.checkbox(
+            "🧠 Agent orchestration (free-form, slower)",
+            value=ORCHESTRATION == "agent",
+            help="Let a gpt-4o-mini agent decide how to call the platform tools. "
+                 "Off: the tools are called directly in parallel, skipping the orchestrator's model round trips."
+        )
+    
     st.markdown('</div>', unsafe_allow_html=True)
 
 # Collect selected platforms
@@ -133,61 +172,34 @@ if twitter:
     platforms.append("Twitter")
 
 
-def parse_json_content(output: str, platform: str) -> dict:
-    """Parse JSON output from agent, with fallback handling"""
-    try:
-        # Try to parse as JSON array
-        data = json.loads(output)
-        if isinstance(data, list):
-            for item in data:
-                if isinstance(item, dict) and item.get("platform", "").lower() == platform.lower():
-                    return item
-        # Try as single JSON object
-        if isinstance(data, dict) and data.get("platform", "").lower() == platform.lower():
-            return data
-    except json.JSONDecodeError:
-        pass
-    
-    # Try splitting by newlines (for generate_content_simple output)
-    lines = output.split('\n\n')
-    for line in lines:
-        line = line.strip()
-        if not line:
-            continue
-        try:
-            data = json.loads(line)
-            if isinstance(data, dict) and data.get("platform", "").lower() == platform.lower():
-                return data
-        except json.JSONDecodeError:
-            continue
-    
-    # Fallback: search for JSON objects in text using regex
-    import re
-    # More robust pattern that handles nested content with escaped quotes
-    json_pattern = r'\{"platform"\s*:\s*"' + platform + r'"[^}]*(?:"content"\s*:\s*"(?:[^"\\]|\\.)*")[^}]*\}'
-    matches = re.findall(json_pattern, output, re.IGNORECASE | re.DOTALL)
-    if matches:
-        try:
-            return json.loads(matches[0])
-        except:
-            pass
-    
-    # Last resort: return raw content
-    return {"platform": platform, "content": output, "error": "Could not parse JSON"}
+def parse_json_content(output: str, platforms: list[str]) -> dict[str, dict]:
+    """Index the agent output once; platform -> post, raw output for platforms not found"""
+    posts = index_platform_posts(output)
+    return {
+        platform: posts.get(platform.lower())
+        or {"platform": platform, "content": output, "error": "Could not parse JSON"}
+        for platform in platforms
+    }
 
 
-def display_platform_content(platform: str, content_data: dict):
-    """Display content card for a platform"""
+def display_platform_content(platform: str, content_data: dict, placeholder=None):
+    """Display content card for a platform (into `placeholder` to redraw it in place)"""
     import html
     content = content_data.get("content", "No content generated")
     char_count = content_data.get("char_count", len(content))
+    target = placeholder.container() if placeholder is not None else st
     
-    st.markdown(f'<div class="output-card">', unsafe_allow_html=True)
+    # A failed request (e.g. still rate limited after retries) is an error, not a post
+    if "error" in content_data and "content" not in content_data:
+        target.error(f"❌ {platform}: {content_data['error']}")
+        return
+
+    target.markdown(f'<div class="output-card">', unsafe_allow_html=True)
     
     # Platform header with emoji
     platform_emoji = {"LinkedIn": "💼", "Instagram": "📸", "Twitter": "🐦"}
     emoji = platform_emoji.get(platform, "📱")
-    st.markdown(
+    target.markdown(
         f'<div class="platform-header">{emoji} {platform} Post</div>', 
         unsafe_allow_html=True
     )
@@ -195,36 +207,78 @@ def display_platform_content(platform: str, content_data: dict):
     # Character count (with warning for Twitter)
     if platform == "Twitter":
         warning_class = "char-warning" if char_count > 280 else ""
-        st.markdown(
+        target.markdown(
             f'<div class="char-count {warning_class}">Character count: {char_count}/280</div>',
             unsafe_allow_html=True
         )
         if char_count > 280:
-            st.warning("⚠️ Tweet exceeds 280 characters. Consider shortening.")
+            target.warning("⚠️ Tweet exceeds 280 characters. Consider shortening.")
     
     # Copy instruction
-    st.markdown(
+    target.markdown(
         '<div class="copy-note">📋 Select text and copy (Ctrl+C or ⌘+C)</div>', 
         unsafe_allow_html=True
     )
     
     # Content display - HTML escape to prevent rendering JSON/special chars
     escaped_content = html.escape(content)
-    st.markdown(f'<div class="content-box">{escaped_content}</div>', unsafe_allow_html=True)
-    st.markdown('</div>', unsafe_allow_html=True)
+    target.markdown(f'<div class="content-box">{escaped_content}</div>', unsafe_allow_html=True)
+    target.markdown('</div>', unsafe_allow_html=True)
+
+
+async def run_agent(query: str, video_id: str, platforms: list[str], combined: bool = False,
+                    on_update=None, regenerate: bool = False, agent_mode: bool = False,
+                    stats: dict = None) -> str:
+    """Run the content generation agent
+
+    on_update(platform, partial_content) receives streamed text on the direct
+    per-platform path; the combined and agent paths return complete output only.
+    regenerate skips the LLM response cache for this run. agent_mode uses the
+    agents-framework orchestrator instead of calling the tools directly (OpenAI only).
+    If given, stats is filled with the run's latency, model calls and output tokens.
+    """
+    # get_llm_client() is memoised per process, so every session and the job
+    # queue's thread share one client
+    llm_client = get_llm_client()
+    stats = {} if stats is None else stats
+    usage_before = dict(llm_client.usage)
+    started = time.perf_counter()
+    try:
+        with llm_client.bypass_cache(regenerate):
+            return await _run_agent(query, video_id, platforms, combined, on_update, agent_mode, stats)
+    finally:
+        stats["elapsed"] = time.perf_counter() - started
+        stats["calls"] = llm_client.usage["calls"] - usage_before["calls"]
+        stats["output_tokens"] = llm_client.usage["completion_tokens"] - usage_before["completion_tokens"]
 
 
-async def run_agent(query: str, video_id: str, platforms: list[str]) -> str:
-    """Run the content generation agent"""
-    transcript = get_transcript(video_id)
+async def _run_agent(query: str, video_id: str, platforms: list[str], combined: bool, on_update,
+                     agent_mode: bool, stats: dict) -> str:
+    # Drop filler windows locally, then condense what's left with the LLM if still long.
+    # The fetch and cache I/O block, so they run in a thread: the job loop is shared by every session
+    transcript, compression = await asyncio.to_thread(get_compressed_transcript, video_id)
     if not transcript:
         return "ERROR: Could not fetch transcript. Please check the video ID."
+    stats["transcript"] = compression_summary(compression)
     
-    # Use simple generation for Ollama (agents framework doesn't support Ollama well)
+    # Condense long transcripts into a bounded facts digest before any platform prompt
+    digest = await condense_for_prompts(transcript)
+    
+    # Single-request mode: transcript is sent once for all platforms
+    if combined:
+        return await generate_content_combined_async(digest, platforms)
+    
+    # Use direct concurrent generation for Ollama (agents framework doesn't support Ollama well)
     if not USE_OPENAI:
-        output = generate_content_simple(transcript, platforms)
+        if on_update is not None:
+            return await stream_content_async(digest, platforms, on_update)
+        output = await generate_content_async(digest, platforms)
         return output
     
+    # Deterministic orchestration: call the platform tools directly, traced like the agent
+    if not agent_mode:
+        return await dispatch_tools_direct(digest, platforms, on_update, instructions=query)
+    
     # Use agents framework for OpenAI
     platform_list = ", ".join(platforms)
     msg = f"""{query}
@@ -233,45 +287,196 @@ Target platforms: {platform_list}
 
 Create SHORT, engaging posts (not long content) from audispot254's perspective.
 
-Video Transcript:
-{transcript}"""
+Video Transcript (key facts):
+{digest}"""
     
     input_items = [{"content": msg, "role": "user"}]
     
     # Create agent with only selected platforms
     agent = create_content_agent(platforms)
+    from agents import Runner, ItemHelpers, trace
     
     with trace("Generating content"):
         result = await Runner.run(agent, input_items)
         output = ItemHelpers.text_message_outputs(result.new_items)
+        # The orchestrator's own calls bypass LLMClient; report them separately
+        usage = result.context_wrapper.usage
+        stats["orchestrator"] = {"calls": usage.requests, "output_tokens": usage.output_tokens}
         return output
 
 
-# Generate button
+def show_debug(job: Job):
+    """Raw output plus run, cache, rate-limit and telemetry statistics"""
+    output, stats = job.output, job.stats
+    with st.expander("🔍 Debug - Raw Output"):
+        st.code(output, language="text")
+        orchestrator = stats.get("orchestrator")
+        st.caption(
+            f"Run: {stats['elapsed']:.2f}s, {stats['calls']} tool model calls, "
+            f"{stats['output_tokens']} output tokens"
+            + (f"; orchestrator: {orchestrator['calls']} calls, {orchestrator['output_tokens']} output tokens"
+               if orchestrator else "; orchestrator: skipped")
+        )
+        if stats.get("transcript"):
+            st.caption(f"Transcript: {stats['transcript']}")
+        job_stats = load_job_queue().stats()
+        st.caption(
+            f"Job {job.id}: waited {job.wait:.2f}s for a worker, ran {job.runtime:.2f}s; "
+            f"{job_stats['running']}/{job_stats['max_concurrent']} workers busy, {job_stats['queued']} queued"
+        )
+        cache_stats = transcript_cache.stats()
+        st.caption(
+            f"Transcript cache: {cache_stats['hits']} hits, "
+            f"{cache_stats['misses']} misses, {cache_stats['negative_hits']} cached failures, "
+            f"{cache_stats['entries']} entries ({cache_stats['bytes'] / 1024:.0f} KB)"
+        )
+        llm_client = get_llm_client()
+        if llm_client.cache is not None:
+            response_stats = llm_client.cache.stats()
+            st.caption(
+                f"Response cache: {response_stats['hit_rate']:.0%} hit rate "
+                f"({response_stats['hits']} hits, {response_stats['misses']} misses), "
+                f"{response_stats['entries']} entries ({response_stats['bytes'] / 1024:.0f} KB), "
+                f"{response_stats['saved_latency']:.1f}s of model time saved"
+            )
+        prompt_cache = prompts.totals()
+        if prompt_cache["calls"]:
+            st.caption(
+                f"Provider prompt cache: {prompt_cache['cache_hit_rate']:.0%} of prompt tokens "
+                f"cached ({prompt_cache['cached_tokens']} of {prompt_cache['prompt_tokens']})"
+            )
+        for key, bucket in rate_limiter.stats().items():
+            available = []
+            if bucket["rpm"]:
+                available.append(f"{bucket['requests_available']:.0f}/{bucket['rpm']} requests")
+            if bucket["tpm"]:
+                available.append(f"{bucket['tokens_available']:.0f}/{bucket['tpm']} tokens")
+            if bucket["blocked_for"]:
+                available.append(f"paused {bucket['blocked_for']:.0f}s by the provider")
+            st.caption(f"Rate limit {key}: " + ", ".join(available))
+        if len(llm_client.router.backends) > 1:
+            routing = llm_client.router.stats()
+            for name, b in routing["backends"].items():
+                p50 = f"{b['p50']:.2f}s" if b["p50"] is not None else "n/a"
+                st.caption(
+                    f"Backend {name}: {b['requests']} requests, p50 {p50}, "
+                    f"{b['error_rate']:.0%} errors, {b['hedges_won']} hedges won"
+                    + ("" if b["healthy"] else " (cooling down)")
+                )
+
+        # Per-call telemetry for this server process
+        calls = metrics.summary()
+        if calls:
+            fmt = lambda v: f"{v:.2f}s" if v is not None else "n/a"
+            st.markdown("**LLM calls (since server start)**")
+            st.table([
+                {
+                    "Provider": row["provider"],
+                    "Model": row["model"],
+                    "Calls": int(row["calls"]),
+                    "Errors": int(row["errors"]),
+                    "Cached": int(row["cached"]),
+                    "Retries": int(row["retries"]),
+                    "Prompt tok": int(row["prompt_tokens"]),
+                    "Compl tok": int(row["completion_tokens"]),
+                    "Cached tok": int(row["cached_tokens"]),
+                    "p50": fmt(row["latency_p50"]),
+                    "p95": fmt(row["latency_p95"]),
+                    "TTFB": fmt(row["ttfb_mean"]),
+                    "Queue": fmt(row["queue_wait_mean"]),
+                }
+                for row in calls
+            ])
+            fallbacks = metrics.parse_fallbacks()
+            if fallbacks:
+                st.caption("Parse fallbacks: " + ", ".join(
+                    f"{level} {int(count)}" for level, count in sorted(fallbacks.items())
+                ))
+
+
+def show_job(job_id: str):
+    """Render a generation job: live partial output while it runs, the posts once done"""
+    job_queue = load_job_queue()
+    job = job_queue.get(job_id)
+    if job is None:
+        st.warning("⚠️ This generation is no longer available. Please generate again.")
+        return
+
+    job_platforms = job.params["platforms"]
+    # Cards are drawn as soon as tokens arrive, then redrawn with the parsed result
+    results_area = st.empty()
+    with results_area.container():
+        st.markdown("---")
+        st.markdown("## ✨ Generated Content")
+        status = st.empty()
+        placeholders = {platform: st.empty() for platform in job_platforms}
+
+    if job.active:
+        if st.button("✖️ Cancel", key=f"cancel-{job.id}"):
+            job_queue.cancel(job.id)
+        # Poll the job; any widget interaction reruns the script, which re-attaches here
+        shown = {}
+        while job.active:
+            if job.status == "queued":
+                status.info(f"⏳ Waiting for a free worker ({job_queue.position(job.id)} ahead of you)...")
+            else:
+                status.info(f"⏳ Generating content using {PROVIDER.upper()}... "
+                            f"{time.time() - job.started:.0f}s")
+            for platform, partial_content in list(job.partial.items()):
+                if shown.get(platform) != len(partial_content) and platform in placeholders:
+                    shown[platform] = len(partial_content)
+                    display_platform_content(platform, {"content": partial_content + " ▌"}, placeholders[platform])
+            time.sleep(JOB_POLL_SECONDS)
+        status.empty()
+
+    output = job.output
+    if job.status == "cancelled":
+        results_area.empty()
+        st.warning("✖️ Generation cancelled")
+    elif job.status == "failed":
+        results_area.empty()
+        st.error(f"❌ Generation failed: {job.error}")
+    elif output and not output.startswith("ERROR:"):
+        # Display content for each platform
+        posts = parse_json_content(output, job_platforms)
+        for platform in job_platforms:
+            display_platform_content(platform, posts[platform], placeholders[platform])
+        show_debug(job)
+    else:
+        results_area.empty()
+        error_msg = output if output and output.startswith("ERROR:") else "Failed to generate content. Please try again."
+        st.error(f"❌ {error_msg}")
+
+
+async def run_generation_job(job: Job) -> str:
+    """JobQueue runner: generate for job.params, streaming partial text into job.partial"""
+    def on_update(platform: str, partial_content: str):
+        job.partial[platform] = partial_content
+
+    params = job.params
+    return await run_agent(params["query"], params["video_id"], params["platforms"], params["combined"],
+                           on_update=on_update, regenerate=params["regenerate"],
+                           agent_mode=params["agent_mode"], stats=job.stats)
+
+
+# Generate button: queue a job and remember it in the URL, so a refresh finds it again
 if st.button("🚀 Generate Content", type="primary"):
     if not video_id.strip():
         st.error("❌ Please enter a YouTube video ID")
     elif not platforms:
         st.error("❌ Please select at least one platform")
     else:
-        with st.spinner(f"⏳ Generating content using {PROVIDER.upper()}... This may take a moment."):
-            output = asyncio.run(run_agent(query, video_id, platforms))
-            
-            if output and not output.startswith("ERROR:"):
-                st.markdown("---")
-                st.markdown("## ✨ Generated Content")
-                
-                # Display content for each platform
-                for platform in platforms:
-                    content_data = parse_json_content(output, platform)
-                    display_platform_content(platform, content_data)
-                
-                # Debug section (collapsible)
-                with st.expander("🔍 Debug - Raw Output"):
-                    st.code(output, language="text")
-            else:
-                error_msg = output if output and output.startswith("ERROR:") else "Failed to generate content. Please try again."
-                st.error(f"❌ {error_msg}")
+        st.query_params["job"] = load_job_queue().submit(run_generation_job, {
+            "query": query,
+            "video_id": video_id,
+            "platforms": platforms,
+            "combined": combined,
+            "regenerate": regenerate,
+            "agent_mode": agent_mode,
+        })
+
+if "job" in st.query_params:
+    show_job(st.query_params["job"])
 
 # Footer
 st.markdown("---")
@@ -0,0 +1,210 @@
+"""
+Batch content generation for many videos (e.g. a whole playlist)
+Streams one JSON line per video and resumes where a previous run stopped
+
+Usage:
+    python batch.py video_ids.txt -o results.jsonl
+    python batch.py video_ids.txt -o results.jsonl --platforms LinkedIn,Twitter --videos 4 --combined
+
+The input file holds one video ID (or youtube.com/watch?v= URL) per line;
+blank lines and lines starting with # are ignored. Videos already written
+to the output file with status "ok" are skipped, so re-running the same
+command after a crash only processes what is left. Failed videos are
+retried on the next run.
+"""
+import argparse
+import asyncio
+import json
+import os
+import re
+import time
+
+from content_agent import (
+    get_llm_client,
+    get_compressed_transcript,
+    condense_for_prompts,
+    generate_content_async,
+    generate_content_combined_async,
+    PLATFORM_SPECS,
+)
+
+_VIDEO_ID = re.compile(r"(?:v=|youtu\.be/)([\w-]{11})")
+
+
+def read_video_ids(path: str) -> list[str]:
+    """Video IDs from a text file, de-duplicated in order"""
+    ids = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            match = _VIDEO_ID.search(line)
+            video_id = match.group(1) if match else line
+            if video_id not in ids:
+                ids.append(video_id)
+    return ids
+
+
+def load_checkpoint(path: str) -> set[str]:
+    """Video IDs already completed in an existing output file"""
+    done = set()
+    if not os.path.exists(path):
+        return done
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # torn last line from a crash
+            if record.get("status") == "ok":
+                done.add(record["video_id"])
+    return done
+
+
+def split_posts(output: str) -> dict:
+    """Platform -> post from the combined generator output"""
+    posts = {}
+    for block in output.split("\n\n"):
+        try:
+            post = json.loads(block)
+        except json.JSONDecodeError:
+            continue
+        if isinstance(post, dict) and "platform" in post:
+            posts[post["platform"]] = post
+    return posts
+
+
+class JsonlWriter:
+    """Append-only JSONL output; every record is flushed to disk before returning"""
+
+    def __init__(self, path: str):
+        self.file = open(path, "a", encoding="utf-8")
+
+    def write(self, record: dict):
+        self.file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+    def close(self):
+        self.file.close()
+
+
+async def process_video(video_id: str, platforms: list[str], combined: bool,
+                        platform_concurrency: int) -> dict:
+    """Generate posts for one video; errors are captured in the record, never raised"""
+    started = time.perf_counter()
+    record = {"video_id": video_id, "platforms": platforms}
+    try:
+        # Transcript fetch is blocking I/O; keep it off the event loop
+        transcript, compression = await asyncio.to_thread(get_compressed_transcript, video_id)
+        if not transcript:
+            raise RuntimeError("Could not fetch transcript")
+        record["compression"] = compression.as_dict()
+        digest = await condense_for_prompts(transcript, max_concurrency=platform_concurrency)
+        if combined:
+            output = await generate_content_combined_async(digest, platforms, platform_concurrency)
+        else:
+            output = await generate_content_async(digest, platforms, platform_concurrency)
+
+        posts = split_posts(output)
+        errors = [p for p in platforms if p not in posts or "error" in posts[p]]
+        if errors:
+            raise RuntimeError(f"No usable output for: {', '.join(errors)}")
+        record.update(status="ok", posts=posts)
+    except Exception as e:
+        record.update(status="error", error=f"{type(e).__name__}: {e}")
+    record["elapsed"] = round(time.perf_counter() - started, 3)
+    return record
+
+
+async def run_batch(video_ids: list[str], output_path: str, platforms: list[str],
+                    video_concurrency: int, platform_concurrency: int, combined: bool) -> dict:
+    """Process every pending video and return a throughput summary"""
+    done = load_checkpoint(output_path)
+    pending = [v for v in video_ids if v not in done]
+    print(f"📋 {len(video_ids)} videos, {len(done)} already done, {len(pending)} to process")
+
+    llm_client = get_llm_client()
+    writer = JsonlWriter(output_path)
+    semaphore = asyncio.Semaphore(video_concurrency)
+    usage_before = dict(llm_client.usage)
+    started = time.perf_counter()
+    failures = 0
+
+    async def run_one(video_id: str) -> dict:
+        async with semaphore:
+            return await process_video(video_id, platforms, combined, platform_concurrency)
+
+    try:
+        # Write records as they finish, not in input order
+        for finished in asyncio.as_completed([run_one(v) for v in pending]):
+            record = await finished
+            writer.write(record)
+            if record["status"] == "ok":
+                print(f"✅ {record['video_id']} ({record['elapsed']:.1f}s, "
+                      f"transcript compressed {record['compression']['ratio']:.1f}x)")
+            else:
+                failures += 1
+                print(f"❌ {record['video_id']}: {record['error']}")
+    finally:
+        writer.close()
+        # Release the pooled connections while this loop is still running
+        await llm_client.router.aclose()
+
+    elapsed = time.perf_counter() - started
+    processed = len(pending)
+    return {
+        "processed": processed,
+        "succeeded": processed - failures,
+        "failed": failures,
+        "skipped": len(done),
+        "elapsed": elapsed,
+        "videos_per_minute": processed / elapsed * 60 if elapsed else 0.0,
+        "llm_calls": llm_client.usage["calls"] - usage_before["calls"],
+        "prompt_tokens": llm_client.usage["prompt_tokens"] - usage_before["prompt_tokens"],
+        "completion_tokens": llm_client.usage["completion_tokens"] - usage_before["completion_tokens"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("input", help="Text file with one video ID or URL per line")
+    parser.add_argument("-o", "--output", default="batch_results.jsonl", help="JSONL output (also the checkpoint)")
+    parser.add_argument("--platforms", default="LinkedIn,Instagram,Twitter")
+    parser.add_argument("--videos", type=int, default=2, help="Videos processed concurrently")
+    parser.add_argument("--platform-concurrency", type=int, default=2, help="LLM calls in flight per video")
+    parser.add_argument("--combined", action="store_true", help="One LLM request per video for all platforms")
+    parser.add_argument("--regenerate", action="store_true", help="Ignore cached LLM responses")
+    args = parser.parse_args()
+
+    platforms = [p.strip() for p in args.platforms.split(",") if p.strip()]
+    unknown = [p for p in platforms if p not in PLATFORM_SPECS]
+    if not platforms or unknown:
+        # Otherwise every video would be recorded as "ok" with no posts
+        parser.error(f"--platforms needs one or more of {', '.join(PLATFORM_SPECS)}"
+                     + (f" (unknown: {', '.join(unknown)})" if unknown else ""))
+    video_ids = read_video_ids(args.input)
+
+    with get_llm_client().bypass_cache(args.regenerate):
+        summary = asyncio.run(run_batch(
+            video_ids, args.output, platforms,
+            video_concurrency=args.videos,
+            platform_concurrency=args.platform_concurrency,
+            combined=args.combined,
+        ))
+
+    print("="*60)
+    print("📊 Batch Summary")
+    print("="*60)
+    print(f"Processed: {summary['processed']} ({summary['succeeded']} ok, {summary['failed']} failed), "
+          f"skipped {summary['skipped']} already done")
+    print(f"Elapsed:   {summary['elapsed']:.1f}s  ->  {summary['videos_per_minute']:.1f} videos/min")
+    print(f"LLM calls: {summary['llm_calls']}, tokens: {summary['prompt_tokens']} prompt + "
+          f"{summary['completion_tokens']} completion")
+    print(f"Output:    {args.output}")
+    print("="*60)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+Benchmark the local transcript compressor on synthetic multi-hour transcripts
+No network: snippets are generated, or read from the transcript cache with --video-id
+
+Usage:
+    python benchmark_compress.py
+    python benchmark_compress.py --hours 0.25,1,3,6 --budget 4000
+    python benchmark_compress.py --video-id 6hr6wZr1N_8 --video-id e5aDRQGO2m8
+
+Synthetic transcripts mix filler ("so yeah, let's get into it") with fact
+snippets (specs, prices, opinions). Besides time and compression ratio, the
+table shows how much of each kind survived: a useful compressor keeps far
+more facts than filler.
+"""
+import argparse
+import random
+import time
+
+from compress import compress_snippets, compression_summary, WINDOW_SECONDS
+
+FILLER = [
+    "so yeah let's get into it",
+    "um you know what I mean",
+    "don't forget to like and subscribe",
+    "anyway moving on",
+    "okay so here we are again",
+    "I mean it's it's pretty good you know",
+    "let me know what you think in the comments",
+    "right so basically yeah",
+]
+
+FACTS = [
+    "the {n} litre twin-turbo V8 makes {hp} hp and {nm} Nm",
+    "it does 0 to 100 km/h in {s} seconds thanks to quattro",
+    "the ceramic brakes are a {price} euro option",
+    "top speed is limited to {top} km/h unless you tick the dynamic plus package",
+    "the RS adaptive air suspension lowers the car by {mm} mm at speed",
+    "boot space is {litres} litres which beats the M5 Touring",
+    "fuel economy on the motorway was {l} litres per 100 km",
+]
+
+
+def synthetic_snippets(hours: float, fact_rate: float, seed: int) -> list[dict]:
+    """~4-second snippets; each is a fact with probability fact_rate (tagged for scoring)"""
+    rng = random.Random(seed)
+    snippets, t = [], 0.0
+    while t < hours * 3600:
+        if rng.random() < fact_rate:
+            text = rng.choice(FACTS).format(
+                n=rng.choice([2.9, 4.0, 5.2]), hp=rng.randint(400, 700), nm=rng.randint(500, 900),
+                s=round(rng.uniform(3.0, 4.5), 1), price=rng.randint(5, 15) * 1000, top=rng.choice([250, 280, 305]),
+                mm=rng.randint(10, 30), litres=rng.randint(400, 600), l=round(rng.uniform(8, 14), 1),
+            )
+            snippets.append({"text": text, "start": t, "duration": 4.0, "fact": True})
+        else:
+            snippets.append({"text": rng.choice(FILLER), "start": t, "duration": 4.0, "fact": False})
+        t += 4.0
+    return snippets
+
+
+def survival(snippets: list[dict], result) -> tuple[float, float]:
+    """Share of fact and filler snippets inside kept windows"""
+    kept_starts = sorted(start for start, _ in result.kept)
+    kept = set()
+    for start in kept_starts:
+        kept.update(i for i, s in enumerate(snippets) if start <= s["start"] < start + WINDOW_SECONDS)
+    facts = [i for i, s in enumerate(snippets) if s["fact"]]
+    filler = [i for i, s in enumerate(snippets) if not s["fact"]]
+    return (sum(i in kept for i in facts) / max(len(facts), 1),
+            sum(i in kept for i in filler) / max(len(filler), 1))
+
+
+def best_of(fn, repeat: int):
+    times, result = [], None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - start)
+    return min(times), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--hours", default="0.25,1,3,6", help="Synthetic transcript lengths")
+    parser.add_argument("--budget", type=int, default=4000, help="Token budget")
+    parser.add_argument("--fact-rate", type=float, default=0.1, help="Share of synthetic snippets that carry facts")
+    parser.add_argument("--video-id", action="append", default=[], help="Also compress a real (cached) transcript")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    print("="*78)
+    print(f"📉 Transcript Compression Benchmark (budget {args.budget} tokens)")
+    print("="*78)
+    print(f"{'Transcript':<14}{'Snippets':>10}{'Tokens':>10}{'Kept':>8}{'Ratio':>8}{'Time':>10}"
+          f"{'Facts kept':>12}{'Filler kept':>13}")
+    for hours in [float(h) for h in args.hours.split(",")]:
+        snippets = synthetic_snippets(hours, args.fact_rate, args.seed)
+        elapsed, result = best_of(lambda: compress_snippets(snippets, args.budget), args.repeat)
+        facts, filler = survival(snippets, result) if result.kept else (1.0, 1.0)
+        print(f"{f'{hours:g}h synthetic':<14}{len(snippets):>10,}{result.original_tokens:>10,}"
+              f"{result.compressed_tokens:>8,}{result.ratio:>7.1f}x{elapsed * 1000:>8.1f}ms"
+              f"{facts:>12.0%}{filler:>13.0%}")
+
+    if args.video_id:
+        # Imported here: content_agent is only needed for real transcripts
+        from content_agent import get_transcript_snippets
+        print()
+        for video_id in args.video_id:
+            snippets = get_transcript_snippets(video_id)
+            if not snippets:
+                print(f"{video_id}: no transcript")
+                continue
+            elapsed, result = best_of(lambda: compress_snippets(snippets, args.budget), args.repeat)
+            print(f"{video_id}: {compression_summary(result)} in {elapsed * 1000:.1f}ms")
+    print("="*78)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+"""
+Micro-benchmark: single-pass JSON extractor vs the previous rescanning one
+Adversarial LLM-output shapes from 10 KB to 1 MB
+
+Before timing, the extractor must match the legacy one on fixed cases and
+on random short outputs built from braces, quotes, backslashes and posts
+(one-shot and streamed in random chunk sizes); any difference fails the run.
+
+Usage:
+    python benchmark_json_extract.py
+    python benchmark_json_extract.py --sizes 10000,100000 --legacy-timeout 5
+    python benchmark_json_extract.py --fuzz 200000 --seed 7
+"""
+import argparse
+import json
+import random
+import time
+from typing import Optional
+
+from json_extract import JSONObjectExtractor, extract_first_json_object
+
+POST = json.dumps({"platform": "Twitter", "content": "Hot take: the RS6 is the only wagon that matters #Audi"})
+
+
+def legacy_extract_json_from_text(text: str) -> Optional[dict]:
+    """The previous extract_json_from_text: rescans from every '{' (quadratic)"""
+    import re
+    
+    # Find all potential JSON object starts
+    for match in re.finditer(r'\{', text):
+        start_pos = match.start()
+        # Try to parse from this position
+        brace_count = 0
+        in_string = False
+        escape_next = False
+        
+        for i, char in enumerate(text[start_pos:], start=start_pos):
+            if escape_next:
+                escape_next = False
+                continue
+            
+            if char == '\\':
+                escape_next = True
+                continue
+            
+            if char == '"' and not escape_next:
+                in_string = not in_string
+            
+            if not in_string:
+                if char == '{':
+                    brace_count += 1
+                elif char == '}':
+                    brace_count -= 1
+                    if brace_count == 0:
+                        # Found complete JSON object
+                        json_str = text[start_pos:i+1]
+                        try:
+                            return json.loads(json_str)
+                        except json.JSONDecodeError:
+                            break  # Try next opening brace
+    
+    return None
+
+
+# Short outputs the single-pass extractor must answer exactly like the legacy one
+EQUIVALENCE_CASES = {
+    "plain": POST,
+    "prose": f"Sure! Here is your post: {POST} Hope that helps.",
+    "quoted_brace": f'He said "{{" then {POST}',
+    "quoted_braces": f'Use "{{" or "}}" in {{"a": "}}"}} then {POST}',
+    "unbalanced": f"{{ oops, let me retry: {POST}",
+    "nested_junk": f'{{junk {POST} junk}}',
+    "none": 'no json here, just "{" and "}"',
+    "escaped_brace": '{\\{"b": {"c": 2}}',
+    "quoted_then_empty": '"{"{}"{"a": 1}\\\\',
+}
+
+# Fragments the differential fuzz concatenates into short model outputs
+FUZZ_PARTS = ['{', '}', '"', ' ', 'a', ':', ', ', '1', '[', ']', '\\', '\\"', '\\\\', '{{', '}}',
+              '"{"', '"}"', ' then ', '{"a": 1}', '{"b": {"c": 2}}', '{"d": [1, {"e": 3}]}',
+              '{"s": "x\\"{y"}', POST]
+
+
+def make_inputs(size: int) -> dict:
+    """Adversarial shapes of roughly `size` characters, each ending in a valid post"""
+    return {
+        # Opening braces that never close: every start scans to the end
+        "open_braces": "{ " * (size // 2) + POST,
+        # Deeply nested objects that are invalid at the innermost point
+        "nested_invalid": '{"a": ' * (size // 12) + "x" + "}" * (size // 12) + " " + POST,
+        # Lots of small brace-delimited junk in prose
+        "brace_prose": "see {this} and {that} " * (size // 22) + POST,
+        # One huge valid object (the happy path, large)
+        "large_valid": json.dumps({"platform": "LinkedIn", "content": "x" * size}),
+    }
+
+
+def time_call(fn, *args) -> tuple[float, object]:
+    start = time.perf_counter()
+    result = fn(*args)
+    return time.perf_counter() - start, result
+
+
+def stream_extract(text: str, chunk_size: int = 16) -> Optional[dict]:
+    """Feed text in token-sized chunks, stopping at the first object"""
+    extractor = JSONObjectExtractor(max_buffer=len(text) + 1, max_objects=1)
+    for i in range(0, len(text), chunk_size):
+        found = extractor.feed(text[i:i + chunk_size])
+        if found:
+            return found[0]
+    found = extractor.finish()
+    return found[0] if found else None
+
+
+def fuzz_differential(count: int, seed: int):
+    """Random short outputs must give the legacy result, one-shot and streamed"""
+    rng = random.Random(seed)
+    for _ in range(count):
+        text = "".join(rng.choice(FUZZ_PARTS) for _ in range(rng.randint(1, 40)))
+        expected = legacy_extract_json_from_text(text)
+        assert extract_first_json_object(text) == expected, f"differs from legacy: {text!r}"
+        chunk_size = rng.randint(1, 8)
+        assert stream_extract(text, chunk_size) == expected, \
+            f"streamed (chunk_size={chunk_size}) differs from legacy: {text!r}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", default="10000,100000,1000000")
+    parser.add_argument("--legacy-timeout", type=float, default=5.0,
+                        help="Skip a legacy run when its quadratic projection exceeds this (seconds)")
+    parser.add_argument("--fuzz", type=int, default=20000, help="Random outputs checked against legacy (0 = skip)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    sizes = [int(s) for s in args.sizes.split(",")]
+
+    print("="*72)
+    print("⏱️  JSON Extraction Benchmark")
+    print("="*72)
+    for case, text in EQUIVALENCE_CASES.items():
+        expected = legacy_extract_json_from_text(text)
+        assert extract_first_json_object(text) == expected, f"{case}: differs from legacy"
+        assert stream_extract(text, chunk_size=3) == expected, f"{case}: streamed result differs from legacy"
+    print(f"✅ {len(EQUIVALENCE_CASES)} equivalence cases match the legacy extractor")
+    if args.fuzz:
+        fuzz_differential(args.fuzz, args.seed)
+        print(f"✅ {args.fuzz:,} random outputs (seed {args.seed}) match the legacy extractor")
+    print(f"{'Shape':<16}{'Size':>10}{'Legacy':>12}{'Single-pass':>14}{'Streamed':>12}{'Speedup':>9}")
+
+    last_legacy = {}  # shape -> (seconds, chars) of the previous legacy run
+    for size in sizes:
+        for shape, text in make_inputs(size).items():
+            new_t, new_result = time_call(extract_first_json_object, text)
+            stream_t, stream_result = time_call(stream_extract, text)
+            assert stream_result == new_result, f"{shape}: streamed result differs"
+
+            prev_t, prev_len = last_legacy.get(shape, (0.0, 1))
+            projected = prev_t * (len(text) / prev_len) ** 2
+            if projected > args.legacy_timeout:
+                legacy_cell, speedup = f"~{projected:.0f}s", "-"
+            else:
+                legacy_t, legacy_result = time_call(legacy_extract_json_from_text, text)
+                if legacy_result != new_result:
+                    print(f"   ⚠️  {shape}: results differ")
+                last_legacy[shape] = (legacy_t, len(text))
+                legacy_cell = f"{legacy_t * 1000:.1f}ms"
+                speedup = f"{legacy_t / new_t:.0f}x" if new_t else "-"
+
+            print(f"{shape:<16}{len(text) / 1024:>8.0f}KB{legacy_cell:>12}"
+                  f"{new_t * 1000:>12.1f}ms{stream_t * 1000:>10.1f}ms{speedup:>9}")
+    print("="*72)
+    print("~Ns = legacy run skipped; quadratic projection from the previous size")
+
+
+if __name__ == "__main__":
+    main()
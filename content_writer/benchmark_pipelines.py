@@ -0,0 +1,242 @@
+"""
+Offline latency benchmark for the content generation pipelines
+Runs every pipeline against a local stub OpenAI-compatible server (stub_server.py)
+
+Usage:
+    python benchmark_pipelines.py
+    python benchmark_pipelines.py --runs 50 --per-token-latency 0.01 --fail-rate 0.05
+    python benchmark_pipelines.py --pipeline simple --pipeline agent --transcript-file transcript.txt
+
+Pipelines:
+    simple      generate_content_simple (one request per platform, sequential)
+    concurrent  generate_content_async (one request per platform, concurrent)
+    combined    generate_content_combined_async (one request for all platforms)
+    direct      dispatch_tools_direct (the agent's tools called directly, traced)
+    agent       create_content_agent + Runner.run (orchestrator model calls the tools)
+
+Reports p50/p95/p99 end-to-end latency, model round trips and tokens per run
+and appends the results, tagged with the current git commit, to a JSON
+history file so runs on different commits can be compared.
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import time
+from datetime import datetime, timezone
+
+from agents import Runner, RunConfig
+from agents.models.openai_provider import OpenAIProvider
+
+from content_agent import (
+    LLMClient,
+    set_llm_client,
+    create_content_agent,
+    generate_content_simple,
+    generate_content_async,
+    generate_content_combined_async,
+    dispatch_tools_direct,
+    PLATFORM_SPECS,
+)
+from provider_router import Backend, ProviderRouter
+from stub_server import StubConfig, start_stub_server
+
+DEFAULT_HISTORY = os.getenv(
+    "BENCHMARK_HISTORY_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "benchmark_history.json"),
+)
+
+SAMPLE_SENTENCE = ("The reviewer takes the new RS model around the track and notes the twin-turbo "
+                   "V8, the quattro drivetrain and the revised suspension setup. ")
+
+
+def synthetic_transcript(tokens: int) -> str:
+    """Transcript of roughly `tokens` tokens (~4 characters each)"""
+    repeats = max(1, tokens * 4 // len(SAMPLE_SENTENCE))
+    return (SAMPLE_SENTENCE * repeats).strip()
+
+
+def percentile(values: list[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q / 100 * (len(ordered) - 1))))]
+
+
+def git_commit() -> dict:
+    """Current commit and whether the tree has uncommitted changes"""
+    here = os.path.dirname(os.path.abspath(__file__))
+    try:
+        sha = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                             text=True, check=True, cwd=here).stdout.strip()
+        dirty = bool(subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"],
+                                    capture_output=True, text=True, check=True, cwd=here).stdout.strip())
+    except (OSError, subprocess.CalledProcessError):
+        return {"commit": None, "dirty": None}
+    return {"commit": sha, "dirty": dirty}
+
+
+def make_pipelines(base_url: str) -> dict:
+    """Pipeline name -> async callable(transcript, platforms) returning the raw output"""
+    run_config = RunConfig(
+        model_provider=OpenAIProvider(base_url=base_url, api_key="stub", use_responses=False),
+        tracing_disabled=True,
+    )
+
+    async def simple(transcript, platforms):
+        return generate_content_simple(transcript, platforms)
+
+    async def agent(transcript, platforms):
+        msg = f"""Target platforms: {', '.join(platforms)}
+
+Video Transcript (key facts):
+{transcript}"""
+        result = await Runner.run(create_content_agent(platforms), msg, run_config=run_config)
+        return result.final_output or ""
+
+    return {
+        "simple": simple,
+        "concurrent": generate_content_async,
+        "combined": generate_content_combined_async,
+        "direct": dispatch_tools_direct,
+        "agent": agent,
+    }
+
+
+def succeeded(output: str, platforms: list[str]) -> bool:
+    """Every platform produced a post and nothing reported an error"""
+    return '"error"' not in output and all(f'"platform": "{p}"' in output for p in platforms)
+
+
+async def run_pipeline(pipeline, server, transcript: str, platforms: list[str], runs: int) -> dict:
+    """Run one pipeline `runs` times; latency is measured end to end per run"""
+    latencies, failures = [], 0
+    before = server.stats.as_dict()
+    for _ in range(runs):
+        start = time.perf_counter()
+        try:
+            output = await pipeline(transcript, platforms)
+        except Exception:
+            output = ""
+        latencies.append(time.perf_counter() - start)
+        if not succeeded(output, platforms):
+            failures += 1
+    after = server.stats.as_dict()
+    return {
+        "p50": percentile(latencies, 50),
+        "p95": percentile(latencies, 95),
+        "p99": percentile(latencies, 99),
+        "mean": sum(latencies) / runs,
+        "round_trips": (after["requests"] - before["requests"]) / runs,
+        "prompt_tokens": (after["prompt_tokens"] - before["prompt_tokens"]) / runs,
+        "completion_tokens": (after["completion_tokens"] - before["completion_tokens"]) / runs,
+        "failure_rate": failures / runs,
+    }
+
+
+def load_history(path: str) -> list:
+    if not os.path.exists(path):
+        return []
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_history(path: str, history: list):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(history, f, indent=2)
+    os.replace(tmp, path)
+
+
+def previous_run(history: list, config: dict) -> dict:
+    """Most recent recorded run with the same configuration"""
+    for record in reversed(history):
+        if record["config"] == config:
+            return record
+    return {}
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--pipeline", choices=["simple", "concurrent", "combined", "direct", "agent"], action="append")
+    parser.add_argument("--platforms", default="LinkedIn,Instagram,Twitter")
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--transcript-tokens", type=int, default=1500, help="Size of the synthetic transcript")
+    parser.add_argument("--transcript-file", help="Use a real transcript instead")
+    parser.add_argument("--latency", type=float, default=0.1, help="Stub time to first token (s)")
+    parser.add_argument("--per-token-latency", type=float, default=0.002, help="Stub time per completion token (s)")
+    parser.add_argument("--prefill-per-1k", type=float, default=0.02, help="Stub time per 1k prompt tokens (s)")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="Fraction of stub requests answered with HTTP 500")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--history", default=DEFAULT_HISTORY, help="JSON file results are appended to")
+    parser.add_argument("--no-save", action="store_true")
+    args = parser.parse_args()
+
+    platforms = [p.strip() for p in args.platforms.split(",") if p.strip() in PLATFORM_SPECS]
+    if args.transcript_file:
+        with open(args.transcript_file, encoding="utf-8") as f:
+            transcript = f.read()
+    else:
+        transcript = synthetic_transcript(args.transcript_tokens)
+
+    stub_config = StubConfig(
+        latency=args.latency,
+        per_token_latency=args.per_token_latency,
+        prefill_per_1k=args.prefill_per_1k,
+        fail_rate=args.fail_rate,
+        seed=args.seed,
+    )
+    server = start_stub_server(stub_config)
+    # Point the direct-generation helpers at the stub, without the response cache
+    set_llm_client(LLMClient(
+        router=ProviderRouter([Backend("stub", "stub", base_url=server.base_url, api_key="stub")])
+    ))
+    pipelines = make_pipelines(server.base_url)
+    selected = args.pipeline or list(pipelines)
+
+    config = {
+        "platforms": platforms,
+        "runs": args.runs,
+        "transcript_chars": len(transcript),
+        "stub": {k: v for k, v in vars(stub_config).items() if k != "seed"},
+    }
+    history = load_history(args.history)
+    previous = previous_run(history, config)
+
+    print("="*60)
+    print("⏱️  Pipeline Latency Benchmark (stub server)")
+    print("="*60)
+    print(f"Platforms: {', '.join(platforms)}, runs: {args.runs}, transcript: {len(transcript)} chars")
+    print(f"Stub: {config['stub']}")
+    print()
+    print(f"{'Pipeline':<12}{'p50':>8}{'p95':>8}{'p99':>8}{'Trips':>7}{'Prompt tok':>12}"
+          f"{'Compl tok':>11}{'Fail':>7}{'Δp50':>9}")
+
+    results = {}
+    try:
+        for name in selected:
+            r = await run_pipeline(pipelines[name], server, transcript, platforms, args.runs)
+            results[name] = r
+            before = previous.get("results", {}).get(name)
+            delta = f"{(r['p50'] / before['p50'] - 1):+.0%}" if before else "-"
+            print(f"{name:<12}{r['p50']:>7.2f}s{r['p95']:>7.2f}s{r['p99']:>7.2f}s{r['round_trips']:>7.1f}"
+                  f"{r['prompt_tokens']:>12.0f}{r['completion_tokens']:>11.0f}{r['failure_rate']:>7.0%}{delta:>9}")
+    finally:
+        server.shutdown()
+
+    if previous:
+        print(f"\nΔp50 is relative to commit {previous.get('commit')} ({previous.get('timestamp')})")
+    if not args.no_save:
+        history.append({
+            **git_commit(),
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "config": config,
+            "results": results,
+        })
+        save_history(args.history, history)
+        print(f"📝 Results appended to {args.history}")
+    print("="*60)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,111 @@
+"""
+Benchmark: indexing generation output once vs parsing it once per platform
+Compares the app's previous parse_json_content (called for every platform)
+with json_extract.index_platform_posts on large multi-platform outputs
+
+Usage:
+    python benchmark_post_index.py
+    python benchmark_post_index.py --platforms 3,30,100 --content-chars 500,20000
+"""
+import argparse
+import json
+import re
+import time
+
+from json_extract import index_platform_posts
+
+SENTENCE = "The RS6 pairs a twin-turbo V8 with quattro grip. Thoughts? #Audi #CarTwitter 🔥\n"
+
+
+def legacy_parse_json_content(output: str, platform: str) -> dict:
+    """The previous app.py parser: re-parses the whole output for each platform"""
+    try:
+        data = json.loads(output)
+        if isinstance(data, list):
+            for item in data:
+                if isinstance(item, dict) and item.get("platform", "").lower() == platform.lower():
+                    return item
+        if isinstance(data, dict) and data.get("platform", "").lower() == platform.lower():
+            return data
+    except json.JSONDecodeError:
+        pass
+
+    for line in output.split('\n\n'):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            data = json.loads(line)
+            if isinstance(data, dict) and data.get("platform", "").lower() == platform.lower():
+                return data
+        except json.JSONDecodeError:
+            continue
+
+    json_pattern = r'\{"platform"\s*:\s*"' + platform + r'"[^}]*(?:"content"\s*:\s*"(?:[^"\\]|\\.)*")[^}]*\}'
+    matches = re.findall(json_pattern, output, re.IGNORECASE | re.DOTALL)
+    if matches:
+        try:
+            return json.loads(matches[0])
+        except json.JSONDecodeError:
+            pass
+    return {"platform": platform, "content": output, "error": "Could not parse JSON"}
+
+
+def make_outputs(platforms: list[str], content_chars: int) -> dict:
+    """The output shapes the app receives, one post per platform"""
+    content = (SENTENCE * (content_chars // len(SENTENCE) + 1))[:content_chars]
+    posts = [{"platform": p, "content": content} for p in platforms]
+    return {
+        # generate_content_async / combined: blank-line separated objects
+        "blocks": "\n\n".join(json.dumps(post) for post in posts),
+        "array": json.dumps(posts),
+        "posts_object": json.dumps({"posts": posts}),
+        # The agent's free-form reply
+        "prose": "Here are your posts!\n\n" + "\n\n".join(
+            f"**{post['platform']}**\n```json\n{json.dumps(post, indent=2)}\n```" for post in posts
+        ) + "\n\nLet me know if you want changes.",
+    }
+
+
+def best_of(fn, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--platforms", default="3,30,100", help="Platform counts to test")
+    parser.add_argument("--content-chars", default="500,20000", help="Post sizes to test")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print("="*78)
+    print("⏱️  Output Indexing Benchmark")
+    print("="*78)
+    print(f"{'Shape':<14}{'Platforms':>10}{'Output':>10}{'Per-platform':>14}{'Indexed':>11}"
+          f"{'Speedup':>9}  Parsed (old/new)")
+    for count in [int(c) for c in args.platforms.split(",")]:
+        platforms = [f"Platform{i}" for i in range(count)]
+        for content_chars in [int(c) for c in args.content_chars.split(",")]:
+            for shape, output in make_outputs(platforms, content_chars).items():
+                def legacy():
+                    return {p: legacy_parse_json_content(output, p) for p in platforms}
+
+                def indexed():
+                    return index_platform_posts(output)
+
+                legacy_t = best_of(legacy, args.repeat)
+                indexed_t = best_of(indexed, args.repeat)
+                old_ok = sum("error" not in post for post in legacy().values())
+                new_ok = sum(p.lower() in indexed() for p in platforms)
+                print(f"{shape:<14}{count:>10}{len(output) / 1024:>8.0f}KB{legacy_t * 1000:>12.1f}ms"
+                      f"{indexed_t * 1000:>9.1f}ms{legacy_t / indexed_t:>8.0f}x  {old_ok}/{new_ok} of {count}")
+    print("="*78)
+
+
+if __name__ == "__main__":
+    main()
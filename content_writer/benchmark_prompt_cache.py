@@ -0,0 +1,122 @@
+"""
+Prefix-cache benchmark: repeated platform calls for the same video
+Compares the old prompt layout (transcript in the middle of each platform
+prompt) with the prompt registry's shared prefix (system + transcript first)
+
+Usage:
+    python benchmark_prompt_cache.py
+    python benchmark_prompt_cache.py --videos 10 --transcript-tokens 4000
+    python benchmark_prompt_cache.py --live --videos 2     # the configured provider (costs tokens)
+
+Offline, the stub server simulates OpenAI prompt caching (stub_server.py
+--prefix-cache): cached prefix tokens skip the prefill time. Each video gets
+every platform generated twice (first run, then "regenerate"). The first call
+per video cannot hit the cache; the table compares time to first token and
+cached prompt tokens on the calls after it.
+"""
+import argparse
+import asyncio
+import dataclasses
+
+from content_agent import (
+    LLMClient,
+    get_llm_client,
+    set_llm_client,
+    prompts,
+    telemetry,
+    PLATFORM_SPECS,
+)
+from prompt_registry import Prompt
+from provider_router import Backend, ProviderRouter
+from stub_server import StubConfig, start_stub_server
+from benchmark_pipelines import synthetic_transcript
+
+LAYOUTS = ("interleaved", "shared-prefix")
+
+
+def build_prompt(layout: str, platform: str, transcript: str, name: str) -> Prompt:
+    """The platform prompt in either layout, labelled `name` for the registry stats"""
+    prompt = prompts.render(platform, video_transcript=transcript)
+    if layout == "shared-prefix":
+        return dataclasses.replace(prompt, name=name)
+    # Old layout: task line, transcript, then the requirements, in one user message
+    task, _, rest = prompts.templates[platform].suffix.template.partition("\n\n")
+    return Prompt(name, ({"role": "user", "content": f"{task}\n\nTRANSCRIPT: {transcript}\n\n{rest}"},))
+
+
+async def run_layout(client: LLMClient, layout: str, transcripts: list[str], platforms: list[str], rounds: int):
+    """Generate every platform `rounds` times per video, one call at a time"""
+    for transcript in transcripts:
+        first = True
+        for _ in range(rounds):
+            for platform in platforms:
+                _, max_tokens, temperature = PLATFORM_SPECS[platform]
+                name = f"{layout} ({'first' if first else 'repeat'})"
+                prompt = build_prompt(layout, platform, transcript, name)
+                async for _ in client.astream(prompt, max_tokens=max_tokens, temperature=temperature):
+                    pass
+                first = False
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--platforms", default="LinkedIn,Instagram,Twitter")
+    parser.add_argument("--videos", type=int, default=5)
+    parser.add_argument("--rounds", type=int, default=2, help="Generations per video (2 = first run + regenerate)")
+    parser.add_argument("--transcript-tokens", type=int, default=3000)
+    parser.add_argument("--latency", type=float, default=0.05, help="Stub time to first token (s)")
+    parser.add_argument("--prefill-per-1k", type=float, default=0.1, help="Stub prefill time per 1k uncached prompt tokens (s)")
+    parser.add_argument("--live", action="store_true", help="Use the configured provider instead of the stub")
+    args = parser.parse_args()
+
+    platforms = [p.strip() for p in args.platforms.split(",") if p.strip() in PLATFORM_SPECS]
+    server = None
+    if args.live:
+        client = get_llm_client()
+    else:
+        server = start_stub_server(StubConfig(latency=args.latency, prefill_per_1k=args.prefill_per_1k,
+                                              prefix_cache=True))
+        client = LLMClient(router=ProviderRouter([
+            Backend("stub", "stub", base_url=server.base_url, api_key="stub", **telemetry.http_clients())
+        ]))
+        set_llm_client(client)
+
+    print("="*60)
+    print("🧩 Prompt Prefix-Cache Benchmark" + (" (live)" if args.live else " (stub server)"))
+    print("="*60)
+    print(f"Videos: {args.videos}, rounds: {args.rounds}, platforms: {', '.join(platforms)}, "
+          f"transcript: ~{args.transcript_tokens} tokens")
+    try:
+        # Always measure real model calls
+        with client.bypass_cache():
+            for layout in LAYOUTS:
+                # Distinct transcripts per layout so one layout can't warm the other's cache
+                transcripts = [f"[{layout} video {i}] " + synthetic_transcript(args.transcript_tokens)
+                               for i in range(args.videos)]
+                await run_layout(client, layout, transcripts, platforms, args.rounds)
+    finally:
+        if server is not None:
+            server.shutdown()
+
+    stats = prompts.stats()
+    print()
+    print(f"{'Layout':<16}{'Calls':>7}{'Prompt tok':>12}{'Cached':>9}{'TTFT first':>12}{'TTFT repeat':>13}")
+    ttft = {}
+    for layout in LAYOUTS:
+        first, repeat = stats.get(f"{layout} (first)", {}), stats.get(f"{layout} (repeat)", {})
+        calls = first.get("calls", 0) + repeat.get("calls", 0)
+        prompt_tokens = first.get("prompt_tokens", 0) + repeat.get("prompt_tokens", 0)
+        cached = first.get("cached_tokens", 0) + repeat.get("cached_tokens", 0)
+        ttft[layout] = repeat.get("ttfb_mean")
+        fmt = lambda v: f"{v:.3f}s" if v is not None else "n/a"
+        print(f"{layout:<16}{calls:>7}{prompt_tokens / max(calls, 1):>12.0f}"
+              f"{cached / max(prompt_tokens, 1):>9.0%}{fmt(first.get('ttfb_mean')):>12}{fmt(repeat.get('ttfb_mean')):>13}")
+    if all(ttft.values()):
+        print(f"\nRepeated calls: time to first token "
+              f"{ttft['interleaved']:.3f}s -> {ttft['shared-prefix']:.3f}s "
+              f"({ttft['shared-prefix'] / ttft['interleaved'] - 1:+.0%})")
+    print("="*60)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,111 @@
+"""
+Benchmark latency-aware routing and hedging against two local stub servers
+Runs offline: no OpenAI key or Ollama needed
+
+Usage:
+    python benchmark_routing.py
+    python benchmark_routing.py --requests 200 --concurrency 4
+
+Scenarios:
+    tail    - backend A is fast but 10% of its requests stall (a cold model);
+              backend B is steady but slower
+    outage  - backend A answers every request with HTTP 500
+For each scenario the same requests run against A alone (today's fixed
+PROVIDER), routed across A and B, and routed with hedging.
+"""
+import argparse
+import asyncio
+import time
+
+from content_agent import LLMClient
+from provider_router import Backend, ProviderRouter
+from stub_server import StubConfig, start_stub_server
+
+SCENARIOS = {
+    "tail": (
+        StubConfig(latency=0.05, tail_rate=0.1, tail_latency=1.0, seed=1),
+        StubConfig(latency=0.15, seed=2),
+    ),
+    "outage": (
+        StubConfig(latency=0.05, fail_rate=1.0, seed=1),
+        StubConfig(latency=0.15, seed=2),
+    ),
+}
+
+
+def percentile(values: list[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q / 100 * (len(ordered) - 1))))]
+
+
+def make_client(urls: list[str], hedge: bool) -> LLMClient:
+    # max_retries=0: measure the router, not the SDK's own retry loop
+    backends = [Backend(name, "stub", base_url=url, api_key="stub", max_retries=0)
+                for name, url in zip("AB", urls)]
+    return LLMClient(router=ProviderRouter(backends, hedge=hedge))
+
+
+async def run_strategy(client: LLMClient, requests: int, concurrency: int) -> dict:
+    """Send `requests` identical prompts, `concurrency` at a time"""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies, errors = [], 0
+
+    async def one():
+        nonlocal errors
+        async with semaphore:
+            start = time.perf_counter()
+            text = await client.agenerate("Create a Twitter post about this video", max_tokens=50)
+            latencies.append(time.perf_counter() - start)
+            if text.startswith('{"error"'):
+                errors += 1
+
+    await asyncio.gather(*(one() for _ in range(requests)))
+    return {
+        "p50": percentile(latencies, 50),
+        "p95": percentile(latencies, 95),
+        "p99": percentile(latencies, 99),
+        "errors": errors,
+        "router": client.router.stats(),
+    }
+
+
+async def run_scenario(name: str, requests: int, concurrency: int):
+    config_a, config_b = SCENARIOS[name]
+    servers = [start_stub_server(config_a), start_stub_server(config_b)]
+    urls = [s.base_url for s in servers]
+    strategies = {
+        "A only": make_client(urls[:1], hedge=False),
+        "routed": make_client(urls, hedge=False),
+        "routed+hedge": make_client(urls, hedge=True),
+    }
+    print(f"\n📡 Scenario: {name}")
+    print(f"{'Strategy':<14}{'p50':>8}{'p95':>8}{'p99':>8}{'Errors':>8}{'Hedged':>8}  Requests per backend")
+    try:
+        for label, client in strategies.items():
+            result = await run_strategy(client, requests, concurrency)
+            per_backend = ", ".join(f"{b}={s['requests']}" for b, s in result["router"]["backends"].items())
+            print(f"{label:<14}{result['p50']:>7.2f}s{result['p95']:>7.2f}s{result['p99']:>7.2f}s"
+                  f"{result['errors']:>8}{result['router']['hedged']:>8}  {per_backend}")
+    finally:
+        for server in servers:
+            server.shutdown()
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--scenario", choices=list(SCENARIOS), action="append")
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=4)
+    args = parser.parse_args()
+
+    print("="*60)
+    print("🔀 Provider Routing Benchmark")
+    print("="*60)
+    print(f"Requests per strategy: {args.requests}, concurrency: {args.concurrency}")
+    for name in args.scenario or list(SCENARIOS):
+        await run_scenario(name, args.requests, args.concurrency)
+    print("="*60)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,85 @@
+"""
+Benchmark: Twitter candidates in one request vs regenerating until a post fits
+Runs against local stub servers that pad a share of tweets past 280 characters
+
+Usage:
+    python benchmark_twitter_candidates.py
+    python benchmark_twitter_candidates.py --overlong-rate 0.5 --candidates 3 --videos 20 --latency 0.5
+
+Strategies:
+    regenerate  one post per request, asked again until it fits (what a user
+                does by hand after the app's 280-character warning)
+    candidates  TWITTER_CANDIDATES posts in one request (`n`), best fitting one kept
+    parallel    the same, on a backend that ignores `n` (Ollama): parallel requests
+"""
+import argparse
+import json
+import time
+
+import content_agent
+from content_agent import LLMClient, set_llm_client, telemetry
+from provider_router import Backend, ProviderRouter
+from stub_server import StubConfig, start_stub_server
+
+MAX_ROUNDS = 5
+
+
+def run_strategy(strategy: str, args) -> dict:
+    server = start_stub_server(StubConfig(
+        latency=args.latency, per_token_latency=args.per_token_latency,
+        overlong_rate=args.overlong_rate, multiple_choices=strategy != "parallel", seed=args.seed,
+    ))
+    backend = Backend("stub", "stub", base_url=server.base_url, api_key="stub", max_retries=0,
+                      **telemetry.http_clients())
+    # No response cache: every attempt must reach the stub
+    client = LLMClient(router=ProviderRouter([backend]))
+    set_llm_client(client)
+    content_agent.TWITTER_CANDIDATES = 1 if strategy == "regenerate" else args.candidates
+    content_agent.TWITTER_CANDIDATE_ROUNDS = MAX_ROUNDS
+
+    fits, latencies = 0, []
+    try:
+        for i in range(args.videos):
+            transcript = f"Video {i}: the RS6 Avant review"
+            started = time.perf_counter()
+            for _ in range(MAX_ROUNDS if strategy == "regenerate" else 1):
+                post = json.loads(content_agent._create_twitter_content_impl(transcript))
+                if post.get("char_count", 0) <= 280:
+                    break
+            latencies.append(time.perf_counter() - started)
+            fits += post.get("char_count", 0) <= 280
+    finally:
+        server.shutdown()
+    return {
+        "fits": fits,
+        "mean": sum(latencies) / len(latencies),
+        "worst": max(latencies),
+        "requests": server.stats.requests,
+        "prompt_tokens": server.stats.prompt_tokens,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--overlong-rate", type=float, default=0.5, help="Share of tweets the stub makes too long")
+    parser.add_argument("--candidates", type=int, default=3)
+    parser.add_argument("--videos", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.3, help="Stub time to first token (seconds)")
+    parser.add_argument("--per-token-latency", type=float, default=0.002)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    print("="*72)
+    print(f"🐦 Twitter Candidates Benchmark ({args.overlong_rate:.0%} of tweets too long, "
+          f"{args.videos} videos)")
+    print("="*72)
+    print(f"{'Strategy':<12}{'Fit':>8}{'Mean':>10}{'Worst':>10}{'Requests':>10}{'Prompt tok':>12}")
+    for strategy in ("regenerate", "candidates", "parallel"):
+        r = run_strategy(strategy, args)
+        print(f"{strategy:<12}{r['fits']:>5}/{args.videos:<2}{r['mean']:>9.2f}s{r['worst']:>9.2f}s"
+              f"{r['requests']:>10}{r['prompt_tokens']:>12,}")
+    print("="*72)
+
+
+if __name__ == "__main__":
+    main()
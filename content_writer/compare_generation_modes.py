@@ -0,0 +1,96 @@
+"""
+Compare per-platform vs single-request (combined) generation
+Reports LLM calls, prompt/completion tokens and wall-clock latency per mode
+
+Usage:
+    python compare_generation_modes.py --video-id 6hr6wZr1N_8
+    python compare_generation_modes.py --transcript-file transcript.txt --runs 3
+"""
+import argparse
+import asyncio
+import time
+
+from content_agent import (
+    llm_client,
+    get_transcript,
+    generate_content_async,
+    generate_content_combined_async,
+    PLATFORM_SPECS,
+    _combined_prompt,
+)
+
+MODES = {
+    "per-platform": generate_content_async,
+    "combined": generate_content_combined_async,
+}
+
+
+def prompt_chars(transcript: str, platforms: list[str]) -> dict:
+    """Prompt size (characters) each mode sends, without calling the model"""
+    return {
+        "per-platform": sum(len(PLATFORM_SPECS[p][0](transcript).text()) for p in platforms),
+        "combined": len(_combined_prompt(transcript, platforms).text()),
+    }
+
+
+async def run_mode(mode: str, transcript: str, platforms: list[str], runs: int) -> dict:
+    """Run one generation mode `runs` times and average the results"""
+    llm_client.reset_usage()
+    latencies = []
+    # Measure real model calls, not response-cache hits
+    with llm_client.bypass_cache():
+        for _ in range(runs):
+            start = time.perf_counter()
+            await MODES[mode](transcript, platforms)
+            latencies.append(time.perf_counter() - start)
+    usage = llm_client.usage
+    return {
+        "calls": usage["calls"] / runs,
+        "prompt_tokens": usage["prompt_tokens"] / runs,
+        "completion_tokens": usage["completion_tokens"] / runs,
+        "latency": sum(latencies) / runs,
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--video-id", default="6hr6wZr1N_8")
+    parser.add_argument("--transcript-file", help="Read transcript from a file instead of YouTube")
+    parser.add_argument("--platforms", default="LinkedIn,Instagram,Twitter")
+    parser.add_argument("--runs", type=int, default=1)
+    args = parser.parse_args()
+
+    platforms = [p.strip() for p in args.platforms.split(",") if p.strip() in PLATFORM_SPECS]
+    if args.transcript_file:
+        with open(args.transcript_file, encoding="utf-8") as f:
+            transcript = f.read()
+    else:
+        transcript = get_transcript(args.video_id)
+    if not transcript:
+        print("❌ Failed to fetch transcript")
+        return
+
+    print("="*60)
+    print("⚖️  Generation Mode Comparison")
+    print("="*60)
+    print(f"Platforms: {', '.join(platforms)}")
+    print(f"Transcript: {len(transcript)} chars, runs per mode: {args.runs}")
+    print()
+
+    sizes = prompt_chars(transcript, platforms)
+    results = {mode: await run_mode(mode, transcript, platforms, args.runs) for mode in MODES}
+
+    print(f"{'Mode':<14}{'Prompt chars':>14}{'Calls':>8}{'Prompt tok':>12}{'Compl tok':>12}{'Latency':>10}")
+    for mode, r in results.items():
+        print(f"{mode:<14}{sizes[mode]:>14}{r['calls']:>8.1f}{r['prompt_tokens']:>12.0f}"
+              f"{r['completion_tokens']:>12.0f}{r['latency']:>9.2f}s")
+
+    base, combined = results["per-platform"], results["combined"]
+    if base["prompt_tokens"]:
+        saved = 1 - combined["prompt_tokens"] / base["prompt_tokens"]
+        print(f"\nPrompt tokens saved by combined mode: {saved:.0%}")
+    print("="*60)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
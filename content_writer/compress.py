@@ -0,0 +1,151 @@
+# -----------------------------------------------------
+# Local Extractive Transcript Compression
+# -----------------------------------------------------
+"""
+Drop filler from a transcript before any LLM sees it, locally and cheaply.
+
+Snippets are grouped into fixed-length time windows, every window is scored
+by TF-IDF density (words that appear all through the video, like "um",
+"so" or the presenter's catchphrase, weigh little; specific terms and
+numbers weigh a lot), and the best windows are kept up to a token budget.
+Kept windows stay in time order and carry their start timestamp, e.g.
+
+    [12:04] the twin-turbo V8 makes 600 hp and 800 Nm ...
+
+Scoring is vectorised with NumPy over (window, term) pairs, so a multi-hour
+transcript compresses in milliseconds. This runs before the LLM digest
+(condense.py), which then has far less text to map-reduce.
+"""
+import re
+from dataclasses import dataclass, field
+from typing import Optional
+
+import numpy as np
+
+from condense import estimate_tokens
+
+WINDOW_SECONDS = 30.0
+NUMBER_BOOST = 2.0      # specs, prices and times are what posts are made of
+
+_WORD = re.compile(r"[a-z0-9]+(?:['.][a-z0-9]+)*")
+
+
+@dataclass
+class Compression:
+    """A compressed transcript plus what was kept"""
+    text: str
+    original_tokens: int
+    compressed_tokens: int
+    windows_total: int = 1
+    windows_kept: int = 1
+    kept: list = field(default_factory=list, repr=False)   # (start seconds, text) per kept window
+
+    @property
+    def ratio(self) -> float:
+        """Original / compressed tokens (1.0 = unchanged)"""
+        return self.original_tokens / max(self.compressed_tokens, 1)
+
+    def as_dict(self) -> dict:
+        return {
+            "original_tokens": self.original_tokens,
+            "compressed_tokens": self.compressed_tokens,
+            "ratio": round(self.ratio, 2),
+            "windows_total": self.windows_total,
+            "windows_kept": self.windows_kept,
+        }
+
+
+def format_timestamp(seconds: float) -> str:
+    seconds = int(seconds)
+    hours, rest = divmod(seconds, 3600)
+    minutes, secs = divmod(rest, 60)
+    return f"{hours}:{minutes:02d}:{secs:02d}" if hours else f"{minutes}:{secs:02d}"
+
+
+def window_snippets(snippets: list[dict], window_seconds: float = WINDOW_SECONDS) -> list[tuple[float, str]]:
+    """Group consecutive snippets into (start, text) windows of about window_seconds"""
+    if not snippets:
+        return []
+    starts = np.fromiter((s.get("start", 0.0) for s in snippets), dtype=np.float64, count=len(snippets))
+    window_ids = np.floor_divide(starts - starts[0], window_seconds).astype(np.int64)
+    # Indexes where a new window begins (snippets arrive in time order)
+    boundaries = np.flatnonzero(np.diff(window_ids)) + 1
+    edges = [0, *boundaries.tolist(), len(snippets)]
+    return [
+        (float(starts[a]), " ".join(s["text"] for s in snippets[a:b]))
+        for a, b in zip(edges, edges[1:])
+    ]
+
+
+def score_windows(texts: list[str]) -> np.ndarray:
+    """TF-IDF density per window: sum of (1 + log tf) * idf over its terms, per token"""
+    vocabulary = {}
+    term_ids, window_ids = [], []
+    for w, text in enumerate(texts):
+        words = _WORD.findall(text.lower())
+        term_ids.extend(vocabulary.setdefault(word, len(vocabulary)) for word in words)
+        window_ids.extend([w] * len(words))
+    n_windows = len(texts)
+    if not term_ids:
+        return np.zeros(n_windows)
+    terms = np.asarray(term_ids, dtype=np.int64)
+    windows = np.asarray(window_ids, dtype=np.int64)
+    n_terms = len(vocabulary)
+
+    # Term frequency per (window, term) pair, without a dense windows x vocabulary matrix
+    pairs, tf = np.unique(windows * n_terms + terms, return_counts=True)
+    pair_windows, pair_terms = np.divmod(pairs, n_terms)
+    df = np.bincount(pair_terms, minlength=n_terms)
+    idf = np.log((1 + n_windows) / (1 + df)) + 1.0
+
+    boost = np.ones(n_terms)
+    numeric = [i for word, i in vocabulary.items() if any(c.isdigit() for c in word)]
+    boost[numeric] = NUMBER_BOOST
+
+    weights = (1.0 + np.log(tf)) * idf[pair_terms] * boost[pair_terms]
+    scores = np.bincount(pair_windows, weights=weights, minlength=n_windows)
+    lengths = np.bincount(windows, minlength=n_windows)
+    return scores / np.maximum(lengths, 1)
+
+
+def compress_snippets(snippets: list[dict], token_budget: int,
+                      window_seconds: float = WINDOW_SECONDS) -> Compression:
+    """Keep the highest-scoring windows within token_budget, in time order.
+
+    Transcripts already within budget come back unchanged, joined exactly
+    like get_transcript() joins them.
+    """
+    full_text = " ".join(s["text"] for s in snippets)
+    original = estimate_tokens(full_text)
+    if original <= token_budget or token_budget <= 0:
+        return Compression(full_text, original, original)
+
+    windows = window_snippets(snippets, window_seconds)
+    rendered = [f"[{format_timestamp(start)}] {text}" for start, text in windows]
+    # ~4 characters per token: exact counts per window aren't worth the time here
+    costs = np.fromiter((len(t) // 4 + 1 for t in rendered), dtype=np.int64, count=len(rendered))
+
+    order = np.argsort(-score_windows([text for _, text in windows]), kind="stable")
+    fits = np.cumsum(costs[order]) <= token_budget
+    selected = np.sort(order[fits]) if fits.any() else order[:1]
+
+    kept = [windows[i] for i in selected.tolist()]
+    text = "\n".join(rendered[i] for i in selected.tolist())
+    return Compression(
+        text=text,
+        original_tokens=original,
+        compressed_tokens=estimate_tokens(text),
+        windows_total=len(windows),
+        windows_kept=len(kept),
+        kept=kept,
+    )
+
+
+def compression_summary(result: Optional[Compression]) -> str:
+    """One-line report, e.g. '41,230 -> 3,980 tokens (10.4x, 96 of 1,204 windows)'"""
+    if result is None:
+        return "no transcript"
+    if result.ratio <= 1.0:
+        return f"{result.original_tokens:,} tokens (within budget, unchanged)"
+    return (f"{result.original_tokens:,} -> {result.compressed_tokens:,} tokens "
+            f"({result.ratio:.1f}x, {result.windows_kept:,} of {result.windows_total:,} windows)")
@@ -0,0 +1,196 @@
+# -----------------------------------------------------
+# Transcript Condensation (token-budgeted facts digest)
+# -----------------------------------------------------
+"""
+Map-reduce condensation of long transcripts into a bounded "facts digest".
+
+The transcript is chunked by token count, every chunk is summarised in
+parallel (map), and the partial notes are merged until they fit the token
+budget (reduce). Platform prompts then carry the digest, so prompt size is
+O(budget) instead of O(video length). Digests are cached on disk per
+transcript hash, budget and model.
+
+The LLM call is injected as `summarize(prompt, max_tokens) -> str` (async),
+so this module has no provider dependencies.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import re
+import tempfile
+from typing import Awaitable, Callable, Optional
+
+try:
+    import tiktoken
+    _ENCODING = tiktoken.get_encoding("cl100k_base")
+except ImportError:
+    # Fall back to the ~4 characters per token rule of thumb
+    _ENCODING = None
+
+logger = logging.getLogger(__name__)
+
+DIGEST_TOKEN_BUDGET = int(os.getenv("DIGEST_TOKEN_BUDGET", "1500"))
+CHUNK_TOKENS = int(os.getenv("DIGEST_CHUNK_TOKENS", "2000"))
+DIGEST_CACHE_DIR = os.getenv(
+    "DIGEST_CACHE_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "digests"),
+)
+
+Summarize = Callable[[str, int], Awaitable[str]]
+
+MAP_PROMPT = """Extract the key facts from this part of an automotive video transcript.
+
+Keep: car models, specs and numbers, features, prices, comparisons, strong opinions and memorable quotes.
+Drop: filler, greetings, sponsor reads, repetition.
+Write concise bullet points only, no introduction.
+
+TRANSCRIPT PART {index} of {total}:
+{text}"""
+
+REDUCE_PROMPT = """Merge these notes from one automotive video into a single facts digest.
+
+Remove duplicates, keep every distinct spec, number, feature and opinion.
+Write concise bullet points only, no introduction.
+
+NOTES:
+{text}"""
+
+
+def estimate_tokens(text: str) -> int:
+    """Token count (exact with tiktoken, otherwise ~4 chars per token)"""
+    if _ENCODING is not None:
+        return len(_ENCODING.encode(text, disallowed_special=()))
+    return (len(text) + 3) // 4
+
+
+def chunk_by_tokens(text: str, chunk_tokens: int) -> list[str]:
+    """Split text into consecutive chunks of at most chunk_tokens tokens"""
+    if _ENCODING is not None:
+        tokens = _ENCODING.encode(text, disallowed_special=())
+        return [_ENCODING.decode(tokens[i:i + chunk_tokens]) for i in range(0, len(tokens), chunk_tokens)]
+
+    # Split on word boundaries (keeping whitespace) so chunks don't cut words in half
+    max_chars = chunk_tokens * 4
+    chunks, current, size = [], [], 0
+    for word in re.findall(r"\S+\s*", text):
+        if current and size + len(word) > max_chars:
+            chunks.append("".join(current).rstrip())
+            current, size = [], 0
+        current.append(word)
+        size += len(word)
+    if current:
+        chunks.append("".join(current).rstrip())
+    return chunks
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Hard cap used as a safety net when the model overshoots"""
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    return chunk_by_tokens(text, max_tokens)[0]
+
+
+def digest_key(transcript: str, token_budget: int, model: str) -> str:
+    """Cache key for a digest: transcript hash + budget + model"""
+    h = hashlib.sha256(transcript.encode("utf-8"))
+    h.update(f"|{token_budget}|{model}".encode("utf-8"))
+    return h.hexdigest()
+
+
+class DigestCache:
+    """One small file per digest; atomic writes make it safe across processes"""
+
+    def __init__(self, directory: str = DIGEST_CACHE_DIR):
+        self.directory = directory
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.txt")
+
+    def get(self, key: str) -> Optional[str]:
+        try:
+            with open(self._path(key), encoding="utf-8") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def set(self, key: str, digest: str):
+        os.makedirs(self.directory, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(digest)
+        os.replace(tmp, self._path(key))
+
+
+digest_cache = DigestCache()
+
+
+def _is_error(result: str) -> bool:
+    """LLMClient reports failures as a JSON {"error": ...} string"""
+    try:
+        data = json.loads(result)
+    except (json.JSONDecodeError, TypeError):
+        return False
+    return isinstance(data, dict) and "error" in data
+
+
+async def condense_transcript(transcript: str, summarize: Summarize,
+                              token_budget: int = DIGEST_TOKEN_BUDGET,
+                              chunk_tokens: int = CHUNK_TOKENS,
+                              max_concurrency: int = 2,
+                              model: str = "",
+                              cache: Optional[DigestCache] = digest_cache) -> str:
+    """Condense a transcript into a facts digest of at most token_budget tokens.
+
+    Transcripts already within budget are returned unchanged (no LLM call).
+    """
+    if estimate_tokens(transcript) <= token_budget:
+        return transcript
+
+    key = digest_key(transcript, token_budget, model)
+    if cache is not None:
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
+
+    semaphore = asyncio.Semaphore(max_concurrency)
+    failed = False
+
+    async def summarise(prompt: str, fallback: str, max_tokens: int) -> str:
+        nonlocal failed
+        async with semaphore:
+            result = await summarize(prompt, max_tokens)
+        if not result or _is_error(result):
+            # Keep the run going with the raw text, but don't cache a degraded digest
+            failed = True
+            return truncate_to_tokens(fallback, max_tokens)
+        return result.strip()
+
+    # Map: summarise every chunk in parallel
+    chunks = chunk_by_tokens(transcript, chunk_tokens)
+    per_chunk = max(token_budget // len(chunks), 64)
+    notes = await asyncio.gather(*(
+        summarise(MAP_PROMPT.format(index=i + 1, total=len(chunks), text=chunk), chunk, per_chunk)
+        for i, chunk in enumerate(chunks)
+    ))
+    digest = "\n".join(notes)
+
+    # Reduce: merge notes until they fit the budget
+    while estimate_tokens(digest) > token_budget:
+        groups = chunk_by_tokens(digest, chunk_tokens)
+        per_group = max(token_budget // len(groups), 64)
+        merged = await asyncio.gather(*(
+            summarise(REDUCE_PROMPT.format(text=group), group, per_group) for group in groups
+        ))
+        reduced = "\n".join(merged)
+        if len(groups) == 1 or estimate_tokens(reduced) >= estimate_tokens(digest):
+            digest = reduced
+            break
+        digest = reduced
+
+    digest = truncate_to_tokens(digest, token_budget)
+    if cache is not None and not failed:
+        cache.set(key, digest)
+    logger.info(f"Condensed transcript {estimate_tokens(transcript)} -> {estimate_tokens(digest)} tokens")
+    return digest
@@ -5,6 +5,11 @@ import os
 import asyncio
 import json
 import logging
+import time
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import lru_cache
 
 # Import YouTube Transcript API with error handling
 try:
@@ -14,11 +19,25 @@ except ImportError as e:
     print("   Install with: pip install youtube-transcript-api")
     raise
 
-from agents import Agent, Runner, RunConfig, function_tool, ItemHelpers, trace
-from agents.models.openai_provider import OpenAIProvider
-from openai import OpenAI, AsyncOpenAI
 from dotenv import load_dotenv
-from typing import Optional, Literal
+from typing import TYPE_CHECKING, Optional, Literal, Callable, Iterator, AsyncIterator, Union
+
+from transcript_cache import TranscriptCache
+from response_cache import ResponseCache, response_key
+from provider_router import Backend, ProviderRouter, fallback_available
+from rate_limiter import RateLimiter, Reservation, retry_after, retry_delay
+from telemetry import Telemetry, CallRecord, JsonlSink, MetricsRegistry
+from prompt_registry import Prompt, PromptRegistry
+import post_schema
+from post_schema import Post, TwitterPost, CombinedPosts
+from condense import condense_transcript, estimate_tokens
+from post_rules import TweetScore, score_tweet
+from compress import Compression, compress_snippets, compression_summary
+from json_extract import extract_first_json_object, partial_string_field
+
+if TYPE_CHECKING:
+    # Only for annotations: the agents framework is imported on first use (see below)
+    from agents import Agent
 
 # -----------------------------------------------------
 # Configuration and Provider Detection
@@ -33,117 +52,642 @@ PROVIDER = "openai" if USE_OPENAI else "ollama"
 # Model configuration
 OPENAI_MODEL = "gpt-4o"
 OLLAMA_MODEL = "llama3.1:8b"
-OLLAMA_BASE_URL = "http://localhost:11434"
-
-print(f"🤖 Provider: {PROVIDER.upper()}")
-if PROVIDER == "openai":
-    print(f"   Model: {OPENAI_MODEL}")
-else:
-    print(f"   Model: {OLLAMA_MODEL}")
-    print(f"   URL: {OLLAMA_BASE_URL}")
-
-# Configure Ollama provider for agents library
-ollama_provider = None
-if not USE_OPENAI:
-    # Set up Ollama as OpenAI-compatible provider
+OLLAMA_BASE_URL = os.getenv("OLLAMA_BASE_URL", "http://localhost:11434")
+
+# Max in-flight LLM requests for concurrent platform generation.
+# A local Ollama box serves few parallel requests, so default lower there.
+MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "3" if USE_OPENAI else "2"))
+
+# Long transcripts are cut to this many tokens locally (filler windows dropped)
+# before any LLM sees them; 0 disables
+TRANSCRIPT_COMPRESS_TOKENS = int(os.getenv("TRANSCRIPT_COMPRESS_TOKENS", "4000"))
+
+# Twitter posts are generated as this many candidates in one request and the
+# best one within 280 characters is kept; if none fits, the batch is retried up
+# to TWITTER_CANDIDATE_ROUNDS times in total (TWITTER_CANDIDATES=1 disables)
+TWITTER_CANDIDATES = int(os.getenv("TWITTER_CANDIDATES", "3"))
+TWITTER_CANDIDATE_ROUNDS = int(os.getenv("TWITTER_CANDIDATE_ROUNDS", "2"))
+
+# How the OpenAI path orchestrates the platform tools: "direct" calls them in
+# parallel itself, "agent" lets a gpt-4o-mini orchestrator decide
+ORCHESTRATION = os.getenv("ORCHESTRATION", "direct")
+
+# Cache identical LLM requests on disk (set LLM_CACHE=0 to disable)
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE", "1") != "0"
+
+# Route requests across OpenAI and Ollama by observed latency (needs both set up),
+# optionally hedging slow requests to the other backend
+LLM_ROUTING = os.getenv("LLM_ROUTING", "0") == "1"
+LLM_HEDGE = os.getenv("LLM_HEDGE", "0") == "1"
+LLM_HEDGE_DELAY = os.getenv("LLM_HEDGE_DELAY")  # seconds; default is the primary's p95
+
+# Requests and tokens per minute allowed per provider (0 = unlimited), shared by
+# every session in the process; point LLM_RATE_LIMIT_DB at a SQLite file to
+# share the budget across processes (several Streamlit workers, batch runs)
+OPENAI_RPM = int(os.getenv("OPENAI_RPM", "500"))
+OPENAI_TPM = int(os.getenv("OPENAI_TPM", "30000"))
+OLLAMA_RPM = int(os.getenv("OLLAMA_RPM", "0"))
+OLLAMA_TPM = int(os.getenv("OLLAMA_TPM", "0"))
+LLM_RATE_LIMIT_DB = os.getenv("LLM_RATE_LIMIT_DB")
+
+# Retries for 429s, 5xx and dropped connections (jittered backoff, honours Retry-After)
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "3"))
+
+# Per-call telemetry: always kept in memory, also written as JSON lines when a path is set
+LLM_TELEMETRY_PATH = os.getenv("LLM_TELEMETRY_PATH")
+
+# Importing the agents framework (and the OpenAI SDK behind it) takes seconds,
+# so clients, providers and agents are built on first use, not at import.
+# Streamlit re-runs app.py on every click; these stay memoised in the process.
+_AGENTS_EXPORTS = ("Agent", "Runner", "RunConfig", "function_tool", "ItemHelpers", "trace")
+
+
+def print_provider_banner():
+    print(f"🤖 Provider: {PROVIDER.upper()}")
+    if PROVIDER == "openai":
+        print(f"   Model: {OPENAI_MODEL}")
+    else:
+        print(f"   Model: {OLLAMA_MODEL}")
+        print(f"   URL: {OLLAMA_BASE_URL}")
+    if LLM_ROUTING and USE_OPENAI:
+        print(f"   Routing: openai + ollama ({OLLAMA_BASE_URL}), hedging {'on' if LLM_HEDGE else 'off'}")
+
+
+@lru_cache(maxsize=None)
+def get_ollama_provider():
+    """Ollama as an OpenAI-compatible model provider for the agents library (None with OpenAI)"""
+    if USE_OPENAI:
+        return None
+    from agents.models.openai_provider import OpenAIProvider
     os.environ["OPENAI_API_KEY"] = "dummy_key_for_ollama"  # Agents library requires this
-    # Create OpenAI provider pointing to Ollama
-    ollama_provider = OpenAIProvider(
+    return OpenAIProvider(
         base_url=f"{OLLAMA_BASE_URL}/v1",
         api_key="ollama"  # Ollama doesn't need a real key
     )
 
+
+def __getattr__(name: str):
+    """Lazy module attributes: agents exports, ollama_provider, llm_client and the function tools"""
+    if name in _AGENTS_EXPORTS:
+        import agents
+        return getattr(agents, name)
+    if name == "ollama_provider":
+        return get_ollama_provider()
+    if name == "llm_client":
+        return get_llm_client()
+    tools = {f"create_{p.lower()}_content": p for p in ("LinkedIn", "Instagram", "Twitter")}
+    if name in tools:
+        return _agent_tools()[tools[name]]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 # -----------------------------------------------------
 # Unified LLM Client
 # -----------------------------------------------------
+# Set by LLMClient.bypass_cache(); a context variable so it follows asyncio tasks
+_cache_bypass = contextvars.ContextVar("llm_cache_bypass", default=False)
+
+
+# Shared telemetry; add sinks with telemetry.add_sink()
+metrics = MetricsRegistry()
+telemetry = Telemetry([metrics])
+if LLM_TELEMETRY_PATH:
+    telemetry.add_sink(JsonlSink(LLM_TELEMETRY_PATH))
+
+# Shared RPM/TPM budgets, keyed "provider:model"
+rate_limiter = RateLimiter(LLM_RATE_LIMIT_DB or ":memory:")
+
+
+def build_router() -> ProviderRouter:
+    """Backends from the environment: the detected provider, plus Ollama as a peer with LLM_ROUTING=1"""
+    backends = []
+    # LLMClient retries itself (within the rate limits), so the SDK must not
+    if USE_OPENAI:
+        backends.append(Backend("openai", OPENAI_MODEL, api_key=OPENAI_API_KEY, max_retries=0,
+                                **telemetry.http_clients()))
+        rate_limiter.set_limits(f"openai:{OPENAI_MODEL}", OPENAI_RPM, OPENAI_TPM)
+    if not USE_OPENAI or LLM_ROUTING:
+        # Ollama uses OpenAI-compatible API and doesn't need a real key
+        backends.append(Backend("ollama", OLLAMA_MODEL, base_url=f"{OLLAMA_BASE_URL}/v1", api_key="ollama",
+                                max_retries=0, **telemetry.http_clients()))
+        rate_limiter.set_limits(f"ollama:{OLLAMA_MODEL}", OLLAMA_RPM, OLLAMA_TPM)
+    hedge_delay = float(LLM_HEDGE_DELAY) if LLM_HEDGE_DELAY else None
+    return ProviderRouter(backends, hedge=LLM_HEDGE, hedge_delay=hedge_delay)
+
+
 class LLMClient:
     """Unified client that works with both OpenAI and Ollama"""
     
-    def __init__(self):
-        self.provider = PROVIDER
-        if self.provider == "openai":
-            self.client = OpenAI(api_key=OPENAI_API_KEY)
-            self.model = OPENAI_MODEL
-        else:
-            # Ollama uses OpenAI-compatible API
-            self.client = OpenAI(
-                base_url=f"{OLLAMA_BASE_URL}/v1",
-                api_key="ollama"  # Ollama doesn't need real key
-            )
-            self.model = OLLAMA_MODEL
-    
-    def generate(self, prompt: str, max_tokens: int = 500, temperature: float = 0.7) -> str:
-        """Generate content with automatic provider handling"""
+    def __init__(self, cache: Optional[ResponseCache] = None, router: Optional[ProviderRouter] = None,
+                 limiter: Optional[RateLimiter] = None, max_retries: int = LLM_MAX_RETRIES):
+        self.cache = cache
+        self.router = router or build_router()
+        self.limiter = limiter or rate_limiter
+        self.max_retries = max_retries
+        # Identity for cache keys: a routed request may be answered by any backend
+        self.provider = "+".join(b.name for b in self.router.backends)
+        self.model = "+".join(b.model for b in self.router.backends)
+        self.client = self.router.backends[0].client
+        self.reset_usage()
+
+    @property
+    def async_client(self):
+        return self.router.backends[0].async_client
+
+    @contextmanager
+    def bypass_cache(self, enabled: bool = True):
+        """Skip cache reads inside this block ("regenerate"); fresh results still refresh the cache"""
+        token = _cache_bypass.set(enabled)
         try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[{"role": "user", "content": prompt}],
-                max_tokens=max_tokens,
-                temperature=temperature
-            )
-            return response.choices[0].message.content
-        except Exception as e:
-            error_msg = f"Error with {self.provider}: {str(e)}"
-            logging.error(error_msg)
-            return json.dumps({"error": error_msg})
-
-# Global client instance
-llm_client = LLMClient()
+            yield
+        finally:
+            _cache_bypass.reset(token)
+
+    def _cache_key(self, prompt: Union[str, Prompt], max_tokens: int, temperature: float,
+                   schema: Optional[type] = None, n: int = 1) -> Optional[str]:
+        if self.cache is None:
+            return None
+        text = prompt.key() if isinstance(prompt, Prompt) else prompt
+        if schema is not None:
+            text += f"\n[schema: {schema.__name__}]"
+        if n > 1:
+            text += f"\n[n: {n}]"
+        return response_key(self.provider, self.model, text, temperature, max_tokens)
+
+    def _cached(self, key: Optional[str]) -> Optional[str]:
+        if key is None or _cache_bypass.get():
+            return None
+        return self.cache.get(key)
+
+    def _store(self, key: Optional[str], text: Optional[str], started: float):
+        if key is not None and text:
+            self.cache.set(key, text, time.perf_counter() - started)
+
+    # The async path runs on the shared job loop: cache and limiter SQLite work goes to a thread
+    async def _acached(self, key: Optional[str]) -> Optional[str]:
+        if key is None or _cache_bypass.get():
+            return None
+        return await asyncio.to_thread(self.cache.get, key)
+
+    async def _astore(self, key: Optional[str], text: Optional[str], started: float):
+        if key is not None and text:
+            await asyncio.to_thread(self.cache.set, key, text, time.perf_counter() - started)
+
+    def reset_usage(self):
+        """Reset the running token/call counters"""
+        self.usage = {"calls": 0, "prompt_tokens": 0, "completion_tokens": 0}
+
+    def _record_usage(self, response, count_call: bool = True, record: Optional[CallRecord] = None,
+                      settle: bool = True):
+        """Add the usage block returned by the API to the running counters and the call record
+
+        With settle=False a finished stream's reservation is left on the
+        record for the caller to reconcile (astream does it off the loop).
+        """
+        if count_call:
+            self.usage["calls"] += 1
+        usage = getattr(response, "usage", None)
+        if usage is not None:
+            self.usage["prompt_tokens"] += usage.prompt_tokens or 0
+            self.usage["completion_tokens"] += usage.completion_tokens or 0
+            if record is not None:
+                # Summed: a candidates call may take several responses
+                record.prompt_tokens = (record.prompt_tokens or 0) + (usage.prompt_tokens or 0)
+                record.completion_tokens = (record.completion_tokens or 0) + (usage.completion_tokens or 0)
+                # Prefix-cache hits, when the provider reports them (OpenAI does, Ollama doesn't)
+                details = getattr(usage, "prompt_tokens_details", None)
+                cached_tokens = getattr(details, "cached_tokens", None)
+                if cached_tokens is not None:
+                    record.cached_tokens = (record.cached_tokens or 0) + cached_tokens
+                if settle and record.reservation is not None:
+                    # A finished stream: settle the rate-limit estimate against what was really used
+                    self.limiter.reconcile(record.reservation, self._used_tokens(response))
+                    record.reservation = None
+
+    def _request(self, prompt: Union[str, Prompt], max_tokens: int, temperature: float, stream: bool = False,
+                 schema: Optional[type] = None) -> dict:
+        """Completion arguments minus the model, which depends on the backend the router picks"""
+        if isinstance(prompt, Prompt):
+            messages = list(prompt.messages)
+        else:
+            messages = [{"role": "user", "content": prompt}]
+        request = dict(
+            messages=messages,
+            max_tokens=max_tokens,
+            temperature=temperature
+        )
+        if schema is not None:
+            request["response_format"] = post_schema.response_format(schema)
+        if stream:
+            # Usage arrives in the last chunk
+            request.update(stream=True, stream_options={"include_usage": True})
+        return request
+
+    @staticmethod
+    def _for_backend(b: Backend, request: dict) -> dict:
+        """The request as sent to b: without response_format if b rejected it before"""
+        if "response_format" in request and not b.structured_output:
+            return {k: v for k, v in request.items() if k != "response_format"}
+        return request
+
+    @staticmethod
+    def _schema_rejected(b: Backend, sent: dict, e: Exception) -> bool:
+        """A 400 for a request sent with a schema: remember b can't do structured output"""
+        if "response_format" not in sent or getattr(e, "status_code", None) != 400:
+            return False
+        if b.structured_output:
+            logging.warning(f"Backend {b.name} rejected response_format ({e}); using prompt-only JSON")
+            b.structured_output = False
+        return True
+
+    @staticmethod
+    def _limit_key(b: Backend) -> str:
+        return f"{b.name}:{b.model}"
+
+    @staticmethod
+    def _estimate_tokens(request: dict) -> int:
+        """Prompt estimate plus the completion allowance (per choice), reserved before sending"""
+        prompt = sum(estimate_tokens(m["content"]) for m in request["messages"])
+        return prompt + request.get("n", 1) * request.get("max_tokens", 0)
+
+    @staticmethod
+    def _used_tokens(response) -> int:
+        usage = getattr(response, "usage", None)
+        return (usage.prompt_tokens or 0) + (usage.completion_tokens or 0) if usage is not None else 0
+
+    @staticmethod
+    def _queued(reservation: Reservation, record: Optional[CallRecord]):
+        if record is not None:
+            record.queue_wait += reservation.waited
+
+    def _settle(self, reservation: Reservation, record: Optional[CallRecord], request: dict, response):
+        """Settle the rate-limit estimate now, or once a stream reports its usage.
+
+        response is None when the request failed or was cancelled (a hedge
+        loser): nothing was used, so the whole reservation goes back.
+        """
+        if response is None:
+            self.limiter.reconcile(reservation, 0)
+        elif not request.get("stream"):
+            self.limiter.reconcile(reservation, self._used_tokens(response))
+        elif record is not None:
+            record.reservation = reservation
+
+    async def _asettle(self, reservation: Reservation, record: Optional[CallRecord], request: dict, response):
+        """Async variant of _settle()"""
+        if response is None:
+            await self.limiter.areconcile(reservation, 0)
+        elif not request.get("stream"):
+            await self.limiter.areconcile(reservation, self._used_tokens(response))
+        elif record is not None:
+            record.reservation = reservation
+
+    def _backoff(self, b: Backend, e: Exception, attempt: int) -> Optional[float]:
+        """Seconds to wait before retrying a failed request, or None to give up"""
+        delay = retry_delay(e, attempt)
+        if delay is None:
+            return None
+        after = retry_after(e)
+        if after is not None and getattr(e, "status_code", None) == 429:
+            # Every session sharing this budget waits, not just this request
+            self.limiter.block(self._limit_key(b), after)
+        if fallback_available():
+            # Another backend can take it now: let the router fail over instead of waiting here
+            logging.warning(f"{b.name} request failed ({type(e).__name__}: {e}); failing over")
+            return None
+        if attempt >= self.max_retries:
+            return None
+        logging.warning(f"{b.name} request failed ({type(e).__name__}: {e}); retry {attempt + 1} in {delay:.1f}s")
+        return delay
+
+    def _create(self, b: Backend, request: dict, record: Optional[CallRecord] = None):
+        """chat.completions.create on b within its rate limits.
+
+        429s, 5xx and connection errors are retried with backoff when b is
+        the router's last candidate, otherwise raised so it fails over; a
+        rejected schema is retried once without it.
+        """
+        attempt = 0
+        while True:
+            sent = self._for_backend(b, request)
+            reservation = self.limiter.acquire(self._limit_key(b), self._estimate_tokens(sent))
+            self._queued(reservation, record)
+            response = None
+            try:
+                response = b.client.chat.completions.create(model=b.model, **sent)
+            except Exception as e:
+                if self._schema_rejected(b, sent, e):
+                    continue
+                delay = self._backoff(b, e, attempt)
+                if delay is None:
+                    raise
+            finally:
+                # Runs on every exit, so no reservation is left unsettled
+                self._settle(reservation, record, sent, response)
+            if response is not None:
+                return response
+            attempt += 1
+            time.sleep(delay)
+
+    async def _acreate(self, b: Backend, request: dict, record: Optional[CallRecord] = None):
+        """Async variant of _create()"""
+        attempt = 0
+        while True:
+            sent = self._for_backend(b, request)
+            reservation = await self.limiter.aacquire(self._limit_key(b), self._estimate_tokens(sent))
+            self._queued(reservation, record)
+            response = None
+            try:
+                response = await b.async_client.chat.completions.create(model=b.model, **sent)
+            except Exception as e:
+                if self._schema_rejected(b, sent, e):
+                    continue
+                # May block the key in the limiter's database
+                delay = await asyncio.to_thread(self._backoff, b, e, attempt)
+                if delay is None:
+                    raise
+            finally:
+                # Also runs when the call is cancelled, so no reservation is left unsettled
+                await self._asettle(reservation, record, sent, response)
+            if response is not None:
+                return response
+            attempt += 1
+            await asyncio.sleep(delay)
+
+    def _chunk_text(self, chunk, record: Optional[CallRecord] = None, settle: bool = True) -> str:
+        """Text delta of a stream chunk; records usage from the final chunk"""
+        self._record_usage(chunk, count_call=False, record=record, settle=settle)
+        if chunk.choices and chunk.choices[0].delta.content:
+            return chunk.choices[0].delta.content
+        return ""
+
+    @contextmanager
+    def _call(self, operation: str, prompt: Union[str, Prompt]):
+        """Telemetry record for one request (joins an open telemetry.scope())"""
+        with telemetry.call(operation, self.provider, self.model) as record:
+            if isinstance(prompt, Prompt):
+                record.prompt = prompt.name
+            yield record
+
+    def _failed(self, record: CallRecord, e: Exception) -> str:
+        """Record the error and return it in the JSON shape callers expect"""
+        record.error = f"{type(e).__name__}: {e}"
+        error_msg = f"Error with {self.provider}: {str(e)}"
+        logging.error(error_msg)
+        return json.dumps({"error": error_msg})
+
+    @staticmethod
+    def _served_by(record: CallRecord, backend: Backend):
+        # With several backends, label the record with the one that answered
+        record.provider, record.model = backend.name, backend.model
+
+    def generate(self, prompt: Union[str, Prompt], max_tokens: int = 500, temperature: float = 0.7,
+                 schema: Optional[type] = None) -> str:
+        """Generate content with automatic provider handling.
+
+        With a pydantic `schema`, the provider is asked for JSON matching it.
+        """
+        with self._call("generate", prompt) as record:
+            key = self._cache_key(prompt, max_tokens, temperature, schema)
+            cached = self._cached(key)
+            if cached is not None:
+                record.cached = True
+                return cached
+            started = time.perf_counter()
+            request = self._request(prompt, max_tokens, temperature, schema=schema)
+
+            def send(b: Backend):
+                response = self._create(b, request, record)
+                self._served_by(record, b)
+                return response
+
+            try:
+                response = self.router.call(send)
+                self._record_usage(response, record=record)
+                text = response.choices[0].message.content
+                self._store(key, text, started)
+                return text
+            except Exception as e:
+                return self._failed(record, e)
+
+    async def agenerate(self, prompt: Union[str, Prompt], max_tokens: int = 500, temperature: float = 0.7,
+                        schema: Optional[type] = None) -> str:
+        """Async variant of generate() for concurrent requests"""
+        with self._call("agenerate", prompt) as record:
+            key = self._cache_key(prompt, max_tokens, temperature, schema)
+            cached = await self._acached(key)
+            if cached is not None:
+                record.cached = True
+                return cached
+            started = time.perf_counter()
+            request = self._request(prompt, max_tokens, temperature, schema=schema)
+
+            async def send(b: Backend):
+                response = await self._acreate(b, request, record)
+                self._served_by(record, b)
+                return response
+
+            try:
+                response = await self.router.acall(send)
+                self._record_usage(response, record=record)
+                text = response.choices[0].message.content
+                await self._astore(key, text, started)
+                return text
+            except Exception as e:
+                return self._failed(record, e)
+
+    def _create_n(self, b: Backend, request: dict, n: int, record: CallRecord) -> list:
+        """Responses holding n choices: one request with `n`, else n requests in parallel"""
+        responses = []
+        if b.multiple_choices:
+            response = self._create(b, {**request, "n": n}, record)
+            if len(response.choices) >= n:
+                return [response]
+            logging.info(f"Backend {b.name} ignores n; sending candidate requests in parallel")
+            b.multiple_choices = False
+            responses.append(response)
+        missing = n - sum(len(r.choices) for r in responses)
+        with ThreadPoolExecutor(max_workers=missing) as pool:
+            # Copy the context per request so each keeps counting attempts on the record
+            futures = [pool.submit(contextvars.copy_context().run, self._create, b, request, record)
+                       for _ in range(missing)]
+            responses.extend(f.result() for f in futures)
+        return responses
+
+    async def _acreate_n(self, b: Backend, request: dict, n: int, record: CallRecord) -> list:
+        """Async variant of _create_n()"""
+        responses = []
+        if b.multiple_choices:
+            response = await self._acreate(b, {**request, "n": n}, record)
+            if len(response.choices) >= n:
+                return [response]
+            logging.info(f"Backend {b.name} ignores n; sending candidate requests in parallel")
+            b.multiple_choices = False
+            responses.append(response)
+        missing = n - sum(len(r.choices) for r in responses)
+        responses.extend(await asyncio.gather(*(self._acreate(b, request, record) for _ in range(missing))))
+        return responses
+
+    def _candidate_texts(self, responses: list, record: CallRecord) -> list[str]:
+        for response in responses:
+            self._record_usage(response, record=record)
+        return [choice.message.content for response in responses for choice in response.choices]
+
+    def generate_candidates(self, prompt: Union[str, Prompt], n: int, max_tokens: int = 500,
+                            temperature: float = 0.7, schema: Optional[type] = None) -> list[str]:
+        """n independent completions of one prompt, for the caller to pick from.
+
+        Uses the API's `n` parameter (one request, prompt processed once) and
+        falls back to n parallel requests on backends that ignore it. On
+        failure, returns the error JSON as the only candidate.
+        """
+        with self._call("generate_candidates", prompt) as record:
+            key = self._cache_key(prompt, max_tokens, temperature, schema, n)
+            cached = self._cached(key)
+            if cached is not None:
+                record.cached = True
+                return json.loads(cached)
+            started = time.perf_counter()
+            request = self._request(prompt, max_tokens, temperature, schema=schema)
+
+            def send(b: Backend):
+                responses = self._create_n(b, request, n, record)
+                self._served_by(record, b)
+                return responses
+
+            try:
+                texts = self._candidate_texts(self.router.call(send), record)
+                self._store(key, json.dumps(texts), started)
+                return texts
+            except Exception as e:
+                return [self._failed(record, e)]
+
+    async def agenerate_candidates(self, prompt: Union[str, Prompt], n: int, max_tokens: int = 500,
+                                   temperature: float = 0.7, schema: Optional[type] = None) -> list[str]:
+        """Async variant of generate_candidates()"""
+        with self._call("agenerate_candidates", prompt) as record:
+            key = self._cache_key(prompt, max_tokens, temperature, schema, n)
+            cached = await self._acached(key)
+            if cached is not None:
+                record.cached = True
+                return json.loads(cached)
+            started = time.perf_counter()
+            request = self._request(prompt, max_tokens, temperature, schema=schema)
+
+            async def send(b: Backend):
+                responses = await self._acreate_n(b, request, n, record)
+                self._served_by(record, b)
+                return responses
+
+            try:
+                texts = self._candidate_texts(await self.router.acall(send), record)
+                await self._astore(key, json.dumps(texts), started)
+                return texts
+            except Exception as e:
+                return [self._failed(record, e)]
+
+    def stream(self, prompt: Union[str, Prompt], max_tokens: int = 500, temperature: float = 0.7,
+               schema: Optional[type] = None) -> Iterator[str]:
+        """Yield text deltas as the model produces them (a cache hit arrives as one delta)"""
+        with self._call("stream", prompt) as record:
+            key = self._cache_key(prompt, max_tokens, temperature, schema)
+            cached = self._cached(key)
+            if cached is not None:
+                record.cached = True
+                yield cached
+                return
+            started = time.perf_counter()
+            parts = []
+            self.usage["calls"] += 1
+            request = self._request(prompt, max_tokens, temperature, stream=True, schema=schema)
+
+            def send(b: Backend):
+                self._served_by(record, b)
+                return self._create(b, request, record)
+
+            try:
+                for chunk in self.router.stream(send):
+                    text = self._chunk_text(chunk, record)
+                    if text:
+                        if not parts:
+                            record.ttfb = time.perf_counter() - record.started
+                        parts.append(text)
+                        yield text
+                self._store(key, "".join(parts), started)
+            except Exception as e:
+                yield self._failed(record, e)
+
+    async def astream(self, prompt: Union[str, Prompt], max_tokens: int = 500, temperature: float = 0.7,
+                      schema: Optional[type] = None) -> AsyncIterator[str]:
+        """Async variant of stream()"""
+        with self._call("astream", prompt) as record:
+            key = self._cache_key(prompt, max_tokens, temperature, schema)
+            cached = await self._acached(key)
+            if cached is not None:
+                record.cached = True
+                yield cached
+                return
+            started = time.perf_counter()
+            parts = []
+            self.usage["calls"] += 1
+            request = self._request(prompt, max_tokens, temperature, stream=True, schema=schema)
+
+            async def send(b: Backend):
+                self._served_by(record, b)
+                return await self._acreate(b, request, record)
+
+            try:
+                usage_chunk = None
+                async for chunk in self.router.astream(send):
+                    text = self._chunk_text(chunk, record, settle=False)
+                    if getattr(chunk, "usage", None) is not None:
+                        usage_chunk = chunk
+                    if text:
+                        if not parts:
+                            record.ttfb = time.perf_counter() - record.started
+                        parts.append(text)
+                        yield text
+                if usage_chunk is not None and record.reservation is not None:
+                    await self.limiter.areconcile(record.reservation, self._used_tokens(usage_chunk))
+                    record.reservation = None
+                await self._astore(key, "".join(parts), started)
+            except Exception as e:
+                yield self._failed(record, e)
+
+# Shared client instance, created on first use
+_llm_client: Optional[LLMClient] = None
+
+
+def get_llm_client() -> LLMClient:
+    """The process-wide LLMClient (also available as content_agent.llm_client)"""
+    global _llm_client
+    if _llm_client is None:
+        print_provider_banner()
+        _llm_client = LLMClient(cache=ResponseCache() if LLM_CACHE_ENABLED else None)
+    return _llm_client
+
+
+def set_llm_client(client: LLMClient):
+    """Replace the shared client (benchmarks point it at a stub server)"""
+    global _llm_client
+    _llm_client = client
 
 # -----------------------------------------------------
 # Helper Functions
 # -----------------------------------------------------
 
 def extract_json_from_text(text: str) -> Optional[dict]:
-    """Extract the first valid JSON object from text that may contain extra content"""
-    import re
-    
-    # Find all potential JSON object starts
-    for match in re.finditer(r'\{', text):
-        start_pos = match.start()
-        # Try to parse from this position
-        brace_count = 0
-        in_string = False
-        escape_next = False
-        
-        for i, char in enumerate(text[start_pos:], start=start_pos):
-            if escape_next:
-                escape_next = False
-                continue
-            
-            if char == '\\':
-                escape_next = True
-                continue
-            
-            if char == '"' and not escape_next:
-                in_string = not in_string
-            
-            if not in_string:
-                if char == '{':
-                    brace_count += 1
-                elif char == '}':
-                    brace_count -= 1
-                    if brace_count == 0:
-                        # Found complete JSON object
-                        json_str = text[start_pos:i+1]
-                        try:
-                            return json.loads(json_str)
-                        except json.JSONDecodeError:
-                            break  # Try next opening brace
-    
-    return None
+    """Extract the first valid JSON object from text that may contain extra content.
+
+    Single pass over the text (see json_extract.JSONObjectExtractor); use the
+    extractor directly to pull objects out of a token stream.
+    """
+    return extract_first_json_object(text)
 
 # -----------------------------------------------------
 # Platform-Specific Content Tools with JSON Output
 # -----------------------------------------------------
 
-def _create_linkedin_content_impl(video_transcript: str) -> str:
-    """Internal implementation for LinkedIn content creation"""
-    linkedin_prompt = f"""Create a LinkedIn post for audispot254 (automotive account).
-
-TRANSCRIPT: {video_transcript}
-
-LINKEDIN REQUIREMENTS:
+LINKEDIN_REQUIREMENTS = """LINKEDIN REQUIREMENTS:
 - AUDIENCE: Automotive professionals, engineers, business leaders
 - TONE: Professional, analytical, thought-provoking
 - FOCUS: Technical insights, industry trends, business implications
@@ -154,49 +698,9 @@ LINKEDIN REQUIREMENTS:
 
 Write as: "Recently analyzed this automotive review..." or "This technical breakdown highlights..."
 
-DO NOT write casual language or use emojis.
-
-CRITICAL: Return ONLY valid JSON in this exact format:
-{{"platform": "LinkedIn", "content": "your post content here"}}"""
-
-    result = llm_client.generate(linkedin_prompt, max_tokens=500, temperature=0.7)
-    print(f"DEBUG - LinkedIn LLM raw result: {result[:200]}...")  # Debug output
-    
-    # Extract JSON from response (LLM might add extra text)
-    parsed = extract_json_from_text(result)
-    if parsed:
-        if "platform" not in parsed:
-            parsed["platform"] = "LinkedIn"
-        final_output = json.dumps(parsed)
-        print(f"DEBUG - LinkedIn final output: {final_output[:200]}...")  # Debug output
-        return final_output
-    
-    # Fallback: try parsing entire result
-    try:
-        parsed = json.loads(result)
-        if "platform" not in parsed:
-            parsed["platform"] = "LinkedIn"
-        return json.dumps(parsed)
-    except json.JSONDecodeError:
-        # Last resort: wrap raw content
-        print(f"DEBUG - Failed to extract JSON, wrapping raw content")
-        return json.dumps({"platform": "LinkedIn", "content": result})
-
-
-@function_tool
-def create_linkedin_content(video_transcript: str) -> str:
-    """Creates professional LinkedIn content for automotive industry professionals.
-    Returns JSON: {"platform": "LinkedIn", "content": "..."}"""
-    return _create_linkedin_content_impl(video_transcript)
+DO NOT write casual language or use emojis."""
 
-
-def _create_instagram_content_impl(video_transcript: str) -> str:
-    """Internal implementation for Instagram content creation"""
-    instagram_prompt = f"""Create an Instagram post for audispot254 (automotive account).
-
-TRANSCRIPT: {video_transcript}
-
-INSTAGRAM REQUIREMENTS:
+INSTAGRAM_REQUIREMENTS = """INSTAGRAM REQUIREMENTS:
 - AUDIENCE: Car enthusiasts, Gen Z/Millennial car lovers, visual-focused users
 - TONE: Excited, casual, community-driven
 - FOCUS: Cool features, performance specs, visual appeal, lifestyle
@@ -208,90 +712,263 @@ INSTAGRAM REQUIREMENTS:
 
 Write as: "Just watched this sick review! 🔥" or "This car is absolutely insane! 🚗💨"
 
-MUST use casual language and car slang.
+MUST use casual language and car slang."""
+
+TWITTER_REQUIREMENTS = """TWITTER REQUIREMENTS:
+- AUDIENCE: Quick scrollers, debate starters, car Twitter community
+- TONE: Sharp, opinionated, conversation-starter
+- FOCUS: One surprising fact, hot take, or debate point
+- LENGTH: 200-250 characters maximum (including hashtags)
+- HASHTAGS: 2-3 only (#Audi #CarTwitter #AutomotiveDebate)
+- PERSPECTIVE: Someone dropping automotive knowledge/hot takes
+- INCLUDE: Question or statement that sparks replies
+
+Write as: "Hot take:" or "This review proves..." or "Am I the only one who thinks..."
+
+MUST be under 250 characters total. Be bold and opinionated."""
+
+
+# Every generation prompt starts with the same system message and transcript,
+# so the requests for one video share a prefix the provider can cache
+CONTENT_SYSTEM_PROMPT = """You write social media posts for audispot254 (automotive account) about YouTube car reviews.
+Base every post on the video transcript you are given, follow the platform requirements exactly and return only the JSON requested."""
+
+prompts = PromptRegistry(system=CONTENT_SYSTEM_PROMPT, prefix="TRANSCRIPT: $video_transcript")
+telemetry.add_sink(prompts)
+
+prompts.register("LinkedIn", f"""Create a LinkedIn post from the transcript above.
+
+{LINKEDIN_REQUIREMENTS}
 
 CRITICAL: Return ONLY valid JSON in this exact format:
-{{"platform": "Instagram", "content": "your post content here"}}"""
+{{"platform": "LinkedIn", "content": "your post content here"}}""")
 
-    result = llm_client.generate(instagram_prompt, max_tokens=400, temperature=0.8)
-    
+prompts.register("Instagram", f"""Create an Instagram post from the transcript above.
+
+{INSTAGRAM_REQUIREMENTS}
+
+CRITICAL: Return ONLY valid JSON in this exact format:
+{{"platform": "Instagram", "content": "your post content here"}}""")
+
+prompts.register("Twitter", f"""Create a Twitter/X post from the transcript above.
+
+{TWITTER_REQUIREMENTS}
+
+CRITICAL: Return ONLY valid JSON in this exact format:
+{{"platform": "Twitter", "content": "your tweet here", "char_count": 123}}""")
+
+prompts.register("combined", """Create social media posts from the transcript above, one per platform: $platform_list.
+
+Each platform must have COMPLETELY DIFFERENT content and tone.
+
+$sections
+
+CRITICAL: Return ONLY a valid JSON object whose "posts" array has exactly one object per platform, in this exact format:
+{"posts": [$example]}""")
+
+
+# Set by dispatch_tools_direct(): the user's custom instructions for this run
+_instructions = contextvars.ContextVar("instructions", default="")
+
+
+def _with_instructions(prompt: Prompt) -> Prompt:
+    """Append the run's custom instructions, if any, after the platform requirements.
+
+    They go at the very end, so the shared transcript prefix still caches.
+    """
+    instructions = _instructions.get().strip()
+    if not instructions:
+        return prompt
+    system, user = prompt.messages
+    content = (f"{user['content']}\n\nADDITIONAL INSTRUCTIONS (follow them, but keep the JSON format above):\n"
+               f"{instructions}")
+    return Prompt(prompt.name, (system, dict(user, content=content)))
+
+
+def _linkedin_prompt(video_transcript: str) -> Prompt:
+    """Build the LinkedIn generation prompt"""
+    return _with_instructions(prompts.render("LinkedIn", video_transcript=video_transcript))
+
+
+def _instagram_prompt(video_transcript: str) -> Prompt:
+    """Build the Instagram generation prompt"""
+    return _with_instructions(prompts.render("Instagram", video_transcript=video_transcript))
+
+
+def _twitter_prompt(video_transcript: str) -> Prompt:
+    """Build the Twitter generation prompt"""
+    return _with_instructions(prompts.render("Twitter", video_transcript=video_transcript))
+
+
+# Platform -> (prompt builder, max_tokens, temperature)
+PLATFORM_SPECS = {
+    "LinkedIn": (_linkedin_prompt, 500, 0.7),
+    "Instagram": (_instagram_prompt, 400, 0.8),
+    "Twitter": (_twitter_prompt, 250, 0.9),
+}
+
+PLATFORM_REQUIREMENTS = {
+    "LinkedIn": LINKEDIN_REQUIREMENTS,
+    "Instagram": INSTAGRAM_REQUIREMENTS,
+    "Twitter": TWITTER_REQUIREMENTS,
+}
+
+# Platform -> structured output schema requested from the provider
+PLATFORM_SCHEMAS = {
+    "LinkedIn": Post,
+    "Instagram": Post,
+    "Twitter": TwitterPost,
+}
+
+
+def _normalize_platform_output(result: str, platform: str) -> str:
+    """Turn a raw LLM response into the platform's JSON output string.
+
+    Schema-conforming replies take one validation; the text-extraction
+    fallbacks only run when the provider did not honour the schema. The
+    level used is recorded on the current telemetry record.
+    """
+    return _platform_output(*_parse_platform_result(result, platform), platform)
+
+
+def _parse_platform_result(result: str, platform: str) -> tuple[str, dict]:
+    """(parse level, post dict) of a raw LLM response"""
+    post = post_schema.parse(PLATFORM_SCHEMAS[platform], result)
+    if post is not None:
+        parsed = post.model_dump()
+        parsed["platform"] = platform
+        return "schema", parsed
+    return _parse_unstructured(result, platform)
+
+
+def _platform_output(level: str, parsed: dict, platform: str) -> str:
+    """The platform's JSON output string for a parsed post; records the parse level"""
+    record = telemetry.current()
+    if record is not None:
+        record.parse_fallback = level
+
+    if "platform" not in parsed:
+        parsed["platform"] = platform
+    # Add character count if not present (and keep the schema path's honest)
+    if platform == "Twitter" and "content" in parsed and (level == "schema" or "char_count" not in parsed):
+        parsed["char_count"] = len(parsed["content"])
+    return json.dumps(parsed)
+
+
+def _parse_unstructured(result: str, platform: str) -> tuple[str, dict]:
+    """Fallback chain for replies that are not schema JSON: (level, parsed dict)"""
+    level = "extracted"
     # Extract JSON from response (LLM might add extra text)
     parsed = extract_json_from_text(result)
-    if parsed:
-        if "platform" not in parsed:
-            parsed["platform"] = "Instagram"
-        return json.dumps(parsed)
-    
-    # Fallback: try parsing entire result
-    try:
-        parsed = json.loads(result)
-        if "platform" not in parsed:
-            parsed["platform"] = "Instagram"
-        return json.dumps(parsed)
-    except json.JSONDecodeError:
-        return json.dumps({"platform": "Instagram", "content": result})
+    if parsed is None:
+        # Fallback: try parsing entire result
+        level = "full_parse"
+        try:
+            parsed = json.loads(result)
+        except json.JSONDecodeError:
+            parsed = None
+    if not isinstance(parsed, dict):
+        # Last resort: wrap raw content
+        level = "raw_wrap"
+        parsed = {"platform": platform, "content": result}
+    return level, parsed
+
+
+def _create_linkedin_content_impl(video_transcript: str) -> str:
+    """Internal implementation for LinkedIn content creation"""
+    build_prompt, max_tokens, temperature = PLATFORM_SPECS["LinkedIn"]
+    with telemetry.scope(platform="LinkedIn"):
+        result = get_llm_client().generate(build_prompt(video_transcript), max_tokens=max_tokens,
+                                           temperature=temperature, schema=PLATFORM_SCHEMAS["LinkedIn"])
+        return _normalize_platform_output(result, "LinkedIn")
 
 
-@function_tool  
-def create_instagram_content(video_transcript: str) -> str:
-    """Creates engaging Instagram content for car enthusiasts and younger audience.
-    Returns JSON: {"platform": "Instagram", "content": "..."}"""
-    return _create_instagram_content_impl(video_transcript)
+def _create_instagram_content_impl(video_transcript: str) -> str:
+    """Internal implementation for Instagram content creation"""
+    build_prompt, max_tokens, temperature = PLATFORM_SPECS["Instagram"]
+    with telemetry.scope(platform="Instagram"):
+        result = get_llm_client().generate(build_prompt(video_transcript), max_tokens=max_tokens,
+                                           temperature=temperature, schema=PLATFORM_SCHEMAS["Instagram"])
+        return _normalize_platform_output(result, "Instagram")
 
 
 def _create_twitter_content_impl(video_transcript: str) -> str:
     """Internal implementation for Twitter content creation"""
-    twitter_prompt = f"""Create a Twitter/X post for audispot254 (automotive account).
+    build_prompt, max_tokens, temperature = PLATFORM_SPECS["Twitter"]
+    with telemetry.scope(platform="Twitter"):
+        client = get_llm_client()
+        if TWITTER_CANDIDATES <= 1:
+            result = client.generate(build_prompt(video_transcript), max_tokens=max_tokens,
+                                     temperature=temperature, schema=PLATFORM_SCHEMAS["Twitter"])
+            return _normalize_platform_output(result, "Twitter")
+        best = None
+        for round_ in range(TWITTER_CANDIDATE_ROUNDS):
+            # A retry round must not be answered from the cache with the same misfits
+            with client.bypass_cache(round_ > 0 or _cache_bypass.get()):
+                results = client.generate_candidates(build_prompt(video_transcript), TWITTER_CANDIDATES,
+                                                     max_tokens=max_tokens, temperature=temperature,
+                                                     schema=PLATFORM_SCHEMAS["Twitter"])
+            best = _best_tweet(results, best)
+            if best[0].fits:
+                break
+        return _platform_output(best[1], best[2], "Twitter")
 
-TRANSCRIPT: {video_transcript}
 
-TWITTER REQUIREMENTS:
-- AUDIENCE: Quick scrollers, debate starters, car Twitter community
-- TONE: Sharp, opinionated, conversation-starter
-- FOCUS: One surprising fact, hot take, or debate point
-- LENGTH: 200-250 characters maximum (including hashtags)
-- HASHTAGS: 2-3 only (#Audi #CarTwitter #AutomotiveDebate)
-- PERSPECTIVE: Someone dropping automotive knowledge/hot takes
-- INCLUDE: Question or statement that sparks replies
+async def _acreate_twitter_content(video_transcript: str) -> str:
+    """Async variant of the candidate path of _create_twitter_content_impl()"""
+    build_prompt, max_tokens, temperature = PLATFORM_SPECS["Twitter"]
+    client = get_llm_client()
+    best = None
+    for round_ in range(TWITTER_CANDIDATE_ROUNDS):
+        with client.bypass_cache(round_ > 0 or _cache_bypass.get()):
+            results = await client.agenerate_candidates(build_prompt(video_transcript), TWITTER_CANDIDATES,
+                                                        max_tokens=max_tokens, temperature=temperature,
+                                                        schema=PLATFORM_SCHEMAS["Twitter"])
+        best = _best_tweet(results, best)
+        if best[0].fits:
+            break
+    return _platform_output(best[1], best[2], "Twitter")
 
-Write as: "Hot take:" or "This review proves..." or "Am I the only one who thinks..."
 
-MUST be under 250 characters total. Be bold and opinionated.
+def _best_tweet(results: list[str], best: Optional[tuple] = None) -> tuple[TweetScore, str, dict]:
+    """(score, parse level, post) of the best candidate so far: fitting posts first, then closest to target"""
+    for result in results:
+        level, parsed = _parse_platform_result(result, "Twitter")
+        candidate = (score_tweet(parsed.get("content")), level, parsed)
+        if best is None or candidate[0].rank < best[0].rank:
+            best = candidate
+    return best
 
-CRITICAL: Return ONLY valid JSON in this exact format:
-{{"platform": "Twitter", "content": "your tweet here", "char_count": 123}}"""
 
-    result = llm_client.generate(twitter_prompt, max_tokens=250, temperature=0.9)
-    
-    # Extract JSON from response (LLM might add extra text)
-    parsed = extract_json_from_text(result)
-    if parsed:
-        if "platform" not in parsed:
-            parsed["platform"] = "Twitter"
-        # Add character count if not present
-        if "char_count" not in parsed and "content" in parsed:
-            parsed["char_count"] = len(parsed["content"])
-        return json.dumps(parsed)
-    
-    # Fallback: try parsing entire result
-    try:
-        parsed = json.loads(result)
-        if "platform" not in parsed:
-            parsed["platform"] = "Twitter"
-        # Add character count if not present
-        if "char_count" not in parsed and "content" in parsed:
-            parsed["char_count"] = len(parsed["content"])
-        return json.dumps(parsed)
-    except json.JSONDecodeError:
-        char_count = len(result)
-        return json.dumps({"platform": "Twitter", "content": result, "char_count": char_count})
+# Set by dispatch_tools_direct(): record each platform call as a tool span in the current trace
+_trace_tools = contextvars.ContextVar("trace_tools", default=False)
 
 
-@function_tool
-def create_twitter_content(video_transcript: str) -> str:
-    """Creates concise Twitter content for quick engagement.
-    Returns JSON: {"platform": "Twitter", "content": "...", "char_count": 123}"""
-    return _create_twitter_content_impl(video_transcript)
+@contextmanager
+def _tool_span(platform: str, video_transcript: str):
+    """Agents-framework function span for a direct tool call (no-op outside dispatch_tools_direct)"""
+    if not _trace_tools.get():
+        yield None
+        return
+    from agents import function_span
+    tool_input = json.dumps({"video_transcript": video_transcript})
+    with function_span(f"create_{platform.lower()}_content", input=tool_input) as span:
+        yield span
+
+
+async def _acreate_platform_content(video_transcript: str, platform: str) -> str:
+    """Async content creation for one platform via LLMClient.agenerate"""
+    build_prompt, max_tokens, temperature = PLATFORM_SPECS[platform]
+    with _tool_span(platform, video_transcript) as span, telemetry.scope(platform=platform):
+        if platform == "Twitter" and TWITTER_CANDIDATES > 1:
+            output = await _acreate_twitter_content(video_transcript)
+        else:
+            result = await get_llm_client().agenerate(build_prompt(video_transcript), max_tokens=max_tokens,
+                                                      temperature=temperature, schema=PLATFORM_SCHEMAS[platform])
+            output = _normalize_platform_output(result, platform)
+        if span is not None:
+            span.span_data.output = output
+        return output
 
 
 # -----------------------------------------------------
@@ -318,15 +995,150 @@ def generate_content_simple(transcript: str, platforms: list[str]) -> str:
     return "\n\n".join(results)
 
 
-def create_content_agent(platforms: list[str]) -> Agent:
-    """Creates an agent that only generates content for selected platforms"""
+async def generate_content_async(transcript: str, platforms: list[str],
+                                 max_concurrency: Optional[int] = None) -> str:
+    """Generate content for all platforms concurrently without using agents framework.
+
+    Total latency is roughly the slowest platform instead of the sum.
+    At most `max_concurrency` requests are in flight (default: MAX_CONCURRENCY).
+    Output format and platform order match generate_content_simple.
+    """
+    semaphore = asyncio.Semaphore(max_concurrency or MAX_CONCURRENCY)
+
+    async def run_one(platform: str) -> str:
+        async with semaphore:
+            return await _acreate_platform_content(transcript, platform)
+
+    selected = [p for p in platforms if p in PLATFORM_SPECS]
+    results = await asyncio.gather(*(run_one(p) for p in selected))
     
-    # Map platform names to tools
-    tool_map = {
+    # Combine all results
+    return "\n\n".join(results)
+
+
+
+async def stream_content_async(transcript: str, platforms: list[str],
+                               on_update: Callable[[str, str], None],
+                               max_concurrency: Optional[int] = None,
+                               min_interval: float = 0.1) -> str:
+    """Like generate_content_async, but streams tokens for every platform.
+
+    on_update(platform, partial_content) is called as text arrives (at most
+    every `min_interval` seconds per platform, plus once when it finishes),
+    with the post content decoded from the partial JSON. Returns the same
+    combined output as generate_content_async.
+    """
+    semaphore = asyncio.Semaphore(max_concurrency or MAX_CONCURRENCY)
+    loop = asyncio.get_running_loop()
+
+    def visible(raw: str) -> str:
+        # Show the decoded "content" field once the model has started it
+        content = partial_string_field(raw, "content")
+        return content if content is not None else raw
+
+    async def run_one(platform: str) -> str:
+        build_prompt, max_tokens, temperature = PLATFORM_SPECS[platform]
+        parts = []
+        last_update = 0.0
+        with _tool_span(platform, transcript) as span, telemetry.scope(platform=platform):
+            if platform == "Twitter" and TWITTER_CANDIDATES > 1:
+                # Candidates are scored whole, so the tweet appears at once instead of streaming
+                async with semaphore:
+                    output = await _acreate_twitter_content(transcript)
+                on_update(platform, json.loads(output).get("content", ""))
+                if span is not None:
+                    span.span_data.output = output
+                return output
+            async with semaphore:
+                async for text in get_llm_client().astream(build_prompt(transcript), max_tokens=max_tokens,
+                                                           temperature=temperature, schema=PLATFORM_SCHEMAS[platform]):
+                    parts.append(text)
+                    if loop.time() - last_update >= min_interval:
+                        last_update = loop.time()
+                        on_update(platform, visible("".join(parts)))
+            result = "".join(parts)
+            on_update(platform, visible(result))
+            output = _normalize_platform_output(result, platform)
+            if span is not None:
+                span.span_data.output = output
+            return output
+
+    selected = [p for p in platforms if p in PLATFORM_SPECS]
+    results = await asyncio.gather(*(run_one(p) for p in selected))
+    
+    # Combine all results
+    return "\n\n".join(results)
+
+
+async def dispatch_tools_direct(transcript: str, platforms: list[str],
+                               on_update: Optional[Callable[[str, str], None]] = None,
+                               max_concurrency: Optional[int] = None, instructions: str = "") -> str:
+    """Deterministic orchestration: call the selected platform tools directly and concurrently.
+
+    Produces what the agent path does without the orchestrator model: no
+    extra round trip, and the transcript is not re-emitted as tool-call
+    arguments. Runs inside a "Generating content" trace with one function
+    span per tool, like the agent's tool calls. Streams when on_update is given.
+    instructions (the agent path's user query) are appended to every platform prompt.
+    """
+    from agents import trace
+
+    token = _trace_tools.set(True)
+    instructions_token = _instructions.set(instructions)
+    try:
+        with trace("Generating content", metadata={"orchestration": "direct"}):
+            if on_update is not None:
+                return await stream_content_async(transcript, platforms, on_update, max_concurrency)
+            return await generate_content_async(transcript, platforms, max_concurrency)
+    finally:
+        _instructions.reset(instructions_token)
+        _trace_tools.reset(token)
+
+
+@lru_cache(maxsize=None)
+def _agent_tools() -> dict:
+    """Platform -> function tool for the agents framework, built on first use"""
+    from agents import function_tool
+
+    @function_tool
+    def create_linkedin_content(video_transcript: str) -> str:
+        """Creates professional LinkedIn content for automotive industry professionals.
+        Returns JSON: {"platform": "LinkedIn", "content": "..."}"""
+        return _create_linkedin_content_impl(video_transcript)
+
+    @function_tool
+    def create_instagram_content(video_transcript: str) -> str:
+        """Creates engaging Instagram content for car enthusiasts and younger audience.
+        Returns JSON: {"platform": "Instagram", "content": "..."}"""
+        return _create_instagram_content_impl(video_transcript)
+
+    @function_tool
+    def create_twitter_content(video_transcript: str) -> str:
+        """Creates concise Twitter content for quick engagement.
+        Returns JSON: {"platform": "Twitter", "content": "...", "char_count": 123}"""
+        return _create_twitter_content_impl(video_transcript)
+
+    return {
         "LinkedIn": create_linkedin_content,
         "Instagram": create_instagram_content,
         "Twitter": create_twitter_content
     }
+
+
+def create_content_agent(platforms: list[str]) -> "Agent":
+    """Creates an agent that only generates content for selected platforms.
+
+    Agents are immutable configuration, so one is built per platform selection and reused.
+    """
+    return _create_content_agent(tuple(platforms))
+
+
+@lru_cache(maxsize=None)
+def _create_content_agent(platforms: tuple) -> "Agent":
+    from agents import Agent
+
+    # Map platform names to tools
+    tool_map = _agent_tools()
     
     # Select only requested tools
     selected_tools = [tool_map[p] for p in platforms if p in tool_map]
@@ -365,31 +1177,218 @@ Your job is to call the tools and return their JSON outputs."""
 
 
 # -----------------------------------------------------
-# Transcript Fetcher
+# Combined Generation (transcript sent once)
 # -----------------------------------------------------
 
-def get_transcript(video_id: str) -> str:
-    """Fetch YouTube transcript with error logging"""
-    logging.basicConfig(
-        filename='transcript_errors.log',
-        level=logging.ERROR,
-        format='%(asctime)s %(levelname)s:%(message)s'
+def _combined_prompt(video_transcript: str, platforms: list[str]) -> Prompt:
+    """Build one prompt that carries the transcript once and asks for every platform"""
+    return prompts.render(
+        "combined",
+        video_transcript=video_transcript,
+        platform_list=", ".join(platforms),
+        sections="\n\n".join(PLATFORM_REQUIREMENTS[p] for p in platforms),
+        example=", ".join(f'{{"platform": "{p}", "content": "your {p} post here"}}' for p in platforms),
     )
+
+
+def _extract_json_array(text: str) -> list:
+    """Extract a list of post objects from a combined response"""
+    try:
+        data = json.loads(text)
+    except json.JSONDecodeError:
+        data = None
+        start, end = text.find("["), text.rfind("]")
+        if start != -1 and end > start:
+            try:
+                data = json.loads(text[start:end + 1])
+            except json.JSONDecodeError:
+                data = None
+    if data is None:
+        data = extract_json_from_text(text)
+
+    # JSON-mode models sometimes wrap the array: {"posts": [...]}
+    if isinstance(data, dict):
+        wrapped = next((v for v in data.values() if isinstance(v, list)), None)
+        data = wrapped if wrapped is not None else [data]
+    return data if isinstance(data, list) else []
+
+
+def _validate_post(entry, platform: str) -> Optional[dict]:
+    """Return the entry in the per-platform output shape, or None if malformed"""
+    if not isinstance(entry, dict):
+        return None
+    content = entry.get("content")
+    if not isinstance(content, str) or not content.strip():
+        return None
+    post = {"platform": platform, "content": content}
+    if platform == "Twitter":
+        post["char_count"] = len(content)
+    return post
+
+
+def _split_combined_result(result: str, platforms: list[str]) -> tuple[dict[str, str], str]:
+    """Map platform -> JSON output for every valid entry in a combined response, plus the parse level"""
+    combined = post_schema.parse(CombinedPosts, result)
+    if combined is not None:
+        level, entries = "schema", [p.model_dump() for p in combined.posts]
+    else:
+        level, entries = "extracted", _extract_json_array(result)
+    outputs = {}
+    for entry in entries:
+        if not isinstance(entry, dict):
+            continue
+        name = str(entry.get("platform", ""))
+        platform = next((p for p in platforms if p.lower() == name.lower()), None)
+        if platform is None or platform in outputs:
+            continue
+        post = _validate_post(entry, platform)
+        if post is not None:
+            outputs[platform] = json.dumps(post)
+    return outputs, level
+
+
+def _combined_request_args(transcript: str, platforms: list[str]) -> tuple[Prompt, int, float]:
+    """Prompt, max_tokens and temperature for a combined request"""
+    max_tokens = sum(PLATFORM_SPECS[p][1] for p in platforms)
+    temperature = max(PLATFORM_SPECS[p][2] for p in platforms)
+    return _combined_prompt(transcript, platforms), max_tokens, temperature
+
+
+def generate_content_combined(transcript: str, platforms: list[str]) -> str:
+    """Generate content for all platforms in a single LLM request.
+
+    Missing or malformed entries fall back to the per-platform prompt for
+    that platform only. Output format matches generate_content_simple.
+    """
+    selected = [p for p in platforms if p in PLATFORM_SPECS]
+    if not selected:
+        return ""
+    prompt, max_tokens, temperature = _combined_request_args(transcript, selected)
+    with telemetry.scope(platform="+".join(selected)) as record:
+        result = get_llm_client().generate(prompt, max_tokens=max_tokens, temperature=temperature,
+                                           schema=CombinedPosts)
+        outputs, level = _split_combined_result(result, selected)
+        record.parse_fallback = level if len(outputs) == len(selected) else "per_platform"
+
+    for platform in selected:
+        if platform not in outputs:
+            logging.warning(f"Combined output missing {platform}, falling back to per-platform prompt")
+            outputs[platform] = generate_content_simple(transcript, [platform])
+    
+    # Combine all results
+    return "\n\n".join(outputs[p] for p in selected)
+
+
+async def generate_content_combined_async(transcript: str, platforms: list[str],
+                                          max_concurrency: Optional[int] = None) -> str:
+    """Async variant of generate_content_combined; fallbacks run concurrently"""
+    selected = [p for p in platforms if p in PLATFORM_SPECS]
+    if not selected:
+        return ""
+    prompt, max_tokens, temperature = _combined_request_args(transcript, selected)
+    with telemetry.scope(platform="+".join(selected)) as record:
+        result = await get_llm_client().agenerate(prompt, max_tokens=max_tokens, temperature=temperature,
+                                                  schema=CombinedPosts)
+        outputs, level = _split_combined_result(result, selected)
+        record.parse_fallback = level if len(outputs) == len(selected) else "per_platform"
+
+    missing = [p for p in selected if p not in outputs]
+    if missing:
+        logging.warning(f"Combined output missing {', '.join(missing)}, falling back to per-platform prompts")
+        fallback = await generate_content_async(transcript, missing, max_concurrency)
+        outputs.update(zip(missing, fallback.split("\n\n")))
     
+    # Combine all results
+    return "\n\n".join(outputs[p] for p in selected)
+
+
+# -----------------------------------------------------
+# Transcript Fetcher
+# -----------------------------------------------------
+
+# Configure the error log once at import instead of on every fetch
+transcript_logger = logging.getLogger("content_writer.transcript")
+if not transcript_logger.handlers:
+    _log_handler = logging.FileHandler('transcript_errors.log', delay=True)
+    _log_handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)s:%(message)s'))
+    transcript_logger.addHandler(_log_handler)
+    transcript_logger.setLevel(logging.ERROR)
+
+
+def fetch_transcript_snippets(video_id: str) -> list[dict]:
+    """Fetch YouTube transcript snippets, logging and re-raising on failure"""
     try:
         # Use the new API: create instance and call fetch()
         api = YouTubeTranscriptApi()
         transcript = api.fetch(video_id)
         
-        # Access text attribute from FetchedTranscriptSnippet objects
-        transcript_text = " ".join([entry.text for entry in transcript])
-        return transcript_text
+        # Keep text and timing from FetchedTranscriptSnippet objects
+        return [
+            {"text": entry.text, "start": entry.start, "duration": entry.duration}
+            for entry in transcript
+        ]
     except Exception as e:
         import traceback
         error_message = f"Error fetching transcript for video_id {video_id}: {e}\n{traceback.format_exc()}"
         print(error_message)
-        logging.error(error_message)
-        return ""
+        transcript_logger.error(error_message)
+        raise
+
+
+# Shared across Streamlit sessions and processes via the on-disk store
+transcript_cache = TranscriptCache(fetcher=fetch_transcript_snippets)
+
+
+def get_transcript_snippets(video_id: str) -> list[dict]:
+    """Cached transcript snippets ({"text", "start", "duration"}); empty list on failure"""
+    return transcript_cache.get_snippets(video_id)
+
+
+def get_transcript(video_id: str) -> str:
+    """Fetch YouTube transcript text through the persistent cache ("" on failure)"""
+    return transcript_cache.get(video_id)
+
+
+def get_compressed_transcript(video_id: str,
+                              token_budget: Optional[int] = None) -> tuple[str, Optional[Compression]]:
+    """Transcript text with its least informative windows dropped to fit token_budget.
+
+    Local and network-free after the (cached) fetch; see compress.py. Short
+    transcripts come back exactly as get_transcript() returns them.
+    Returns ("", None) on failure.
+    """
+    snippets = get_transcript_snippets(video_id)
+    if not snippets:
+        return "", None
+    budget = TRANSCRIPT_COMPRESS_TOKENS if token_budget is None else token_budget
+    result = compress_snippets(snippets, budget)
+    if result.ratio > 1.0:
+        logging.info(f"Compressed transcript {video_id}: {result.original_tokens} -> "
+                     f"{result.compressed_tokens} tokens ({result.ratio:.1f}x)")
+    return result.text, result
+
+
+# -----------------------------------------------------
+# Transcript Condensation
+# -----------------------------------------------------
+
+async def condense_for_prompts(transcript: str, max_concurrency: Optional[int] = None) -> str:
+    """Condense a transcript into a bounded facts digest for the platform prompts.
+
+    Short transcripts pass through unchanged; long ones are map-reduce
+    summarised in parallel and cached per transcript hash (see condense.py).
+    """
+    client = get_llm_client()
+
+    async def summarize(prompt: str, max_tokens: int) -> str:
+        return await client.agenerate(prompt, max_tokens=max_tokens, temperature=0.2)
+
+    return await condense_transcript(
+        transcript,
+        summarize,
+        max_concurrency=max_concurrency or MAX_CONCURRENCY,
+        model=f"{client.provider}:{client.model}"
+    )
 
 
 # -----------------------------------------------------
@@ -398,19 +1397,23 @@ def get_transcript(video_id: str) -> str:
 
 async def main():
     """Test the agent with all platforms"""
+    from agents import Runner, RunConfig, ItemHelpers, trace
+
     video_id = "6hr6wZr1N_8"
     platforms = ["LinkedIn", "Instagram", "Twitter"]
     
-    transcript = get_transcript(video_id)
+    transcript, compression = get_compressed_transcript(video_id)
     if not transcript:
         print("❌ Failed to fetch transcript")
         return
+    print(f"📉 Transcript: {compression_summary(compression)}")
+    digest = await condense_for_prompts(transcript)
 
     msg = f"""Create platform-specific posts for audispot254 from this automotive video.
 
 Target platforms: {', '.join(platforms)}
 
-Video transcript: {transcript[:1000]}...
+Video transcript (key facts): {digest}
 
 Generate distinct content for each platform."""
 
@@ -423,7 +1426,7 @@ Generate distinct content for each platform."""
         if USE_OPENAI:
             result = await Runner.run(agent, input_items)
         else:
-            run_config = RunConfig(model_provider=ollama_provider)
+            run_config = RunConfig(model_provider=get_ollama_provider())
             result = await Runner.run(agent, input_items, run_config=run_config)
         output = ItemHelpers.text_message_outputs(result.new_items)
         
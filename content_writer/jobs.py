@@ -0,0 +1,207 @@
+# -----------------------------------------------------
+# Background Generation Jobs
+# -----------------------------------------------------
+"""
+Run content generation off the Streamlit script thread.
+
+JobQueue owns one event loop on a daemon thread for the whole server
+process. submit() schedules a coroutine there and returns a job ID at once;
+at most `max_concurrent` jobs run at a time, the rest wait in FIFO order.
+The UI polls get(job_id) for status and partial output, so a rerun (or a
+page refresh, with the ID in the URL) simply re-attaches to the job.
+Finished jobs are written to a SQLite store and stay retrievable after they
+drop out of memory or the server restarts.
+
+Queue depth, wait time (submitted -> started) and run time are exported to
+a telemetry.MetricsRegistry when one is given.
+"""
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from dataclasses import asdict, dataclass, field
+from typing import Awaitable, Callable, Optional
+
+from sqlite_store import SQLiteStore
+
+DEFAULT_STORE_PATH = os.getenv(
+    "JOB_STORE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "jobs.sqlite3"),
+)
+DEFAULT_CONCURRENCY = int(os.getenv("JOB_CONCURRENCY", "2"))
+DEFAULT_TTL = float(os.getenv("JOB_TTL", str(7 * 24 * 3600)))
+MEMORY_JOBS = 100   # finished jobs kept in memory; older ones are read from the store
+
+ACTIVE = ("queued", "running")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id        TEXT PRIMARY KEY,
+    data      TEXT NOT NULL,
+    finished  REAL NOT NULL
+)
+"""
+
+
+@dataclass
+class Job:
+    """One generation request and everything the UI shows about it"""
+    id: str
+    params: dict
+    status: str = "queued"          # queued / running / done / failed / cancelled
+    submitted: float = field(default_factory=time.time)
+    started: Optional[float] = None
+    finished: Optional[float] = None
+    output: Optional[str] = None
+    error: Optional[str] = None
+    partial: dict = field(default_factory=dict)    # platform -> text streamed so far
+    stats: dict = field(default_factory=dict)      # filled by the runner (JSON-serialisable)
+
+    @property
+    def active(self) -> bool:
+        return self.status in ACTIVE
+
+    @property
+    def wait(self) -> Optional[float]:
+        """Seconds between submission and start"""
+        return self.started - self.submitted if self.started is not None else None
+
+    @property
+    def runtime(self) -> Optional[float]:
+        if self.started is None or self.finished is None:
+            return None
+        return self.finished - self.started
+
+    def as_dict(self) -> dict:
+        return asdict(self)
+
+
+class JobStore(SQLiteStore):
+    """Finished jobs in SQLite, expired after ttl seconds"""
+
+    def __init__(self, path: str = DEFAULT_STORE_PATH, ttl: float = DEFAULT_TTL):
+        self.ttl = ttl
+        super().__init__(path, _SCHEMA)
+
+    def save(self, job: Job):
+        data = json.dumps(job.as_dict(), ensure_ascii=False, default=str)
+        with self._lock, self._connect() as conn:
+            conn.execute("INSERT OR REPLACE INTO jobs VALUES (?, ?, ?)", (job.id, data, job.finished or time.time()))
+            conn.execute("DELETE FROM jobs WHERE finished < ?", (time.time() - self.ttl,))
+
+    def load(self, job_id: str) -> Optional[Job]:
+        with self._lock, self._connect() as conn:
+            row = conn.execute(
+                "SELECT data FROM jobs WHERE id = ? AND finished >= ?", (job_id, time.time() - self.ttl)
+            ).fetchone()
+        return Job(**json.loads(row[0])) if row else None
+
+
+Runner = Callable[[Job], Awaitable[str]]
+
+
+class JobQueue:
+    """Process-wide worker pool: a persistent event loop with a concurrency cap"""
+
+    def __init__(self, max_concurrent: int = DEFAULT_CONCURRENCY, store: Optional[JobStore] = None,
+                 metrics=None):
+        self.max_concurrent = max_concurrent
+        self.store = store if store is not None else JobStore()
+        self.metrics = metrics
+        self.jobs = {}      # job id -> Job, insertion (submission) ordered
+        self._tasks = {}    # job id -> concurrent.futures.Future of the running coroutine
+        self._lock = threading.Lock()
+        self._loop = asyncio.new_event_loop()
+        self._slots = asyncio.Semaphore(max_concurrent)
+        threading.Thread(target=self._loop.run_forever, name="job-queue", daemon=True).start()
+
+    def submit(self, runner: Runner, params: dict) -> str:
+        """Queue runner(job) and return the job ID immediately"""
+        job = Job(id=uuid.uuid4().hex[:12], params=params)
+        with self._lock:
+            self.jobs[job.id] = job
+            self._tasks[job.id] = asyncio.run_coroutine_threadsafe(self._run(job, runner), self._loop)
+        self._report()
+        return job.id
+
+    async def _run(self, job: Job, runner: Runner):
+        try:
+            async with self._slots:
+                job.status, job.started = "running", time.time()
+                self._report()
+                job.output = await runner(job)
+                job.status = "done"
+        except asyncio.CancelledError:
+            job.status = "cancelled"
+        except Exception as e:
+            logging.exception(f"Job {job.id} failed")
+            job.status, job.error = "failed", f"{type(e).__name__}: {e}"
+        finally:
+            job.finished = time.time()
+            await self._finish(job)
+
+    async def _finish(self, job: Job):
+        try:
+            # SQLite write in a thread: this loop runs every session's jobs
+            await asyncio.to_thread(self.store.save, job)
+        except Exception as e:
+            # The job stays readable from memory until evicted
+            logging.warning(f"Could not store job {job.id}: {e}")
+        with self._lock:
+            self._tasks.pop(job.id, None)
+            finished = [j for j in self.jobs.values() if not j.active]
+            for old in finished[:max(len(finished) - MEMORY_JOBS, 0)]:
+                del self.jobs[old.id]
+        if self.metrics is not None:
+            labels = (("status", job.status),)
+            self.metrics.inc("jobs_total", labels)
+            if job.wait is not None:
+                self.metrics.observe("job_wait_seconds", (), job.wait)
+            if job.runtime is not None:
+                self.metrics.observe("job_run_seconds", labels, job.runtime)
+        self._report()
+
+    def _report(self):
+        if self.metrics is not None:
+            stats = self.stats()
+            self.metrics.set_gauge("jobs_queued", (), stats["queued"])
+            self.metrics.set_gauge("jobs_running", (), stats["running"])
+
+    def get(self, job_id: str) -> Optional[Job]:
+        """A job from memory, else from the store (None if unknown or expired)"""
+        job = self.jobs.get(job_id)
+        return job if job is not None else self.store.load(job_id)
+
+    def cancel(self, job_id: str) -> bool:
+        """Cancel a queued or running job; False if it already finished"""
+        with self._lock:
+            future = self._tasks.get(job_id)
+        if future is None:
+            return False
+        # Future.cancel() is thread-safe and cancels the task inside the loop
+        return future.cancel()
+
+    def position(self, job_id: str) -> int:
+        """Jobs ahead of a queued job (0 = next to start)"""
+        queued = [j.id for j in list(self.jobs.values()) if j.status == "queued"]
+        return queued.index(job_id) if job_id in queued else 0
+
+    def stats(self) -> dict:
+        jobs = list(self.jobs.values())
+        waits = [j.wait for j in jobs if j.wait is not None]
+        return {
+            "queued": sum(j.status == "queued" for j in jobs),
+            "running": sum(j.status == "running" for j in jobs),
+            "max_concurrent": self.max_concurrent,
+            "wait_mean": sum(waits) / len(waits) if waits else None,
+            "wait_max": max(waits) if waits else None,
+        }
+
+    def shutdown(self):
+        """Cancel every job and stop the loop (tests and scripts; the app never calls this)"""
+        for job_id in list(self._tasks):
+            self.cancel(job_id)
+        self._loop.call_soon_threadsafe(self._loop.stop)
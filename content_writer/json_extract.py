@@ -0,0 +1,340 @@
+# -----------------------------------------------------
+# Incremental JSON Object Extraction
+# -----------------------------------------------------
+"""
+Single-pass, resumable extraction of JSON objects from LLM output.
+
+LLMs wrap JSON in prose ("Sure! Here is your post: {...}"), so we scan for
+balanced top-level `{...}` spans and hand each one to json.loads once. The
+scanner keeps its state (depth, string/escape flags) between feed() calls,
+so it works on streamed tokens and emits an object as soon as its closing
+brace arrives. Only the current candidate is buffered, capped at
+`max_buffer` characters.
+
+Objects come out in the order the previous, quadratic extractor would have
+found them: it tried every `{` in turn and returned the first balanced span
+that parsed. If a top-level candidate is not valid JSON, its nested objects
+are tried in order of their opening brace instead, so `{junk {"platform":
+...} junk}` still yields the inner post. Nested spans that contain the
+decoder's error position must fail the same way and are skipped, which
+keeps this linear.
+
+A stray brace in prose (`He said "{" then {"platform": ...}`) makes the
+scanner read the real object as string content. So when a candidate fails
+(invalid or unterminated at finish()), the braces it did not prove invalid
+(ones it read inside strings or after a backslash) come first: if one
+precedes the nested object salvaged above, or nothing was salvaged, the
+buffered tail is scanned again from it. Braces a failed candidate proved
+invalid are skipped, since a scan from there would repeat the same failure.
+Rescanned characters are capped at RESCAN_BUDGET per character fed (plus
+RESCAN_SLACK), so the work stays linear; only input that exhausts the
+budget (far beyond a model reply) can get a later object than the legacy
+extractor, or none.
+
+index_platform_posts() indexes a whole generation output (every platform)
+in one pass, so the app doesn't re-parse the output once per platform.
+"""
+import json
+import re
+from typing import Optional
+
+DEFAULT_MAX_BUFFER = 1024 * 1024
+MAX_RESCAN_DEPTH = 32   # rescans started from within a rescan
+RESCAN_BUDGET = 2       # characters rescanned per character fed...
+RESCAN_SLACK = 4096     # ...plus this many, so short outputs are never cut off
+
+# Characters that change scanner state outside / inside a JSON string. A
+# backslash outside a string escapes the next character too, as the legacy
+# extractor did (valid JSON never has one there)
+_STRUCTURAL = re.compile(r'[{}"\\]')
+_IN_STRING = re.compile(r'["\\]')
+_WHITESPACE = re.compile(r"\s*")
+_DECODER = json.JSONDecoder()
+
+
+def _loads_object(text: str) -> tuple[Optional[dict], Optional[int]]:
+    """Parse text as a JSON object; return (object, None) or (None, error position).
+
+    (None, None) means give up on this candidate: nesting too deep to decode.
+    """
+    try:
+        data = json.loads(text)
+    except json.JSONDecodeError as e:
+        return None, e.pos
+    except RecursionError:
+        return None, None
+    return (data, None) if isinstance(data, dict) else (None, 0)
+
+
+def _salvage(text: str, spans: list, error_pos: Optional[int] = None) -> tuple[Optional[dict], int, list]:
+    """First valid nested object of a failed candidate, by opening-brace order.
+
+    A span ending before the parent's error position was parsed successfully
+    as part of the parent; a span containing it fails at the same spot.
+    Returns (object or None, its start, starts of the spans proven invalid).
+    """
+    failed = []
+    for start, end in sorted(spans):
+        if error_pos is not None and start < error_pos:
+            if end > error_pos:
+                failed.append(start)
+                continue
+        obj, pos = _loads_object(text[start:end])
+        if obj is not None:
+            return obj, start, failed
+        if pos is None:
+            break
+        failed.append(start)
+        error_pos = start + pos
+    return None, len(text), failed
+
+
+class JSONObjectExtractor:
+    """Streaming extractor for top-level JSON objects embedded in text.
+
+        extractor = JSONObjectExtractor()
+        for chunk in stream:
+            for obj in extractor.feed(chunk):
+                ...
+        leftovers = extractor.finish()
+    """
+
+    def __init__(self, max_buffer: int = DEFAULT_MAX_BUFFER, max_objects: Optional[int] = None):
+        self.max_buffer = max_buffer
+        self.max_objects = max_objects
+        self.emitted = 0
+        self._consumed = 0      # characters fed so far
+        self._rescanned = 0     # characters fed again by rescans
+        self._rescan_depth = 0
+        self._dead = set()      # stream positions of braces a failed candidate read as structure
+        self._reset()
+
+    @property
+    def done(self) -> bool:
+        return self.max_objects is not None and self.emitted >= self.max_objects
+
+    def _reset(self):
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._pieces = []       # buffered text of the current candidate
+        self._length = 0        # characters buffered in _pieces
+        self._starts = []       # offsets of currently open nested braces
+        self._spans = []        # (start, end) of closed nested objects
+        self._origin = 0        # stream position of the candidate's opening brace
+
+    def feed(self, chunk: str, base: Optional[int] = None) -> list[dict]:
+        """Consume a chunk; return objects completed within it
+
+        base is the chunk's stream position; only rescans pass it.
+        """
+        if base is None:
+            base = self._consumed
+            self._consumed += len(chunk)
+        found = []
+        pos, n = 0, len(chunk)
+        piece_start = 0
+
+        while pos < n and not self.done:
+            if self._depth == 0:
+                # Outside any object: jump straight to the next opening brace
+                start = chunk.find("{", pos)
+                if start == -1:
+                    break
+                piece_start = start
+                self._depth = 1
+                self._origin = base + start
+                pos = start + 1
+                continue
+
+            if self._escape:
+                self._escape = False
+                pos += 1
+                continue
+
+            pattern = _IN_STRING if self._in_string else _STRUCTURAL
+            match = pattern.search(chunk, pos)
+            if match is None:
+                pos = n
+                break
+            i = match.start()
+            char = chunk[i]
+            pos = i + 1
+
+            if char == "\\":
+                self._escape = True
+            elif char == '"':
+                self._in_string = not self._in_string
+            elif char == "{":
+                self._depth += 1
+                self._starts.append(self._length + i - piece_start)
+            else:  # "}"
+                self._depth -= 1
+                if self._depth > 0:
+                    self._spans.append((self._starts.pop(), self._length + pos - piece_start))
+                else:
+                    self._pieces.append(chunk[piece_start:pos])
+                    obj, tail = self._close()
+                    if obj is not None:
+                        found.append(obj)
+                        self.emitted += 1
+                    elif tail:
+                        found.extend(self._rescan(*tail))
+                        # A candidate the rescan left open continues in this chunk
+                        piece_start = pos
+
+        if self._depth > 0 and not self.done:
+            # Carry the open candidate over to the next chunk
+            self._pieces.append(chunk[piece_start:])
+            self._length += n - piece_start
+            if self._length > self.max_buffer:
+                self._reset()
+        return found
+
+    def _take_candidate(self) -> tuple[str, list, int, list]:
+        """Buffered candidate text, its closed nested spans, its stream position and unclosed nested braces"""
+        taken = "".join(self._pieces), self._spans, self._origin, self._starts
+        self._reset()
+        return taken
+
+    def _resolve(self, text: str, spans: list, origin: int, opens: list,
+                 error_pos: Optional[int] = None) -> tuple[Optional[dict], Optional[tuple]]:
+        """Salvage a failed candidate, unless an unproven brace comes first.
+
+        Returns (object, None), or (None, (tail, position) to rescan or None).
+        """
+        obj, start, failed = _salvage(text, spans, error_pos)
+        # The opening brace and unclosed nested ones can't balance from a fresh start either
+        self._dead.update(origin + i for i in (0, *opens, *failed))
+        restart = text.find("{", 1, start)
+        while restart != -1 and origin + restart in self._dead:
+            restart = text.find("{", restart + 1, start)
+        if (restart == -1 or self._rescan_depth >= MAX_RESCAN_DEPTH
+                or self._rescanned + len(text) - restart > RESCAN_BUDGET * self._consumed + RESCAN_SLACK):
+            return obj, None
+        return None, (text[restart:], origin + restart)
+
+    def _rescan(self, tail: str, base: int) -> list[dict]:
+        self._rescanned += len(tail)
+        self._rescan_depth += 1
+        try:
+            return self.feed(tail, base)
+        finally:
+            self._rescan_depth -= 1
+
+    def _close(self) -> tuple[Optional[dict], Optional[tuple]]:
+        """Parse the finished candidate, falling back to its nested objects.
+
+        Returns (object, None), or (None, (tail, position) to rescan or None).
+        """
+        text, spans, origin, opens = self._take_candidate()
+        obj, error_pos = _loads_object(text)
+        if obj is not None:
+            return obj, None
+        # Nesting too deep to decode: don't try the nested spans either
+        return self._resolve(text, spans if error_pos is not None else [], origin, opens, error_pos)
+
+    def finish(self) -> list[dict]:
+        """Flush at end of stream: salvage a closed object from an unterminated candidate"""
+        found = []
+        while self._depth > 0 and not self.done:
+            obj, tail = self._resolve(*self._take_candidate())
+            if obj is not None:
+                self.emitted += 1
+                found.append(obj)
+                break
+            if tail is None:
+                break
+            # The rescan may leave its own candidate open: loop to flush it
+            found.extend(self._rescan(*tail))
+        self._reset()
+        return found
+
+
+def extract_first_json_object(text: str) -> Optional[dict]:
+    """Return the first valid JSON object embedded in text, or None"""
+    extractor = JSONObjectExtractor(max_buffer=max(len(text), DEFAULT_MAX_BUFFER), max_objects=1)
+    found = extractor.feed(text) or extractor.finish()
+    return found[0] if found else None
+
+
+def _index_posts(data, index: dict):
+    """Add every post in a parsed value (post, list of posts, {"posts": [...]}) to index"""
+    if isinstance(data, list):
+        for item in data:
+            _index_posts(item, index)
+    elif isinstance(data, dict):
+        platform = data.get("platform")
+        if isinstance(platform, str):
+            index.setdefault(platform.lower(), data)
+        elif isinstance(data.get("posts"), list):
+            _index_posts(data["posts"], index)
+
+
+def index_platform_posts(text: str) -> dict[str, dict]:
+    """Map lowercased platform -> first post object found in generation output.
+
+    Handles a JSON array or {"posts": [...]} object, objects separated by
+    blank lines (the per-platform output) and objects embedded in prose (the
+    agent's reply), in one pass over the text however many platforms it holds.
+    """
+    index = {}
+    pos, n = 0, len(text)
+    # Fast path: whitespace-separated JSON values, decoded by the C scanner
+    while True:
+        pos = _WHITESPACE.match(text, pos).end()
+        if pos == n:
+            return index
+        try:
+            data, pos = _DECODER.raw_decode(text, pos)
+        except (json.JSONDecodeError, RecursionError):
+            break
+        _index_posts(data, index)
+    # Prose from here on: decode each embedded object directly; at the first
+    # malformed one, hand the remainder to the scanner (still a single pass)
+    while True:
+        start = text.find("{", pos)
+        if start == -1:
+            return index
+        try:
+            data, pos = _DECODER.raw_decode(text, start)
+        except (json.JSONDecodeError, RecursionError):
+            break
+        _index_posts(data, index)
+    rest = text[start:]
+    extractor = JSONObjectExtractor(max_buffer=max(len(rest), DEFAULT_MAX_BUFFER))
+    for obj in extractor.feed(rest) + extractor.finish():
+        _index_posts(obj, index)
+    return index
+
+
+def partial_string_field(text: str, field: str) -> Optional[str]:
+    """Decoded value of a string field in possibly incomplete JSON, or None.
+
+    Used to show a post while it streams in: for `{"platform": "X", "content": "Hot ta`
+    partial_string_field(text, "content") returns "Hot ta".
+    """
+    match = re.search(r'"%s"\s*:\s*"' % re.escape(field), text)
+    if match is None:
+        return None
+    start = pos = match.end()
+    while True:
+        found = _IN_STRING.search(text, pos)
+        if found is None:
+            raw = text[start:]
+            break
+        i = found.start()
+        if text[i] == '"':
+            raw = text[start:i]
+            break
+        # Escape sequence; drop it if it hasn't fully arrived yet
+        length = 6 if text[i + 1:i + 2] == "u" else 2
+        if i + length > len(text):
+            raw = text[start:i]
+            break
+        pos = i + length
+    try:
+        # strict=False: models often emit raw newlines inside strings
+        return json.loads(f'"{raw}"', strict=False)
+    except ValueError:
+        return raw
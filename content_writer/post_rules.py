@@ -0,0 +1,47 @@
+# -----------------------------------------------------
+# Local Post Scoring
+# -----------------------------------------------------
+"""
+Check generated posts against the platform rules without another LLM call.
+
+Twitter candidates must fit in 280 characters and carry 2-3 hashtags; among
+those that fit, the one closest to the 200-250 character sweet spot from the
+prompt wins. The rules mirror TWITTER_REQUIREMENTS in content_agent.py.
+"""
+import re
+from dataclasses import dataclass
+from typing import Optional
+
+TWITTER_MAX_CHARS = 280
+TWITTER_TARGET_CHARS = (200, 250)
+TWITTER_HASHTAGS = (2, 3)
+HASHTAG_PENALTY = 25    # one hashtag too many or too few weighs like 25 characters off target
+
+_HASHTAG = re.compile(r"(?<!\w)#\w+")
+
+
+@dataclass(frozen=True)
+class TweetScore:
+    chars: int
+    hashtags: int
+    fits: bool          # within the hard limits
+    penalty: float      # distance from the ideal; lower is better
+
+    @property
+    def rank(self) -> tuple:
+        """Sort key: fitting posts first, then by penalty"""
+        return (not self.fits, self.penalty)
+
+
+def score_tweet(content: Optional[str]) -> TweetScore:
+    """Score a tweet on length and hashtag rules (missing content never fits)"""
+    if not content:
+        return TweetScore(0, 0, False, float("inf"))
+    chars = len(content)
+    hashtags = len(_HASHTAG.findall(content))
+    low, high = TWITTER_TARGET_CHARS
+    min_tags, max_tags = TWITTER_HASHTAGS
+    fits = chars <= TWITTER_MAX_CHARS and min_tags <= hashtags <= max_tags
+    penalty = (max(low - chars, 0) + max(chars - high, 0)
+               + HASHTAG_PENALTY * (max(min_tags - hashtags, 0) + max(hashtags - max_tags, 0)))
+    return TweetScore(chars, hashtags, fits, penalty)
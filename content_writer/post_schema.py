@@ -0,0 +1,53 @@
+# -----------------------------------------------------
+# Structured Output Schemas
+# -----------------------------------------------------
+"""
+Pydantic models for generated posts, sent with each generation request as
+a JSON schema (response_format) so the provider constrains decoding to
+valid JSON of the right shape. Ollama's OpenAI-compatible endpoint maps
+response_format to its native `format` schema.
+
+With the schema honoured, a reply parses in one model_validate_json call;
+the text-extraction fallbacks in content_agent only run when it fails
+(older servers, or a backend that rejected response_format).
+"""
+from functools import lru_cache
+from typing import Optional
+
+from pydantic import BaseModel, ConfigDict, ValidationError
+
+
+class Post(BaseModel):
+    # extra="forbid" emits additionalProperties: false, which strict schemas require
+    model_config = ConfigDict(extra="forbid")
+
+    platform: str
+    content: str
+
+
+class TwitterPost(Post):
+    char_count: int
+
+
+class CombinedPosts(BaseModel):
+    """Combined request: one post per platform (schemas must be objects, not arrays)"""
+    model_config = ConfigDict(extra="forbid")
+
+    posts: list[Post]
+
+
+@lru_cache(maxsize=None)
+def response_format(model: type[BaseModel]) -> dict:
+    """OpenAI-style json_schema response_format for a model, built once"""
+    return {
+        "type": "json_schema",
+        "json_schema": {"name": model.__name__, "schema": model.model_json_schema(), "strict": True},
+    }
+
+
+def parse(model: type[BaseModel], text: str) -> Optional[BaseModel]:
+    """The validated model, or None if the text doesn't match the schema"""
+    try:
+        return model.model_validate_json(text)
+    except ValidationError:
+        return None
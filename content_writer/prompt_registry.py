@@ -0,0 +1,127 @@
+# -----------------------------------------------------
+# Prompt Registry (prefix-cache-friendly layout)
+# -----------------------------------------------------
+"""
+Prompt templates compiled once and laid out for provider prefix caching.
+
+OpenAI's prompt caching and Ollama's KV-cache reuse only help when requests
+start with the same tokens. Every template here renders as
+
+    system message   - shared by all templates
+    user message     - shared prefix (the transcript), then the template suffix
+
+so the per-platform requests for one video share everything up to the
+platform instructions, and a repeated call reuses the cached prefix.
+
+The registry is also a telemetry sink: records carrying a prompt name are
+aggregated per template, including the cached prompt tokens the provider
+reports (usage.prompt_tokens_details.cached_tokens on OpenAI; providers
+that don't report it count as uncached).
+"""
+import json
+import string
+import threading
+from dataclasses import dataclass
+from typing import Optional
+
+
+@dataclass(frozen=True)
+class Prompt:
+    """A rendered prompt: chat messages plus the template they came from"""
+    name: str
+    messages: tuple
+
+    def text(self) -> str:
+        """All message contents, for size estimates"""
+        return "\n\n".join(m["content"] for m in self.messages)
+
+    def key(self) -> str:
+        """Stable serialization, for response cache keys"""
+        return json.dumps(self.messages, ensure_ascii=False)
+
+
+class PromptTemplate:
+    """One template: the registry's shared prefix plus a suffix, compiled once.
+
+    Placeholders use string.Template syntax ($video_transcript), so literal
+    JSON examples in the text need no escaping.
+    """
+
+    def __init__(self, name: str, system: str, prefix: str, suffix: str):
+        self.name = name
+        self.system = {"role": "system", "content": system}
+        self.prefix = string.Template(prefix)
+        self.suffix = string.Template(suffix)
+        self.fields = frozenset(self.prefix.get_identifiers() + self.suffix.get_identifiers())
+        # A suffix without placeholders renders to the same text every time
+        self._static_suffix = suffix if not self.suffix.get_identifiers() else None
+
+    def render(self, **values) -> Prompt:
+        missing = self.fields - values.keys()
+        if missing:
+            raise KeyError(f"Prompt {self.name!r} needs {', '.join(sorted(missing))}")
+        prefix = self.prefix.substitute(values)
+        suffix = self._static_suffix if self._static_suffix is not None else self.suffix.substitute(values)
+        user = {"role": "user", "content": f"{prefix}\n\n{suffix}"}
+        return Prompt(self.name, (self.system, user))
+
+
+class PromptRegistry:
+    """Named templates sharing one system message and prefix; per-template usage stats"""
+
+    def __init__(self, system: str, prefix: str):
+        self.system = system
+        self.prefix = prefix
+        self.templates = {}
+        self._lock = threading.Lock()
+        self._stats = {}   # name -> counters
+
+    def register(self, name: str, suffix: str) -> PromptTemplate:
+        template = PromptTemplate(name, self.system, self.prefix, suffix)
+        self.templates[name] = template
+        return template
+
+    def render(self, name: str, **values) -> Prompt:
+        return self.templates[name].render(**values)
+
+    def emit(self, record):
+        """Telemetry sink: aggregate calls made with a registered prompt"""
+        if record.prompt is None or record.cached or record.error:
+            return
+        with self._lock:
+            stats = self._stats.setdefault(record.prompt, {
+                "calls": 0, "prompt_tokens": 0, "cached_tokens": 0, "ttfb_sum": 0.0, "ttfb_count": 0,
+            })
+            stats["calls"] += 1
+            stats["prompt_tokens"] += record.prompt_tokens or 0
+            stats["cached_tokens"] += record.cached_tokens or 0
+            if record.ttfb is not None:
+                stats["ttfb_sum"] += record.ttfb
+                stats["ttfb_count"] += 1
+
+    def stats(self, name: Optional[str] = None) -> dict:
+        """Per-template totals, or a single template's if name is given"""
+        with self._lock:
+            rows = {
+                prompt: {
+                    "calls": s["calls"],
+                    "prompt_tokens": s["prompt_tokens"],
+                    "cached_tokens": s["cached_tokens"],
+                    "cache_hit_rate": s["cached_tokens"] / s["prompt_tokens"] if s["prompt_tokens"] else 0.0,
+                    "ttfb_mean": s["ttfb_sum"] / s["ttfb_count"] if s["ttfb_count"] else None,
+                }
+                for prompt, s in self._stats.items()
+            }
+        return rows.get(name, {}) if name is not None else rows
+
+    def totals(self) -> dict:
+        """Prompt and cached tokens across every template"""
+        rows = self.stats().values()
+        prompt_tokens = sum(r["prompt_tokens"] for r in rows)
+        cached_tokens = sum(r["cached_tokens"] for r in rows)
+        return {
+            "calls": sum(r["calls"] for r in rows),
+            "prompt_tokens": prompt_tokens,
+            "cached_tokens": cached_tokens,
+            "cache_hit_rate": cached_tokens / prompt_tokens if prompt_tokens else 0.0,
+        }
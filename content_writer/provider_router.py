@@ -0,0 +1,342 @@
+# -----------------------------------------------------
+# Latency-Aware Provider Routing
+# -----------------------------------------------------
+"""
+Route LLM requests across several OpenAI-compatible backends (OpenAI,
+Ollama, a stub server...) using rolling latency and error statistics.
+
+Each request goes to the backend with the lowest expected latency (p50
+inflated by its recent error rate). After a few consecutive failures a
+backend sits out a cooldown period. With hedging on, if the primary has
+not answered within its own p95 latency, a backup request goes to the next
+backend; whichever succeeds first wins and the other is cancelled. A
+cancelled loser leaves no trace in its backend's statistics (requests,
+outcomes, latencies): it neither succeeded nor failed, and a partial
+latency would skew the percentiles. The winner's sample is what shifts the
+ranking towards the faster backend.
+
+Hedging is async-only (a blocking call cannot be cancelled); the sync path
+and streams fail over to the next backend on error instead.
+
+While a request runs on a backend that is not the last candidate,
+fallback_available() is True. Callers with their own retry loop (LLMClient)
+check it and raise on retryable errors instead of waiting, so the router
+moves on to the next backend; only the last candidate retries in place.
+"""
+import asyncio
+import logging
+import time
+import weakref
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, AsyncIterator, Awaitable, Callable, Iterator, Optional
+
+DEFAULT_WINDOW = 50              # samples kept per backend
+DEFAULT_HEDGE_DELAY = 2.0        # seconds, until a backend has latency samples
+MIN_HEDGE_SAMPLES = 5
+FAILURE_THRESHOLD = 3            # consecutive failures before cooldown
+COOLDOWN = 30.0                  # seconds a failing backend is skipped
+
+
+_fallback = ContextVar("provider_fallback", default=False)
+
+
+def fallback_available() -> bool:
+    """Whether the router has another backend to fail over to for the running request"""
+    return _fallback.get()
+
+
+@contextmanager
+def _attempt(has_fallback: bool):
+    token = _fallback.set(has_fallback)
+    try:
+        yield
+    finally:
+        _fallback.reset(token)
+
+
+class AllBackendsFailed(Exception):
+    """Every backend tried for a request raised"""
+
+    def __init__(self, errors: list[tuple[str, Exception]]):
+        self.errors = errors
+        detail = "; ".join(f"{name}: {error}" for name, error in errors)
+        super().__init__(f"All backends failed ({detail})")
+
+
+class Backend:
+    """One OpenAI-compatible endpoint plus its rolling health statistics"""
+
+    def __init__(self, name: str, model: str, base_url: Optional[str] = None,
+                 api_key: Optional[str] = None, window: int = DEFAULT_WINDOW,
+                 http_client=None, async_http_client_factory: Optional[Callable[[], Any]] = None,
+                 **client_options):
+        # Imported here: the SDK is slow to import and only needed once a backend exists
+        from openai import OpenAI
+
+        self.name = name
+        self.model = model
+        self.client = OpenAI(base_url=base_url, api_key=api_key, http_client=http_client, **client_options)
+        self._async_args = dict(base_url=base_url, api_key=api_key, **client_options)
+        self._async_http_client_factory = async_http_client_factory
+        self._async_clients = weakref.WeakKeyDictionary()   # event loop -> AsyncOpenAI
+        self._unbound_async_client = None                   # used outside any event loop
+        self.latencies = deque(maxlen=window)
+        self.outcomes = deque(maxlen=window)   # True = success
+        self.consecutive_failures = 0
+        self.down_until = 0.0
+        self.hedges_won = 0
+        self.requests = 0
+        self.structured_output = True   # cleared if the endpoint rejects response_format
+        self.multiple_choices = True    # cleared if the endpoint ignores `n` (Ollama)
+
+    @property
+    def async_client(self):
+        """AsyncOpenAI for the running event loop
+
+        Pooled connections belong to the loop that opened them, so each loop
+        (the job queue's, every asyncio.run()) keeps its own client for as
+        long as the loop exists; aclose() releases it before the loop ends.
+        """
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = None
+        client = self._async_clients.get(loop) if loop is not None else self._unbound_async_client
+        if client is None:
+            client = self._new_async_client()
+            if loop is None:
+                self._unbound_async_client = client
+            else:
+                self._async_clients[loop] = client
+        return client
+
+    def _new_async_client(self):
+        from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+
+        # Always pass an httpx client: the SDK's own one closes itself on garbage
+        # collection by scheduling aclose() on whatever loop is running, which fails
+        # for connections that belonged to a previous loop
+        factory = self._async_http_client_factory or DefaultAsyncHttpxClient
+        return AsyncOpenAI(http_client=factory(), **self._async_args)
+
+    async def aclose(self):
+        """Close the running loop's client and its connection pool"""
+        client = self._async_clients.pop(asyncio.get_running_loop(), None)
+        if client is not None:
+            await client.close()
+
+    def record(self, latency: Optional[float], ok: bool):
+        """Add one observation; latency is None for failures"""
+        self.requests += 1
+        self.outcomes.append(ok)
+        if ok:
+            self.latencies.append(latency)
+            self.consecutive_failures = 0
+            return
+        self.consecutive_failures += 1
+        if self.consecutive_failures >= FAILURE_THRESHOLD:
+            self.down_until = time.monotonic() + COOLDOWN
+            logging.warning(f"Backend {self.name} failed {self.consecutive_failures} times, "
+                            f"skipping it for {COOLDOWN:.0f}s")
+
+    def percentile(self, q: float) -> Optional[float]:
+        """q-th percentile (0-100) of recent latencies, or None without samples"""
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        index = min(len(ordered) - 1, int(round(q / 100 * (len(ordered) - 1))))
+        return ordered[index]
+
+    @property
+    def error_rate(self) -> float:
+        if not self.outcomes:
+            return 0.0
+        return 1 - sum(self.outcomes) / len(self.outcomes)
+
+    @property
+    def healthy(self) -> bool:
+        return time.monotonic() >= self.down_until
+
+    def expected_latency(self) -> float:
+        """Ranking score; untried backends score 0 so they get probed"""
+        p50 = self.percentile(50)
+        if p50 is None:
+            # Never answered: probe it if untried, otherwise rank it last
+            return float("inf") if self.outcomes else 0.0
+        return p50 / max(1 - self.error_rate, 0.1)
+
+    def stats(self) -> dict:
+        return {
+            "model": self.model,
+            "requests": self.requests,
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+            "error_rate": self.error_rate,
+            "healthy": self.healthy,
+            "hedges_won": self.hedges_won,
+        }
+
+
+class ProviderRouter:
+    """Pick the fastest healthy backend per request, with optional hedging"""
+
+    def __init__(self, backends: list[Backend], hedge: bool = False,
+                 hedge_delay: Optional[float] = None):
+        if not backends:
+            raise ValueError("ProviderRouter needs at least one backend")
+        self.backends = backends
+        self.hedge = hedge
+        self.hedge_delay = hedge_delay   # fixed delay; None = primary's p95
+        self.hedged = 0
+
+    async def aclose(self):
+        """Close every backend's client for the running loop (call before the loop ends)"""
+        await asyncio.gather(*(b.aclose() for b in self.backends))
+
+    def ranked(self) -> list[Backend]:
+        """Healthy backends, fastest first; all of them if none is healthy"""
+        healthy = [b for b in self.backends if b.healthy]
+        return sorted(healthy or self.backends, key=lambda b: b.expected_latency())
+
+    def _hedge_after(self, backend: Backend) -> float:
+        if self.hedge_delay is not None:
+            return self.hedge_delay
+        if len(backend.latencies) < MIN_HEDGE_SAMPLES:
+            return DEFAULT_HEDGE_DELAY
+        return backend.percentile(95)
+
+    def call(self, request: Callable[[Backend], Any]) -> Any:
+        """Run a blocking request, failing over to the next backend on error"""
+        errors = []
+        candidates = self.ranked()
+        for i, backend in enumerate(candidates):
+            started = time.perf_counter()
+            try:
+                with _attempt(i + 1 < len(candidates)):
+                    result = request(backend)
+            except Exception as e:
+                backend.record(None, False)
+                errors.append((backend.name, e))
+                continue
+            backend.record(time.perf_counter() - started, True)
+            return result
+        raise AllBackendsFailed(errors)
+
+    async def acall(self, request: Callable[[Backend], Awaitable[Any]]) -> Any:
+        """Run an async request on the best backend, hedging to the next one if it is slow"""
+        candidates = self.ranked()
+        pending = {}   # task -> (backend, started)
+        errors = []
+        next_index = 0
+        hedged = False
+
+        def launch():
+            nonlocal next_index
+            backend = candidates[next_index]
+            next_index += 1
+            # The task copies the current context, including the fallback flag
+            with _attempt(next_index < len(candidates)):
+                task = asyncio.ensure_future(request(backend))
+            pending[task] = (backend, time.perf_counter())
+
+        launch()
+        try:
+            while pending:
+                timeout = None
+                if self.hedge and not hedged and next_index < len(candidates):
+                    primary, started = next(iter(pending.values()))
+                    timeout = max(0.0, self._hedge_after(primary) - (time.perf_counter() - started))
+                done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+
+                if not done:
+                    # Primary is slower than its p95: fire the backup
+                    hedged = True
+                    self.hedged += 1
+                    launch()
+                    continue
+
+                for task in done:
+                    backend, started = pending.pop(task)
+                    try:
+                        result = task.result()
+                    except Exception as e:
+                        backend.record(None, False)
+                        errors.append((backend.name, e))
+                        continue
+                    backend.record(time.perf_counter() - started, True)
+                    if hedged and backend is not candidates[0]:
+                        backend.hedges_won += 1
+                    return result
+
+                # Everything in flight failed: fail over to the next backend
+                if not pending and next_index < len(candidates):
+                    launch()
+            raise AllBackendsFailed(errors)
+        finally:
+            # Losers are cancelled unrecorded (see the module docstring)
+            for task in pending:
+                task.cancel()
+
+    def stream(self, request: Callable[[Backend], Iterator]) -> Iterator:
+        """Yield chunks from a blocking stream; fails over only before the first chunk"""
+        errors = []
+        candidates = self.ranked()
+        for i, backend in enumerate(candidates):
+            started = time.perf_counter()
+            try:
+                with _attempt(i + 1 < len(candidates)):
+                    chunks = iter(request(backend))
+                    first = next(chunks)
+            except StopIteration:
+                backend.record(time.perf_counter() - started, True)
+                return
+            except Exception as e:
+                backend.record(None, False)
+                errors.append((backend.name, e))
+                continue
+            yield first
+            try:
+                yield from chunks
+            except Exception:
+                backend.record(None, False)
+                raise
+            backend.record(time.perf_counter() - started, True)
+            return
+        raise AllBackendsFailed(errors)
+
+    async def astream(self, request: Callable[[Backend], Awaitable[AsyncIterator]]) -> AsyncIterator:
+        """Async variant of stream()"""
+        errors = []
+        candidates = self.ranked()
+        for i, backend in enumerate(candidates):
+            started = time.perf_counter()
+            try:
+                with _attempt(i + 1 < len(candidates)):
+                    chunks = (await request(backend)).__aiter__()
+                    first = await chunks.__anext__()
+            except StopAsyncIteration:
+                backend.record(time.perf_counter() - started, True)
+                return
+            except Exception as e:
+                backend.record(None, False)
+                errors.append((backend.name, e))
+                continue
+            yield first
+            try:
+                async for chunk in chunks:
+                    yield chunk
+            except Exception:
+                backend.record(None, False)
+                raise
+            backend.record(time.perf_counter() - started, True)
+            return
+        raise AllBackendsFailed(errors)
+
+    def stats(self) -> dict:
+        """Per-backend latency/error statistics plus the number of hedged requests"""
+        return {
+            "hedged": self.hedged,
+            "backends": {b.name: b.stats() for b in self.backends},
+        }
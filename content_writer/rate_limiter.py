@@ -0,0 +1,242 @@
+# -----------------------------------------------------
+# Shared Rate Limiter and Retry Backoff
+# -----------------------------------------------------
+"""
+Token-bucket limits on requests and tokens per minute (RPM / TPM) for each
+provider and model, shared by every Streamlit session in the process and,
+with a file path, by every process on the machine (SQLite, like the caches).
+
+Before a request, acquire() takes one request and an estimated token count
+(prompt estimate + max_tokens) from the key's buckets, waiting until they
+have refilled enough; the time spent waiting is returned so it can be
+reported as queue wait. Once the real usage is known, reconcile() gives
+back or charges the difference. A 429 with Retry-After pauses the key for
+every caller via block().
+
+retry_delay() decides whether a failed request is worth retrying (429,
+408/409, 5xx, connection errors) and how long to wait: jittered exponential
+backoff, never shorter than the provider's Retry-After.
+"""
+import asyncio
+import os
+import random
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from email.utils import parsedate_to_datetime
+from typing import Optional
+
+BACKOFF_BASE = 0.5          # seconds; attempt n waits up to BACKOFF_BASE * 2**n
+BACKOFF_MAX = 30.0
+RETRY_AFTER_MAX = 60.0      # ignore absurd Retry-After values beyond this
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS rate_buckets (
+    key           TEXT PRIMARY KEY,
+    requests      REAL NOT NULL,
+    tokens        REAL NOT NULL,
+    updated       REAL NOT NULL,
+    blocked_until REAL NOT NULL
+)
+"""
+
+
+@dataclass
+class Reservation:
+    """What acquire() took, so reconcile() can settle it against actual usage"""
+    key: str
+    tokens: int
+    waited: float = 0.0
+
+
+class RateLimiter:
+    """RPM/TPM token buckets per key (e.g. "openai:gpt-4o"); unknown keys pass freely"""
+
+    def __init__(self, path: str = ":memory:"):
+        self.path = path
+        self.limits = {}    # key -> (rpm, tpm); 0 = unlimited
+        self._lock = threading.Lock()
+        self._memory_conn = None
+        if path == ":memory:":
+            self._memory_conn = sqlite3.connect(path, check_same_thread=False)
+        else:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(_SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        """Yield a connection inside one write transaction (serialised across processes)"""
+        if self._memory_conn is not None:
+            with self._lock, self._memory_conn:
+                yield self._memory_conn
+            return
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+        finally:
+            conn.close()
+
+    def set_limits(self, key: str, rpm: int = 0, tpm: int = 0):
+        self.limits[key] = (rpm, tpm)
+
+    def _load(self, conn, key: str, now: float) -> list:
+        """[requests, tokens, blocked_until] for key, refilled up to now"""
+        rpm, tpm = self.limits[key]
+        row = conn.execute(
+            "SELECT requests, tokens, updated, blocked_until FROM rate_buckets WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return [float(rpm), float(tpm), 0.0]
+        requests, tokens, updated, blocked_until = row
+        elapsed = max(now - updated, 0.0)
+        return [
+            min(float(rpm), requests + elapsed * rpm / 60),
+            min(float(tpm), tokens + elapsed * tpm / 60),
+            blocked_until,
+        ]
+
+    @staticmethod
+    def _save(conn, key: str, state: list, now: float):
+        conn.execute("INSERT OR REPLACE INTO rate_buckets VALUES (?, ?, ?, ?, ?)", (key, state[0], state[1], now, state[2]))
+
+    def try_acquire(self, key: str, tokens: int) -> float:
+        """Take one request and `tokens` if available; else return seconds to wait (nothing taken)"""
+        if key not in self.limits:
+            return 0.0
+        rpm, tpm = self.limits[key]
+        # A single request larger than the whole budget waits for a full bucket
+        need = min(tokens, tpm) if tpm else 0
+        now = time.time()
+        with self._connect() as conn:
+            state = self._load(conn, key, now)
+            waits = [state[2] - now]
+            if rpm and state[0] < 1:
+                waits.append((1 - state[0]) * 60 / rpm)
+            if tpm and state[1] < need:
+                waits.append((need - state[1]) * 60 / tpm)
+            wait = max(waits)
+            if wait > 0:
+                return wait
+            if rpm:
+                state[0] -= 1
+            if tpm:
+                state[1] -= tokens
+            self._save(conn, key, state, now)
+        return 0.0
+
+    def acquire(self, key: str, tokens: int) -> Reservation:
+        """Block until the request fits the key's budgets"""
+        reservation = Reservation(key, tokens)
+        while (wait := self.try_acquire(key, tokens)) > 0:
+            time.sleep(wait)
+            reservation.waited += wait
+        return reservation
+
+    async def aacquire(self, key: str, tokens: int) -> Reservation:
+        """Async variant of acquire(): waits, and runs the SQLite transaction, off the event loop"""
+        reservation = Reservation(key, tokens)
+        if key not in self.limits:
+            return reservation
+        while (wait := await asyncio.to_thread(self.try_acquire, key, tokens)) > 0:
+            await asyncio.sleep(wait)
+            reservation.waited += wait
+        return reservation
+
+    def reconcile(self, reservation: Reservation, actual_tokens: int):
+        """Settle the estimate against the usage the provider reported"""
+        _, tpm = self.limits.get(reservation.key, (0, 0))
+        delta = reservation.tokens - actual_tokens
+        if not tpm or not delta:
+            return
+        now = time.time()
+        with self._connect() as conn:
+            state = self._load(conn, reservation.key, now)
+            state[1] = min(float(tpm), state[1] + delta)
+            self._save(conn, reservation.key, state, now)
+        reservation.tokens = actual_tokens
+
+    async def areconcile(self, reservation: Reservation, actual_tokens: int):
+        """Async variant of reconcile(): the SQLite update runs in a worker thread"""
+        _, tpm = self.limits.get(reservation.key, (0, 0))
+        if tpm and reservation.tokens != actual_tokens:
+            await asyncio.to_thread(self.reconcile, reservation, actual_tokens)
+
+    def block(self, key: str, seconds: float):
+        """Pause key for every caller (the provider said Retry-After)"""
+        self.limits.setdefault(key, (0, 0))
+        now = time.time()
+        with self._connect() as conn:
+            state = self._load(conn, key, now)
+            state[2] = max(state[2], now + seconds)
+            self._save(conn, key, state, now)
+
+    def stats(self) -> dict:
+        """Current bucket levels per key that is limited or paused"""
+        now = time.time()
+        result = {}
+        with self._connect() as conn:
+            for key, (rpm, tpm) in self.limits.items():
+                requests, tokens, blocked_until = self._load(conn, key, now)
+                if not rpm and not tpm and blocked_until <= now:
+                    continue
+                result[key] = {
+                    "rpm": rpm, "tpm": tpm,
+                    "requests_available": requests, "tokens_available": tokens,
+                    "blocked_for": max(blocked_until - now, 0.0),
+                }
+        return result
+
+
+def retry_after(error: Exception) -> Optional[float]:
+    """Seconds from the Retry-After(-Ms) header of an API error, if any"""
+    headers = getattr(getattr(error, "response", None), "headers", None)
+    if not headers:
+        return None
+    value = headers.get("retry-after-ms")
+    if value is not None:
+        try:
+            return float(value) / 1000
+        except ValueError:
+            pass
+    value = headers.get("retry-after")
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+def is_retryable(error: Exception) -> bool:
+    """429, 408/409 and 5xx responses, timeouts and dropped connections"""
+    status = getattr(error, "status_code", None)
+    if status is not None:
+        return status in (408, 409, 429) or status >= 500
+    # openai.APIConnectionError / APITimeoutError carry no status
+    return type(error).__name__ in ("APIConnectionError", "APITimeoutError")
+
+
+def retry_delay(error: Exception, attempt: int) -> Optional[float]:
+    """Seconds to wait before retry number attempt+1, or None if error isn't retryable"""
+    if not is_retryable(error):
+        return None
+    delay = random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))
+    after = retry_after(error)
+    if after is not None:
+        # Honour the provider's hint; a little jitter keeps waiting callers from retrying in lockstep
+        delay = min(after, RETRY_AFTER_MAX) + random.uniform(0, BACKOFF_BASE)
+    return delay
@@ -0,0 +1,106 @@
+# -----------------------------------------------------
+# Content-Addressed LLM Response Cache
+# -----------------------------------------------------
+"""
+SQLite-backed cache of LLM completions, shared by every Streamlit session
+and process on the machine.
+
+Entries are keyed on provider, model, a hash of the prompt, temperature and
+max_tokens, expire after a per-entry TTL and are evicted least recently used
+first once the stored size passes a byte budget. Each entry remembers how
+long the original call took, so hits can report the latency they saved.
+"""
+import hashlib
+import json
+import os
+import time
+from typing import Optional
+
+from sqlite_store import SQLiteStore, evict
+
+DEFAULT_CACHE_PATH = os.getenv(
+    "LLM_CACHE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "responses.sqlite3"),
+)
+DEFAULT_MAX_BYTES = int(os.getenv("LLM_CACHE_MAX_BYTES", str(50 * 1024 * 1024)))
+DEFAULT_TTL = float(os.getenv("LLM_CACHE_TTL", str(24 * 3600)))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key         TEXT PRIMARY KEY,
+    response    TEXT NOT NULL,
+    size        INTEGER NOT NULL,
+    latency     REAL NOT NULL,
+    expires_at  REAL NOT NULL,
+    last_access REAL NOT NULL
+)
+"""
+
+
+def response_key(provider: str, model: str, prompt: str, temperature: float, max_tokens: int) -> str:
+    """Content address of a request"""
+    prompt_hash = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+    raw = json.dumps([provider, model, prompt_hash, temperature, max_tokens])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class ResponseCache(SQLiteStore):
+    """Size-bounded LLM response cache with per-entry TTL and LRU eviction"""
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, max_bytes: int = DEFAULT_MAX_BYTES,
+                 ttl: float = DEFAULT_TTL):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.saved_latency = 0.0
+        super().__init__(path, _SCHEMA)
+
+    def get(self, key: str) -> Optional[str]:
+        """Cached response for key, or None (counts a hit or a miss)"""
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            row = conn.execute(
+                "SELECT response, latency FROM responses WHERE key = ? AND expires_at > ?",
+                (key, now),
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (now, key))
+        self.hits += 1
+        self.saved_latency += row[1]
+        return row[0]
+
+    def set(self, key: str, response: str, latency: float, ttl: Optional[float] = None):
+        """Store a response and the latency it took to produce"""
+        now = time.time()
+        expires_at = now + (self.ttl if ttl is None else ttl)
+        size = len(response.encode("utf-8"))
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?)",
+                (key, response, size, latency, expires_at, now),
+            )
+            evict(conn, "responses", "key", self.max_bytes, now)
+
+    def clear(self):
+        """Remove every cached response"""
+        with self._lock, self._connect() as conn:
+            conn.execute("DELETE FROM responses")
+
+    def stats(self) -> dict:
+        """Hit rate and saved latency for this process plus current stored size"""
+        with self._lock, self._connect() as conn:
+            entries, size = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses"
+            ).fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": entries,
+            "bytes": size,
+            "saved_latency": self.saved_latency,
+        }
@@ -0,0 +1,68 @@
+# -----------------------------------------------------
+# Shared SQLite Plumbing
+# -----------------------------------------------------
+"""
+Connection handling and TTL/LRU eviction shared by the SQLite-backed stores
+(response_cache, transcript_cache, jobs).
+
+A store is one database file, opened per operation in WAL mode so several
+Streamlit processes can share it, or ":memory:" for tests, where a single
+connection is kept because every new one would see a fresh empty database.
+"""
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+
+class SQLiteStore:
+    """Base class: creates the schema and hands out connections via _connect()"""
+
+    def __init__(self, path: str, schema: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._memory_conn = None
+        if path == ":memory:":
+            # One shared connection, otherwise every connect() gets a fresh empty db
+            self._memory_conn = sqlite3.connect(path, check_same_thread=False)
+        else:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(schema)
+
+    @contextmanager
+    def _connect(self):
+        """Yield a connection and commit on success; file connections are closed after use"""
+        if self._memory_conn is not None:
+            with self._memory_conn:
+                yield self._memory_conn
+            return
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+
+def evict(conn: sqlite3.Connection, table: str, key: str, max_bytes: int, now: float) -> int:
+    """Drop expired rows, then least recently used ones until under max_bytes
+
+    table needs `size`, `expires_at` and `last_access` columns; key is its
+    primary key column. Returns how many rows were evicted for size.
+    """
+    conn.execute(f"DELETE FROM {table} WHERE expires_at <= ?", (now,))
+    total = conn.execute(f"SELECT COALESCE(SUM(size), 0) FROM {table}").fetchone()[0]
+    evicted = 0
+    if total <= max_bytes:
+        return evicted
+    for row_key, size in conn.execute(
+        f"SELECT {key}, size FROM {table} ORDER BY last_access ASC"
+    ).fetchall():
+        if total <= max_bytes:
+            break
+        conn.execute(f"DELETE FROM {table} WHERE {key} = ?", (row_key,))
+        total -= size
+        evicted += 1
+    return evicted
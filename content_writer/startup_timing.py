@@ -0,0 +1,114 @@
+"""
+Startup and rerun cost of the Streamlit app
+Every widget click re-executes app.py, so its per-rerun cost is what users feel
+
+Usage:
+    python startup_timing.py
+    python startup_timing.py --baseline HEAD~1 --repeat 5
+
+Each measurement runs in a fresh interpreter:
+    import      - `import content_agent`
+    first run   - first execution of app.py (imports included), via streamlit's AppTest
+    rerun       - later executions of app.py in the same process (a widget click)
+With --baseline, the same measurements run against content_writer as of an
+older git revision (exported to a temp directory) for a before/after table.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+IMPORT_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import content_agent
+print(json.dumps({"import": time.perf_counter() - start, "agents_loaded": "agents" in sys.modules}))
+"""
+
+APP_PROBE = """
+import json, sys, time
+from streamlit.testing.v1 import AppTest
+at = AppTest.from_file("app.py", default_timeout=120)
+start = time.perf_counter()
+at.run()
+first = time.perf_counter() - start
+reruns = []
+for _ in range({reruns}):
+    start = time.perf_counter()
+    at.run()
+    reruns.append(time.perf_counter() - start)
+print(json.dumps({{"first_run": first, "rerun": sorted(reruns)[len(reruns) // 2],
+                  "agents_loaded": "agents" in sys.modules}}))
+"""
+
+
+def probe(code: str, cwd: str) -> dict:
+    """Run a probe in a fresh interpreter; its last stdout line is the JSON result"""
+    result = subprocess.run([sys.executable, "-c", code], cwd=cwd, capture_output=True, text=True)
+    lines = result.stdout.strip().splitlines()
+    if result.returncode != 0 or not lines:
+        raise RuntimeError(f"Probe failed in {cwd}:\n{result.stderr[-2000:]}")
+    return json.loads(lines[-1])
+
+
+def measure(cwd: str, repeat: int, reruns: int) -> dict:
+    """Median of `repeat` fresh-interpreter measurements"""
+    imports = [probe(IMPORT_PROBE, cwd) for _ in range(repeat)]
+    apps = [probe(APP_PROBE.format(reruns=reruns), cwd) for _ in range(repeat)]
+    return {
+        "import": statistics.median(r["import"] for r in imports),
+        "first_run": statistics.median(r["first_run"] for r in apps),
+        "rerun": statistics.median(r["rerun"] for r in apps),
+        "agents_on_import": imports[0]["agents_loaded"],
+        "agents_after_run": apps[0]["agents_loaded"],
+    }
+
+
+def export_revision(revision: str, target: str) -> str:
+    """Extract this directory as of `revision` into target; return its path"""
+    def git(*cmd, cwd=HERE) -> bytes:
+        return subprocess.run(["git", *cmd], cwd=cwd, capture_output=True, check=True).stdout
+
+    prefix = git("rev-parse", "--show-prefix").decode().strip()
+    toplevel = git("rev-parse", "--show-toplevel").decode().strip()
+    archive = git("archive", revision, prefix, cwd=toplevel)
+    subprocess.run(["tar", "-x", "-C", target], input=archive, check=True)
+    return os.path.join(target, prefix)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--baseline", help="Git revision to compare against, e.g. HEAD~1")
+    parser.add_argument("--repeat", type=int, default=3, help="Fresh interpreters per measurement")
+    parser.add_argument("--reruns", type=int, default=5, help="Reruns measured per app process")
+    args = parser.parse_args()
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.baseline:
+            print(f"⏳ Measuring baseline {args.baseline}...")
+            results[args.baseline] = measure(export_revision(args.baseline, tmp), args.repeat, args.reruns)
+        print("⏳ Measuring working tree...")
+        results["current"] = measure(HERE, args.repeat, args.reruns)
+
+    print("="*60)
+    print("🚀 Startup Timing")
+    print("="*60)
+    print(f"{'Version':<14}{'Import':>10}{'First run':>12}{'Rerun':>10}  agents imported")
+    for name, r in results.items():
+        loaded = "at import" if r["agents_on_import"] else ("on first run" if r["agents_after_run"] else "not yet")
+        print(f"{name:<14}{r['import']:>9.2f}s{r['first_run']:>11.2f}s{r['rerun'] * 1000:>8.0f}ms  {loaded}")
+    if args.baseline:
+        before, after = results[args.baseline], results["current"]
+        print(f"\nImport: {before['import']:.2f}s -> {after['import']:.2f}s, "
+              f"first run: {before['first_run']:.2f}s -> {after['first_run']:.2f}s")
+    print("="*60)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,358 @@
+"""
+Local OpenAI-compatible stub server for offline testing and benchmarks
+Serves /v1/chat/completions (plain and streamed) with injected latency and failures
+
+Usage:
+    python stub_server.py --port 8001 --latency 0.2 --per-token-latency 0.01 --fail-rate 0.1
+
+    # then point the app at it
+    OLLAMA_BASE_URL=http://127.0.0.1:8001 streamlit run app.py
+
+In-process (benchmarks):
+    server = start_stub_server(StubConfig(latency=0.1))
+    ... server.base_url ...
+    server.shutdown()
+
+Responses are canned but shaped like the real thing: platform prompts get a
+JSON post, combined prompts a {"posts": [...]} object, anything else a few
+bullet points. A json_schema response_format is honoured (required fields
+are filled in), or rejected with HTTP 400 when structured_output is off.
+Requests that offer tools (the agents framework) get one call to every tool,
+passing the user message as its argument, and once tool results come back a
+final answer that echoes them.
+
+With prefix_cache on, the stub mimics OpenAI prompt caching: a prompt whose
+leading tokens (1024 or more, in 128-token steps) were seen before skips the
+prefill time for them and reports usage.prompt_tokens_details.cached_tokens.
+
+Several choices are returned when a request sets `n` (decoded in parallel,
+so it takes no longer than one), unless multiple_choices is off, which
+answers with one choice like Ollama. overlong_rate pads that share of
+Twitter posts past 280 characters, like a model ignoring the length limit.
+"""
+import argparse
+import hashlib
+import json
+import random
+import re
+import sys
+import threading
+import time
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+
+PLATFORMS = ("LinkedIn", "Instagram", "Twitter")
+
+CANNED_POSTS = {
+    "LinkedIn": ("Recently analyzed this automotive review: the drivetrain updates show how "
+                 "efficiency and performance now go together. What does this mean for the "
+                 "next generation of performance cars? #AutomotiveInnovation #AudiTechnology "
+                 "#IndustryInsights #Engineering"),
+    "Instagram": ("Just watched this sick review! 🔥 The sound, the launch, the looks 🚗💨 "
+                  "Would you daily this beast? Drop a 🏁 below! #AudiLife #CarsOfInstagram "
+                  "#CarEnthusiast #SpeedDemon #CarLovers #Quattro #RS #DreamCar"),
+    "Twitter": "Hot take: this is the best all-rounder on sale right now. Fight me. #Audi #CarTwitter",
+}
+
+
+@dataclass
+class StubConfig:
+    """Injected behaviour; all latencies in seconds"""
+    latency: float = 0.05             # fixed time before the first token
+    per_token_latency: float = 0.0    # per completion token
+    prefill_per_1k: float = 0.0       # per 1k prompt tokens
+    tail_rate: float = 0.0            # fraction of requests that also wait tail_latency
+    tail_latency: float = 0.0         # e.g. a cold model being loaded
+    fail_rate: float = 0.0            # fraction of requests answered with fail_status
+    fail_status: int = 500
+    retry_after: Optional[float] = None  # Retry-After header sent with failures
+    prefix_cache: bool = False        # skip prefill for previously seen prompt prefixes
+    structured_output: bool = True    # False: reject response_format with HTTP 400, like older servers
+    multiple_choices: bool = True     # False: ignore `n` and return one choice, like Ollama
+    overlong_rate: float = 0.0        # fraction of Twitter posts padded past 280 characters
+    seed: Optional[int] = None
+
+
+@dataclass
+class StubStats:
+    requests: int = 0
+    failures: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def as_dict(self) -> dict:
+        return {
+            "requests": self.requests,
+            "failures": self.failures,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+        }
+
+
+# OpenAI caches prompt prefixes of at least 1024 tokens, in 128-token increments
+PREFIX_CACHE_MIN_TOKENS = 1024
+PREFIX_CACHE_STEP = 128
+
+
+def count_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token)"""
+    return max(1, (len(text) + 3) // 4)
+
+
+OVERLONG_PADDING = (" The way the quattro system shuffles torque between the axles on a wet B-road"
+                    " is something you have to feel to believe, and the reviewer clearly agrees.")
+
+
+def canned_reply(prompt: str, schema: Optional[dict] = None, overlong: bool = False) -> str:
+    """A plausible completion for one of the content_writer prompts (matching `schema` if given)"""
+    if '"posts"' in prompt:
+        requested = [p for p in PLATFORMS if f'"platform": "{p}"' in prompt.split("exact format:")[-1]]
+        return json.dumps({"posts": [{"platform": p, "content": CANNED_POSTS[p]} for p in requested]})
+    match = re.search(r"Create an? (LinkedIn|Instagram|Twitter)", prompt)
+    if match:
+        platform = match.group(1)
+        post = {"platform": platform, "content": CANNED_POSTS[platform]}
+        if overlong and platform == "Twitter":
+            post["content"] = post["content"].replace(" #Audi", OVERLONG_PADDING * 2 + " #Audi")
+        if "char_count" in (schema or {}).get("properties", {}):
+            post["char_count"] = len(post["content"])
+        return json.dumps(post)
+    return "- 600 hp twin-turbo V8\n- 0-100 km/h in 3.6 s\n- Reviewer calls it the best all-rounder"
+
+
+def tool_turn(body: dict) -> tuple[Optional[str], list[dict]]:
+    """(final text, []) or (None, tool calls) for a request that offers tools"""
+    messages = body.get("messages", [])
+    results = [m.get("content") or "" for m in messages if m.get("role") == "tool"]
+    if results:
+        return "\n\n".join(results), []
+    user = next((m.get("content") or "" for m in reversed(messages) if m.get("role") == "user"), "")
+    calls = []
+    for i, tool in enumerate(body["tools"]):
+        function = tool.get("function", tool)
+        properties = list(function.get("parameters", {}).get("properties", {}))
+        arguments = {properties[0]: user} if properties else {}
+        calls.append({
+            "id": f"call_{i}",
+            "type": "function",
+            "function": {"name": function["name"], "arguments": json.dumps(arguments)},
+        })
+    return None, calls
+
+
+def _prompt_text(body: dict) -> str:
+    parts = []
+    for message in body.get("messages", []):
+        content = message.get("content")
+        if isinstance(content, list):
+            content = " ".join(part.get("text", "") for part in content if isinstance(part, dict))
+        parts.append(content or "")
+    return "\n".join(parts)
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: "StubServer"
+
+    def log_message(self, *args):
+        pass
+
+    def _send_json(self, status: int, payload: dict, headers: Optional[dict] = None):
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_chunk(self, payload):
+        line = "data: " + (payload if isinstance(payload, str) else json.dumps(payload)) + "\n\n"
+        data = line.encode("utf-8")
+        self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+        self.wfile.flush()
+
+    def do_GET(self):
+        if self.path.rstrip("/").endswith("/models"):
+            self._send_json(200, {"object": "list", "data": [{"id": "stub", "object": "model"}]})
+        else:
+            self._send_json(404, {"error": {"message": "not found"}})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        body = json.loads(self.rfile.read(length) or b"{}")
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self._send_json(404, {"error": {"message": f"unsupported path {self.path}"}})
+            return
+
+        config, stats = self.server.config, self.server.stats
+        prompt = _prompt_text(body)
+        if body.get("tools"):
+            prompt += json.dumps(body["tools"])
+        prompt_tokens = count_tokens(prompt)
+        with stats.lock:
+            stats.requests += 1
+            failed = self.server.rng.random() < config.fail_rate
+            slow = self.server.rng.random() < config.tail_rate
+            if failed:
+                stats.failures += 1
+
+        cached_tokens = self.server.cached_prefix(prompt) if config.prefix_cache else 0
+        delay = config.latency + config.prefill_per_1k * (prompt_tokens - cached_tokens) / 1000
+        time.sleep(delay + (config.tail_latency if slow else 0.0))
+        response_format = body.get("response_format") or {}
+        if response_format.get("type") == "json_schema" and not config.structured_output:
+            self._send_json(400, {"error": {"message": "response_format json_schema is not supported",
+                                            "type": "invalid_request_error", "param": "response_format"}})
+            return
+        if failed:
+            headers = {"Retry-After": str(config.retry_after)} if config.retry_after is not None else None
+            self._send_json(config.fail_status, {"error": {"message": "injected failure", "type": "stub"}}, headers)
+            return
+
+        tool_calls = []
+        if body.get("tools"):
+            reply, tool_calls = tool_turn(body)
+            replies = [reply]
+        else:
+            n = max(1, int(body.get("n") or 1)) if config.multiple_choices else 1
+            with stats.lock:
+                overlong = [self.server.rng.random() < config.overlong_rate for _ in range(n)]
+            schema = (response_format.get("json_schema") or {}).get("schema")
+            replies = [canned_reply(prompt, schema, overlong=o) for o in overlong]
+            reply = replies[0]
+        choice_tokens = [count_tokens(r or json.dumps(tool_calls)) for r in replies]
+        completion_tokens = sum(choice_tokens)
+        with stats.lock:
+            stats.prompt_tokens += prompt_tokens
+            stats.completion_tokens += completion_tokens
+        usage = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+            "prompt_tokens_details": {"cached_tokens": cached_tokens},
+        }
+        model = body.get("model", "stub")
+        created = int(time.time())
+
+        if body.get("stream") and not tool_calls:
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            for i in range(0, len(reply), 4):
+                time.sleep(config.per_token_latency)
+                self._send_chunk({
+                    "id": "stub", "object": "chat.completion.chunk", "created": created, "model": model,
+                    "choices": [{"index": 0, "delta": {"content": reply[i:i + 4]}, "finish_reason": None}],
+                })
+            if (body.get("stream_options") or {}).get("include_usage"):
+                self._send_chunk({
+                    "id": "stub", "object": "chat.completion.chunk", "created": created, "model": model,
+                    "choices": [], "usage": usage,
+                })
+            self._send_chunk("[DONE]")
+            self.wfile.write(b"0\r\n\r\n")
+            self.wfile.flush()
+            return
+
+        # Choices decode in parallel: the longest one sets the time
+        time.sleep(config.per_token_latency * max(choice_tokens))
+        if tool_calls:
+            choices = [{"index": 0, "message": {"role": "assistant", "content": reply, "tool_calls": tool_calls},
+                        "finish_reason": "tool_calls"}]
+        else:
+            choices = [{"index": i, "message": {"role": "assistant", "content": r}, "finish_reason": "stop"}
+                       for i, r in enumerate(replies)]
+        self._send_json(200, {
+            "id": "stub", "object": "chat.completion", "created": created, "model": model,
+            "choices": choices,
+            "usage": usage,
+        })
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, config: StubConfig):
+        super().__init__(address, StubHandler)
+        self.config = config
+        self.stats = StubStats()
+        self.rng = random.Random(config.seed)
+        self._prefixes = set()
+        self._prefix_lock = threading.Lock()
+
+    def cached_prefix(self, prompt: str) -> int:
+        """Tokens of the longest previously seen prefix of prompt; remembers this one"""
+        lengths = range(PREFIX_CACHE_MIN_TOKENS, count_tokens(prompt) + 1, PREFIX_CACHE_STEP)
+        hashes = [(n, hashlib.sha256(prompt[:n * 4].encode("utf-8")).digest()) for n in lengths]
+        with self._prefix_lock:
+            cached = max((n for n, digest in hashes if digest in self._prefixes), default=0)
+            self._prefixes.update(digest for _, digest in hashes)
+        return cached
+
+    def handle_error(self, request, client_address):
+        # Clients hang up on purpose (cancelled hedges, timeouts); not worth a traceback
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+
+def start_stub_server(config: Optional[StubConfig] = None, host: str = "127.0.0.1", port: int = 0) -> StubServer:
+    """Start a stub server on a background thread (port 0 picks a free port)"""
+    server = StubServer((host, port), config or StubConfig())
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--per-token-latency", type=float, default=0.0)
+    parser.add_argument("--prefill-per-1k", type=float, default=0.0)
+    parser.add_argument("--tail-rate", type=float, default=0.0)
+    parser.add_argument("--tail-latency", type=float, default=0.0)
+    parser.add_argument("--fail-rate", type=float, default=0.0)
+    parser.add_argument("--fail-status", type=int, default=500)
+    parser.add_argument("--prefix-cache", action="store_true", help="Simulate provider prompt caching")
+    parser.add_argument("--no-structured-output", action="store_true", help="Reject response_format with HTTP 400")
+    parser.add_argument("--no-multiple-choices", action="store_true", help="Ignore n (one choice per request)")
+    parser.add_argument("--overlong-rate", type=float, default=0.0, help="Share of tweets padded past 280 chars")
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+
+    config = StubConfig(
+        latency=args.latency,
+        per_token_latency=args.per_token_latency,
+        prefill_per_1k=args.prefill_per_1k,
+        tail_rate=args.tail_rate,
+        tail_latency=args.tail_latency,
+        fail_rate=args.fail_rate,
+        fail_status=args.fail_status,
+        prefix_cache=args.prefix_cache,
+        structured_output=not args.no_structured_output,
+        multiple_choices=not args.no_multiple_choices,
+        overlong_rate=args.overlong_rate,
+        seed=args.seed,
+    )
+    server = StubServer((args.host, args.port), config)
+    print(f"🧪 Stub OpenAI server on {server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(f"\n{server.stats.as_dict()}")
+
+
+if __name__ == "__main__":
+    main()
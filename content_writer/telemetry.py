@@ -0,0 +1,303 @@
+# -----------------------------------------------------
+# Per-Call LLM Telemetry
+# -----------------------------------------------------
+"""
+One structured record per LLM call (provider, model, tokens, time to first
+byte, latency, rate-limit queue wait, retries, parse-fallback level, error), exported to pluggable
+sinks: a JSON lines file and an in-process Prometheus-style registry.
+
+LLMClient opens a record around each request. Callers that post-process the
+response (platform generators parsing the JSON post) wrap the call in
+telemetry.scope(platform=...) so the parse-fallback level lands on the same
+record; it is emitted when the scope closes.
+
+Retries and TTFB come from httpx event hooks on the backend clients
+(http_clients()), so SDK-internal retries, router failovers and hedges
+all count as extra attempts.
+"""
+import contextvars
+import json
+import logging
+import math
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from typing import Optional, Protocol
+
+# Parse-fallback levels, best first ("schema": the reply matched the requested
+# JSON schema; "per_platform": a combined response was missing platforms and
+# they were regenerated separately)
+PARSE_LEVELS = ("schema", "extracted", "full_parse", "raw_wrap", "per_platform")
+
+LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, math.inf)
+
+_current = contextvars.ContextVar("llm_call_record", default=None)
+
+
+@dataclass
+class CallRecord:
+    operation: Optional[str] = None      # generate / agenerate / stream / astream / (a)generate_candidates
+    provider: str = ""
+    model: str = ""
+    platform: Optional[str] = None
+    prompt: Optional[str] = None         # prompt registry template name
+    prompt_tokens: Optional[int] = None
+    completion_tokens: Optional[int] = None
+    cached_tokens: Optional[int] = None  # prompt tokens served from the provider's prefix cache
+    ttfb: Optional[float] = None         # seconds to response headers (first token for streams)
+    latency: Optional[float] = None
+    queue_wait: float = 0.0              # seconds held back by the rate limiter
+    attempts: int = 0                    # HTTP requests sent, including retries and hedges
+    cached: bool = False
+    parse_fallback: Optional[str] = None
+    error: Optional[str] = None
+    timestamp: float = field(default_factory=time.time)
+    started: float = field(default_factory=time.perf_counter, repr=False)
+    reservation: Optional[object] = field(default=None, repr=False)  # rate-limit tokens awaiting usage
+
+    @property
+    def retries(self) -> int:
+        return max(0, self.attempts - 1)
+
+    @property
+    def status(self) -> str:
+        if self.error:
+            return "error"
+        return "cached" if self.cached else "ok"
+
+    def as_dict(self) -> dict:
+        data = asdict(self)
+        del data["started"], data["reservation"]
+        data["retries"] = self.retries
+        data["status"] = self.status
+        return data
+
+
+class Sink(Protocol):
+    def emit(self, record: CallRecord) -> None: ...
+
+
+class JsonlSink:
+    """Append one JSON line per call"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def emit(self, record: CallRecord):
+        line = json.dumps(record.as_dict(), ensure_ascii=False)
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+
+
+class MetricsRegistry:
+    """In-process counters and histograms, rendered in Prometheus text format"""
+
+    def __init__(self, buckets: tuple = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self.counters = {}     # (name, labels) -> value
+        self.histograms = {}   # (name, labels) -> [bucket counts..., sum, count]
+        self.gauges = {}       # (name, labels) -> value
+
+    def _inc(self, name: str, labels: tuple, value: float = 1):
+        self.counters[(name, labels)] = self.counters.get((name, labels), 0) + value
+
+    def _observe(self, name: str, labels: tuple, value: float):
+        hist = self.histograms.setdefault((name, labels), [0] * len(self.buckets) + [0.0, 0])
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                hist[i] += 1
+        hist[-2] += value
+        hist[-1] += 1
+
+    def inc(self, name: str, labels: tuple = (), value: float = 1):
+        """Add to a counter outside the per-call records (e.g. background jobs)"""
+        with self._lock:
+            self._inc(name, labels, value)
+
+    def observe(self, name: str, labels: tuple, value: float):
+        with self._lock:
+            self._observe(name, labels, value)
+
+    def set_gauge(self, name: str, labels: tuple, value: float):
+        with self._lock:
+            self.gauges[(name, labels)] = value
+
+    def emit(self, record: CallRecord):
+        base = (("provider", record.provider), ("model", record.model))
+        with self._lock:
+            self._inc("llm_calls_total", base + (("status", record.status),))
+            if record.prompt_tokens:
+                self._inc("llm_tokens_total", base + (("kind", "prompt"),), record.prompt_tokens)
+            if record.completion_tokens:
+                self._inc("llm_tokens_total", base + (("kind", "completion"),), record.completion_tokens)
+            if record.cached_tokens:
+                self._inc("llm_tokens_total", base + (("kind", "cached"),), record.cached_tokens)
+            if record.retries:
+                self._inc("llm_retries_total", base, record.retries)
+            if record.parse_fallback:
+                self._inc("llm_parse_fallback_total", (("level", record.parse_fallback),))
+            if not record.cached and record.latency is not None:
+                self._observe("llm_latency_seconds", base, record.latency)
+            if not record.cached and record.ttfb is not None:
+                self._observe("llm_ttfb_seconds", base, record.ttfb)
+            if not record.cached:
+                self._observe("llm_queue_wait_seconds", base, record.queue_wait)
+
+    def quantile(self, name: str, labels: tuple, q: float) -> Optional[float]:
+        """Histogram quantile estimate (linear within a bucket), like PromQL histogram_quantile"""
+        hist = self.histograms.get((name, labels))
+        if not hist or not hist[-1]:
+            return None
+        rank = q * hist[-1]
+        lower, below = 0.0, 0
+        for bound, cumulative in zip(self.buckets, hist):
+            if cumulative >= rank:
+                if math.isinf(bound):
+                    return lower
+                return lower + (bound - lower) * (rank - below) / max(cumulative - below, 1)
+            lower, below = bound, cumulative
+        return lower
+
+    def render(self) -> str:
+        """Prometheus text exposition format"""
+        def fmt(labels: tuple) -> str:
+            return "{" + ",".join(f'{k}="{v}"' for k, v in labels) + "}" if labels else ""
+
+        lines = []
+        with self._lock:
+            for (name, labels), value in sorted(self.counters.items()):
+                lines.append(f"{name}{fmt(labels)} {value}")
+            for (name, labels), value in sorted(self.gauges.items()):
+                lines.append(f"{name}{fmt(labels)} {value}")
+            for (name, labels), hist in sorted(self.histograms.items()):
+                for bound, count in zip(self.buckets, hist):
+                    le = "+Inf" if math.isinf(bound) else str(bound)
+                    lines.append(f"{name}_bucket{fmt(labels + (('le', le),))} {count}")
+                lines.append(f"{name}_sum{fmt(labels)} {hist[-2]}")
+                lines.append(f"{name}_count{fmt(labels)} {hist[-1]}")
+        return "\n".join(lines) + "\n"
+
+    def summary(self) -> list[dict]:
+        """One row per provider/model for display"""
+        rows = {}
+        with self._lock:
+            for (name, labels), value in self.counters.items():
+                if not name.startswith("llm_") or name == "llm_parse_fallback_total":
+                    continue
+                base = labels[:2]
+                row = rows.setdefault(base, {
+                    "provider": base[0][1], "model": base[1][1], "calls": 0, "errors": 0, "cached": 0,
+                    "prompt_tokens": 0, "completion_tokens": 0, "cached_tokens": 0, "retries": 0,
+                })
+                extra = dict(labels[2:])
+                if name == "llm_calls_total":
+                    row["calls"] += value
+                    if extra["status"] == "error":
+                        row["errors"] += value
+                    elif extra["status"] == "cached":
+                        row["cached"] += value
+                elif name == "llm_tokens_total":
+                    row[f"{extra['kind']}_tokens"] += value
+                elif name == "llm_retries_total":
+                    row["retries"] += value
+        for base, row in rows.items():
+            row["latency_p50"] = self.quantile("llm_latency_seconds", base, 0.5)
+            row["latency_p95"] = self.quantile("llm_latency_seconds", base, 0.95)
+            ttfb = self.histograms.get(("llm_ttfb_seconds", base))
+            row["ttfb_mean"] = ttfb[-2] / ttfb[-1] if ttfb and ttfb[-1] else None
+            wait = self.histograms.get(("llm_queue_wait_seconds", base))
+            row["queue_wait_mean"] = wait[-2] / wait[-1] if wait and wait[-1] else None
+        return list(rows.values())
+
+    def parse_fallbacks(self) -> dict:
+        return {dict(labels)["level"]: value for (name, labels), value in self.counters.items()
+                if name == "llm_parse_fallback_total"}
+
+
+class Telemetry:
+    """Creates call records and fans them out to the registered sinks"""
+
+    def __init__(self, sinks: Optional[list] = None):
+        self.sinks = list(sinks or [])
+
+    def add_sink(self, sink: Sink):
+        self.sinks.append(sink)
+
+    def current(self) -> Optional[CallRecord]:
+        return _current.get()
+
+    def emit(self, record: CallRecord):
+        for sink in self.sinks:
+            try:
+                sink.emit(record)
+            except Exception as e:
+                # Telemetry must never break generation
+                logging.warning(f"Telemetry sink {type(sink).__name__} failed: {e}")
+
+    @contextmanager
+    def scope(self, **labels):
+        """Collect the next LLM call plus post-processing (parse level) into one record"""
+        record = CallRecord(**labels)
+        token = _current.set(record)
+        try:
+            yield record
+        finally:
+            _current.reset(token)
+            if record.operation is not None:
+                self.emit(record)
+
+    @contextmanager
+    def call(self, operation: str, provider: str, model: str):
+        """Record one LLM request; joins an open scope() that has no call yet"""
+        outer = _current.get()
+        if outer is not None and outer.operation is None:
+            record, token = outer, None
+            record.started = time.perf_counter()
+        else:
+            record = CallRecord()
+            token = _current.set(record)
+        record.operation, record.provider, record.model = operation, provider, model
+        try:
+            yield record
+        finally:
+            if record.latency is None:
+                record.latency = time.perf_counter() - record.started
+            if token is not None:
+                try:
+                    _current.reset(token)
+                except ValueError:
+                    pass  # generator closed from another context
+                self.emit(record)
+
+    def http_clients(self) -> dict:
+        """Backend kwargs: httpx clients that count attempts and time to first byte"""
+        from openai import DefaultHttpxClient, DefaultAsyncHttpxClient
+
+        def on_request(request):
+            record = _current.get()
+            if record is not None:
+                record.attempts += 1
+
+        def on_response(response):
+            record = _current.get()
+            if record is not None and record.ttfb is None and response.status_code < 400:
+                record.ttfb = time.perf_counter() - record.started
+
+        async def on_request_async(request):
+            on_request(request)
+
+        async def on_response_async(response):
+            on_response(response)
+
+        return {
+            "http_client": DefaultHttpxClient(
+                event_hooks={"request": [on_request], "response": [on_response]}
+            ),
+            # A factory: async clients are rebuilt per event loop
+            "async_http_client_factory": lambda: DefaultAsyncHttpxClient(
+                event_hooks={"request": [on_request_async], "response": [on_response_async]}
+            ),
+        }
@@ -0,0 +1,146 @@
+# -----------------------------------------------------
+# Persistent Transcript Cache
+# -----------------------------------------------------
+"""
+On-disk transcript cache shared across Streamlit sessions and processes.
+
+Entries are keyed by YouTube video ID and stored in a SQLite file, with a
+TTL per entry and LRU eviction once the total stored size passes a byte
+budget. Definitive failures (transcripts disabled, none found, video
+unavailable or an invalid ID) are cached as negative entries with a short
+TTL so bad IDs don't hammer the YouTube API. Anything else (network
+errors, timeouts, 429s) is not cached, so the next request tries again.
+
+The fetcher is injected, so the cache can be exercised offline:
+
+    cache = TranscriptCache(path=":memory:", fetcher=lambda vid: [{"text": "hi", "start": 0.0, "duration": 1.0}])
+"""
+import json
+import logging
+import os
+import time
+from typing import Callable
+
+from sqlite_store import SQLiteStore, evict
+
+try:
+    from youtube_transcript_api import InvalidVideoId, NoTranscriptFound, TranscriptsDisabled, VideoUnavailable
+    DEFINITIVE_ERRORS = (InvalidVideoId, NoTranscriptFound, TranscriptsDisabled, VideoUnavailable)
+except ImportError:
+    DEFINITIVE_ERRORS = ()
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_PATH = os.getenv(
+    "TRANSCRIPT_CACHE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "transcripts.sqlite3"),
+)
+DEFAULT_MAX_BYTES = int(os.getenv("TRANSCRIPT_CACHE_MAX_BYTES", str(100 * 1024 * 1024)))
+DEFAULT_TTL = float(os.getenv("TRANSCRIPT_CACHE_TTL", str(7 * 24 * 3600)))
+DEFAULT_NEGATIVE_TTL = float(os.getenv("TRANSCRIPT_CACHE_NEGATIVE_TTL", "600"))
+
+# A snippet is {"text": str, "start": float, "duration": float}
+Fetcher = Callable[[str], list[dict]]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS transcripts (
+    video_id    TEXT PRIMARY KEY,
+    payload     TEXT NOT NULL,
+    size        INTEGER NOT NULL,
+    negative    INTEGER NOT NULL,
+    expires_at  REAL NOT NULL,
+    last_access REAL NOT NULL
+)
+"""
+
+
+class TranscriptCache(SQLiteStore):
+    """SQLite-backed, size-bounded transcript cache with TTL and LRU eviction"""
+
+    def __init__(self, fetcher: Fetcher, path: str = DEFAULT_CACHE_PATH,
+                 max_bytes: int = DEFAULT_MAX_BYTES, ttl: float = DEFAULT_TTL,
+                 negative_ttl: float = DEFAULT_NEGATIVE_TTL,
+                 definitive_errors: tuple = DEFINITIVE_ERRORS):
+        self.fetcher = fetcher
+        self.definitive_errors = definitive_errors   # fetch errors worth a negative entry
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.hits = 0
+        self.misses = 0
+        self.negative_hits = 0
+        self.evictions = 0
+        super().__init__(path, _SCHEMA)
+
+    def get_snippets(self, video_id: str) -> list[dict]:
+        """Return cached snippets for video_id, fetching on miss. Empty list on failure."""
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            row = conn.execute(
+                "SELECT payload, negative FROM transcripts WHERE video_id = ? AND expires_at > ?",
+                (video_id, now),
+            ).fetchone()
+            if row is not None:
+                conn.execute("UPDATE transcripts SET last_access = ? WHERE video_id = ?", (now, video_id))
+                if row[1]:
+                    self.negative_hits += 1
+                    return []
+                self.hits += 1
+                return json.loads(row[0])
+            self.misses += 1
+
+        # Fetch outside the lock so a slow fetch doesn't block other videos
+        try:
+            snippets = self.fetcher(video_id) or []
+        except self.definitive_errors as e:
+            logger.warning(f"Transcript fetch failed for {video_id}: {e}")
+            snippets = []
+        except Exception as e:
+            # Possibly transient: don't remember it
+            logger.warning(f"Transcript fetch failed for {video_id}, not caching: {e}")
+            return []
+        self._store(video_id, snippets)
+        return snippets
+
+    def get(self, video_id: str) -> str:
+        """Return the transcript text for video_id ("" on failure)"""
+        return " ".join(s["text"] for s in self.get_snippets(video_id))
+
+    def _store(self, video_id: str, snippets: list[dict]):
+        payload = json.dumps(snippets)
+        negative = not snippets
+        now = time.time()
+        expires_at = now + (self.negative_ttl if negative else self.ttl)
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO transcripts VALUES (?, ?, ?, ?, ?, ?)",
+                (video_id, payload, len(payload), int(negative), expires_at, now),
+            )
+            self.evictions += evict(conn, "transcripts", "video_id", self.max_bytes, now)
+
+    def invalidate(self, video_id: str):
+        """Forget a single video (e.g. to retry a cached failure immediately)"""
+        with self._lock, self._connect() as conn:
+            conn.execute("DELETE FROM transcripts WHERE video_id = ?", (video_id,))
+
+    def clear(self):
+        """Remove every cached entry"""
+        with self._lock, self._connect() as conn:
+            conn.execute("DELETE FROM transcripts")
+
+    def stats(self) -> dict:
+        """Hit/miss counters for this process plus current on-disk size"""
+        with self._lock, self._connect() as conn:
+            entries, size = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM transcripts"
+            ).fetchone()
+        lookups = self.hits + self.negative_hits + self.misses
+        return {
+            "hits": self.hits,
+            "negative_hits": self.negative_hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits + self.negative_hits) / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "entries": entries,
+            "bytes": size,
+        }
@@ -5,13 +5,26 @@ from langchain.vectorstores import Chroma
 from langchain_core.runnables import RunnablePassthrough
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.pydantic_v1 import BaseModel, Field
+from filelock import FileLock
 
 import os
 import tempfile
 import uuid
+import hashlib
+import json
+import time
 import pandas as pd
 import re
 
+# Ingestion settings. They are part of the ingestion cache key,
+# so changing any of them makes the next upload re-embed.
+CHUNK_SIZE = 1000
+CHUNK_OVERLAP = 200
+EMBEDDING_MODEL = "models/embedding-001"
+
+# Ingested files, by cache key, kept next to the Chroma database
+INGESTION_INDEX = "ingestion_index.json"
+
 def clean_filename(filename):
     """
     Remove "(number)" pattern from a filename 
@@ -75,20 +88,21 @@ def split_document(documents, chunk_size, chunk_overlap):
     return text_splitter.split_documents(documents)
 
 
-def get_embedding_function(api_key):
+def get_embedding_function(api_key, model=EMBEDDING_MODEL):
     """
     Return a GoogleGenerativeAIEmbeddings object, which is used to create vector embeddings from text.
-    The embeddings model used is "models/embedding-001" and the Google AI API key is provided
+    The embeddings model used is "models/embedding-001" unless another is given, and the Google AI API key is provided
     as an argument to the function.
 
     Parameters:
         api_key (str): The Google AI API key to use when calling the Google AI Embeddings API.
+        model (str): The embeddings model to use (default: EMBEDDING_MODEL)
 
     Returns:
         GoogleGenerativeAIEmbeddings: A GoogleGenerativeAIEmbeddings object, which can be used to create vector embeddings from text.
     """
     embeddings = GoogleGenerativeAIEmbeddings(
-        model="models/embedding-001", 
+        model=model, 
         google_api_key=api_key
     )
     return embeddings
@@ -134,7 +148,9 @@ def create_vectorstore(chunks, embedding_function, file_name, vector_store_path=
     return vectorstore
 
 
-def create_vectorstore_from_texts(documents, api_key, file_name):
+def create_vectorstore_from_texts(documents, api_key, file_name, chunk_size=CHUNK_SIZE,
+                                  chunk_overlap=CHUNK_OVERLAP, embedding_model=EMBEDDING_MODEL,
+                                  vector_store_path="db"):
     
     # Step 2 split the documents  
     """
@@ -143,21 +159,25 @@ def create_vectorstore_from_texts(documents, api_key, file_name):
     :param documents: A list of generic text documents
     :param api_key: The Google AI API key used to create the vector store
     :param file_name: The name of the file to associate with the vector store
+    :param chunk_size: The maximum size of each chunk (default: CHUNK_SIZE)
+    :param chunk_overlap: The overlap between consecutive chunks (default: CHUNK_OVERLAP)
+    :param embedding_model: The embeddings model to use (default: EMBEDDING_MODEL)
+    :param vector_store_path: The directory to store the vector store (default: "db")
 
     :return: A Chroma vector store object
     """
-    docs = split_document(documents, chunk_size=1000, chunk_overlap=200)
+    docs = split_document(documents, chunk_size=chunk_size, chunk_overlap=chunk_overlap)
     
     # Step 3 define embedding function
-    embedding_function = get_embedding_function(api_key)
+    embedding_function = get_embedding_function(api_key, embedding_model)
 
     # Step 4 create a vector store  
-    vectorstore = create_vectorstore(docs, embedding_function, file_name)
+    vectorstore = create_vectorstore(docs, embedding_function, file_name, vector_store_path)
     
     return vectorstore
 
 
-def load_vectorstore(file_name, api_key, vectorstore_path="db"):
+def load_vectorstore(file_name, api_key, vectorstore_path="db", embedding_model=EMBEDDING_MODEL):
 
     """
     Load a previously saved Chroma vector store from disk.
@@ -165,14 +185,115 @@ def load_vectorstore(file_name, api_key, vectorstore_path="db"):
     :param file_name: The name of the file to load (without the path)
     :param api_key: The Google AI API key used to create the vector store
     :param vectorstore_path: The path to the directory where the vector store was saved (default: "db")
+    :param embedding_model: The embeddings model the vector store was created with (default: EMBEDDING_MODEL)
     
     :return: A Chroma vector store object
     """
-    embedding_function = get_embedding_function(api_key)
+    embedding_function = get_embedding_function(api_key, embedding_model)
     return Chroma(persist_directory=vectorstore_path, 
                   embedding_function=embedding_function, 
                   collection_name=clean_filename(file_name))
 
+
+def ingestion_key(file_bytes, chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP, embedding_model=EMBEDDING_MODEL):
+    """
+    Return the ingestion cache key for a file: the SHA-256 of its bytes
+    combined with the chunking parameters and the embedding model.
+
+    :param file_bytes: The content of the uploaded file
+    :param chunk_size: The maximum size of each chunk
+    :param chunk_overlap: The overlap between consecutive chunks
+    :param embedding_model: The embeddings model used
+
+    :return: A hex digest string
+    """
+    file_hash = hashlib.sha256(file_bytes).hexdigest()
+    settings = f"{file_hash}|{chunk_size}|{chunk_overlap}|{embedding_model}"
+    return hashlib.sha256(settings.encode("utf-8")).hexdigest()
+
+
+def read_ingestion_index(vector_store_path="db"):
+    """
+    Return the ingestion index of a vector store directory: cache key -> details of the ingestion.
+    """
+    try:
+        with open(os.path.join(vector_store_path, INGESTION_INDEX)) as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def write_ingestion_index(index, vector_store_path="db"):
+    """
+    Save the ingestion index (written to a temporary file first, so a crash never leaves it half written).
+    """
+    os.makedirs(vector_store_path, exist_ok=True)
+    path = os.path.join(vector_store_path, INGESTION_INDEX)
+    # A unique temporary name, so concurrent writers never share one
+    fd, tmp_path = tempfile.mkstemp(dir=vector_store_path, prefix=INGESTION_INDEX, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump(index, f, indent=2)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+
+def update_ingestion_index(key, entry, vector_store_path="db"):
+    """
+    Add or replace one entry of the ingestion index. The read-modify-write holds a file lock,
+    so sessions and processes ingesting at the same time don't drop each other's entries.
+    """
+    os.makedirs(vector_store_path, exist_ok=True)
+    with FileLock(os.path.join(vector_store_path, INGESTION_INDEX + ".lock")):
+        index = read_ingestion_index(vector_store_path)
+        index[key] = entry
+        write_ingestion_index(index, vector_store_path)
+
+
+def get_or_create_vectorstore(uploaded_file, api_key, chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP,
+                              embedding_model=EMBEDDING_MODEL, vector_store_path="db"):
+    """
+    Return a vector store for an uploaded PDF. It is only built once per file content and settings:
+    if the same bytes were already ingested with the same chunking parameters and embedding model,
+    the persisted collection is opened with load_vectorstore instead of re-parsing and re-embedding.
+
+    :param uploaded_file: The uploaded PDF file
+    :param api_key: The Google AI API key
+    :param chunk_size: The maximum size of each chunk (default: CHUNK_SIZE)
+    :param chunk_overlap: The overlap between consecutive chunks (default: CHUNK_OVERLAP)
+    :param embedding_model: The embeddings model to use (default: EMBEDDING_MODEL)
+    :param vector_store_path: The directory to store the vector store (default: "db")
+
+    :return: A tuple (vectorstore, info). info holds the cache 'key', whether the store was 'cached',
+             the 'seconds' taken by this call and the 'build_seconds' the original ingestion took.
+    """
+    started = time.perf_counter()
+    key = ingestion_key(uploaded_file.getvalue(), chunk_size, chunk_overlap, embedding_model)
+    # One collection per cache key (Chroma names are limited to 63 characters)
+    collection_name = f"pdf-{key[:48]}"
+
+    entry = read_ingestion_index(vector_store_path).get(key)
+    if entry is not None:
+        vectorstore = load_vectorstore(collection_name, api_key, vector_store_path, embedding_model)
+        # An empty collection means the database was cleared since: rebuild
+        if vectorstore.get(limit=1)["ids"]:
+            return vectorstore, {"key": key, "cached": True, "seconds": time.perf_counter() - started,
+                                 "build_seconds": entry["build_seconds"]}
+
+    documents = get_pdf_text(uploaded_file)
+    vectorstore = create_vectorstore_from_texts(documents, api_key, collection_name, chunk_size,
+                                                chunk_overlap, embedding_model, vector_store_path)
+    build_seconds = time.perf_counter() - started
+
+    update_ingestion_index(key, {"file_name": uploaded_file.name, "collection": collection_name,
+                                 "chunk_size": chunk_size, "chunk_overlap": chunk_overlap,
+                                 "embedding_model": embedding_model, "build_seconds": build_seconds},
+                           vector_store_path)
+
+    return vectorstore, {"key": key, "cached": False, "seconds": build_seconds, "build_seconds": build_seconds}
+
 # Prompt template
 PROMPT_TEMPLATE = """
 You are an assistant for question-answering tasks.
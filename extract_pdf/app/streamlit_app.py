@@ -1,6 +1,7 @@
 import streamlit as st  
 from functions import *
 import base64
+import time
 
 # Initialize the API key in session state if it doesn't exist
 if 'api_key' not in st.session_state:
@@ -68,12 +69,25 @@ if uploaded_file is not None:
     with col2:
         display_pdf(uploaded_file)
         
-    # Load in the documents
-    documents = get_pdf_text(uploaded_file)
-    st.session_state.vector_store = create_vectorstore_from_texts(documents, 
-                                                                  api_key=st.session_state.api_key,
-                                                                  file_name=uploaded_file.name)
-    st.write("Input Processed")
+    # Load in the documents, only once per file content and ingestion settings:
+    # reruns in this session reuse the vector store, and a file ingested before
+    # (by any session) is opened from the persist directory instead of re-embedded
+    started = time.perf_counter()
+    key = ingestion_key(uploaded_file.getvalue())
+    rebuilt = False
+    if st.session_state.get("ingestion", {}).get("key") != key:
+        st.session_state.vector_store, st.session_state.ingestion = get_or_create_vectorstore(
+            uploaded_file, api_key=st.session_state.api_key)
+        rebuilt = not st.session_state.ingestion["cached"]
+    build_seconds = st.session_state.ingestion["build_seconds"]
+
+    if rebuilt:
+        st.write(f"Input Processed in {build_seconds:.1f}s")
+    else:
+        saved = max(build_seconds - (time.perf_counter() - started), 0)
+        st.session_state.time_saved = st.session_state.get("time_saved", 0.0) + saved
+        st.write(f"Input Processed (reused embeddings): saved {saved:.1f}s on this rerun, "
+                 f"{st.session_state.time_saved:.1f}s this session")
 
 # Generate answer
 with col1: